@@ -0,0 +1,128 @@
+"""Time archiving match records one by one against the batched bulk move, and write the results as JSON.
+
+Runs against the Firestore emulator when FIRESTORE_EMULATOR_HOST is set, otherwise
+against a temporary SQLite store (utils.storage.SQLiteStorage). Run from the
+repository root:
+    firebase emulators:start --only firestore        # in another terminal
+    FIRESTORE_EMULATOR_HOST=localhost:8080 python benchmarks/bench_bulk_move.py --docs 500
+    python benchmarks/bench_bulk_move.py --docs 500 --backend sqlite
+
+Methods, each on a freshly seeded match collection:
+    per_document   get, set in the archive and delete for every record, then a full
+                   read of the archive (what Data Management did before)
+    batched        utils.bulk.move_documents with the documents already in memory
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# Add the parent directory to the Python path to ensure utils can be found
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from synthetic import make_events, to_documents
+from bench_pipeline import git_commit, time_stage, RESULTS_DIR
+from utils.storage import SQLiteStorage
+from utils.utils import MATCH_SCOUT_COLLECTION
+from utils.summaries import TEAM_SUMMARY_COLLECTION, alliance_index
+from utils.bulk import move_documents, MOVE_CHUNK_SIZE
+
+ARCHIVE_COLLECTION = "archived_match_scout_data"
+ROBOTS_PER_MATCH = 6
+
+def connect(backend, project):
+    if backend == 'emulator':
+        from google.cloud import firestore
+        return firestore.Client(project=project)
+    return SQLiteStorage(os.path.join(tempfile.mkdtemp(prefix='bench_bulk_move_'), 'scouting.db'))
+
+def clear(db, collection):
+    refs = [doc.reference for doc in db.collection(collection).select([]).stream()]
+    for start in range(0, len(refs), 500):
+        batch = db.batch()
+        for ref in refs[start:start + 500]:
+            batch.delete(ref)
+        batch.commit()
+
+def seed(db, documents):
+    for collection in (MATCH_SCOUT_COLLECTION, ARCHIVE_COLLECTION, TEAM_SUMMARY_COLLECTION):
+        clear(db, collection)
+    items = list(documents.items())
+    for start in range(0, len(items), 500):
+        batch = db.batch()
+        for doc_id, data in items[start:start + 500]:
+            batch.set(db.collection(MATCH_SCOUT_COLLECTION).document(doc_id), data)
+        batch.commit()
+
+def per_document(db, documents):
+    for doc_id in documents:
+        doc_ref = db.collection(MATCH_SCOUT_COLLECTION).document(doc_id)
+        doc = doc_ref.get()
+        if doc.exists:
+            db.collection(ARCHIVE_COLLECTION).document(doc_id).set(doc.to_dict())
+            doc_ref.delete()
+    return len(db.collection(ARCHIVE_COLLECTION).get())
+
+def batched(db, documents, chunk_size):
+    return move_documents(db, MATCH_SCOUT_COLLECTION, ARCHIVE_COLLECTION, documents,
+                          chunk_size=chunk_size, alliances=alliance_index(documents))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--docs', type=int, default=500, help='match records to archive')
+    parser.add_argument('--backend', choices=['auto', 'emulator', 'sqlite'], default='auto',
+                        help='auto: the emulator if FIRESTORE_EMULATOR_HOST is set, else sqlite')
+    parser.add_argument('--project', default='demo-scouting', help='emulator project id')
+    parser.add_argument('--chunk-size', type=int, default=MOVE_CHUNK_SIZE, help='documents per batch of the bulk move')
+    parser.add_argument('--seed', type=int, default=4270)
+    parser.add_argument('--output', help='JSON file to write (default: benchmarks/results/bulk_move_<commit>_<backend>_<docs>.json)')
+    args = parser.parse_args()
+
+    backend = args.backend
+    if backend == 'auto':
+        backend = 'emulator' if os.environ.get('FIRESTORE_EMULATOR_HOST') else 'sqlite'
+    db = connect(backend, args.project)
+
+    n_matches = -(-args.docs // ROBOTS_PER_MATCH)
+    raw = make_events(1, n_matches, args.seed).head(args.docs)
+    documents = {}
+    for record in to_documents(raw):
+        doc_id = record.pop('doc_id')
+        documents[doc_id] = {key: value.item() if hasattr(value, 'item') else value for key, value in record.items()}
+
+    methods = {}
+    seed(db, documents)
+    archived, runs = time_stage(lambda: per_document(db, documents), 1)
+    methods['per_document'] = {'seconds': runs[0], 'archived': archived,
+                               'round_trips': 3 * len(documents) + 1}
+    seed(db, documents)
+    result, runs = time_stage(lambda: batched(db, documents, args.chunk_size), 1)
+    methods['batched'] = {'seconds': runs[0], 'archived': len(result['moved']), 'round_trips': result['batches']}
+
+    commit = git_commit()
+    results = {
+        'benchmark': 'bulk_move',
+        'git_commit': commit,
+        'created_at': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'backend': backend,
+        'params': {key: value for key, value in vars(args).items() if key != 'output'},
+        'documents': len(documents),
+        'methods': methods
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"bulk_move_{commit or 'nogit'}_{backend}_{len(documents)}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print(f"{len(documents)} match records on {backend}")
+    for name, method in methods.items():
+        print(f"  {name:14s} {method['seconds']:8.3f}s   {method['round_trips']:5d} round trips   {method['archived']} archived")
+    print(f"results written to {output}")
+
+if __name__ == "__main__":
+    main()
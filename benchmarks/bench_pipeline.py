@@ -0,0 +1,137 @@
+"""Time each stage of the match data pipeline on a synthetic event set and write the results as JSON.
+
+Run from the repository root:
+    python benchmarks/bench_pipeline.py --events 4 --matches 80
+    python benchmarks/bench_pipeline.py --events 4 --matches 80 --compare benchmarks/results/<earlier>.json
+
+Stages: load/convert (documents -> typed DataFrame), match scoring (vectorized and,
+up to --rowwise-limit rows, the row-wise calculate_match_score), alliance bonuses,
+EPA, success ratios, the team statistics aggregation of 3_Team_Statistics, the
+prediction of 4_Match_Prediction and the error inspection of 7_Data_Management.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+# Add the parent directory to the Python path to ensure utils can be found
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from synthetic import make_events, to_documents
+from utils.utils import convert_match_dtypes, calculate_match_score, calculate_match_scores
+from utils.metrics import add_alliance_bonuses, add_epa, add_success_ratios, aggregate_team_stats, SCORE_COLUMNS
+from utils.prediction import calculate_team_metrics, predict_match
+from utils.validation import inspect_errors, MATCH_RULES
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=os.path.dirname(RESULTS_DIR),
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+def time_stage(func, repeat):
+    """Run func() repeat times; return (result of the last run, list of seconds)."""
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        runs.append(time.perf_counter() - start)
+    return result, runs
+
+def run_stages(raw, args):
+    documents = to_documents(raw)
+    stages = {}
+
+    def record(name, func):
+        result, runs = time_stage(func, args.repeat)
+        stages[name] = {'seconds': min(runs), 'runs': runs}
+        return result
+
+    df = record('load_convert', lambda: convert_match_dtypes(pd.DataFrame(documents)))
+    scores = record('match_scores', lambda: calculate_match_scores(df))
+    if len(df) <= args.rowwise_limit:
+        record('match_scores_rowwise', lambda: df.apply(calculate_match_score, axis=1))
+    df[SCORE_COLUMNS] = scores
+    df = record('alliance_bonuses', lambda: add_alliance_bonuses(df.copy()))
+    df = record('epa', lambda: add_epa(df.copy()))
+    df = record('success_ratios', lambda: add_success_ratios(df.copy()))
+    record('team_stats', lambda: aggregate_team_stats(df))
+
+    # Predict the first --predictions scheduled matches
+    alliances = (raw.astype({'team_number': str}).groupby(['event_key', 'match_number', 'alliance_color'])['team_number']
+                 .agg(lambda teams: sorted(set(teams))).unstack())
+    matches = alliances.head(args.predictions)
+
+    def predict():
+        team_metrics = calculate_team_metrics(df)
+        return [predict_match(df, row['Red'], row['Blue'], team_metrics) for _, row in matches.iterrows()]
+    record('prediction', predict)
+
+    inspect_input = pd.DataFrame(documents)
+    record('error_inspection', lambda: inspect_errors(inspect_input, MATCH_RULES))
+    return stages
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nvs {baseline_path} (commit {baseline.get('git_commit')}, {baseline.get('rows')} rows)")
+    for name, stage in results['stages'].items():
+        old = baseline.get('stages', {}).get(name)
+        if old is None:
+            print(f"  {name:22s} {stage['seconds']:9.4f}s   (new stage)")
+            continue
+        ratio = stage['seconds'] / old['seconds'] if old['seconds'] else float('inf')
+        print(f"  {name:22s} {stage['seconds']:9.4f}s   was {old['seconds']:9.4f}s   x{ratio:.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=4, help='number of events')
+    parser.add_argument('--matches', type=int, default=80, help='qualification matches per event')
+    parser.add_argument('--seed', type=int, default=4270)
+    parser.add_argument('--error-rate', type=float, default=0.01, help='share of rows with injected errors')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per stage; the fastest is reported')
+    parser.add_argument('--predictions', type=int, default=20, help='matches to predict in the prediction stage')
+    parser.add_argument('--rowwise-limit', type=int, default=20_000, help='skip the row-wise scoring stage above this many rows')
+    parser.add_argument('--output', help='JSON file to write (default: benchmarks/results/pipeline_<commit>_<events>x<matches>.json)')
+    parser.add_argument('--compare', help='earlier results JSON to compare against')
+    args = parser.parse_args()
+
+    raw, generate_runs = time_stage(lambda: make_events(args.events, args.matches, args.seed, args.error_rate), 1)
+    stages = run_stages(raw, args)
+    commit = git_commit()
+    results = {
+        'benchmark': 'pipeline',
+        'git_commit': commit,
+        'created_at': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'params': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+        'rows': len(raw),
+        'generate_seconds': generate_runs[0],
+        'stages': stages
+    }
+
+    output = args.output or os.path.join(RESULTS_DIR, f"pipeline_{commit or 'nogit'}_{args.events}x{args.matches}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print(f"rows: {len(raw)} ({args.events} events x {args.matches} matches x 6 robots)")
+    for name, stage in stages.items():
+        print(f"  {name:22s} {stage['seconds']:9.4f}s")
+    print(f"results written to {output}")
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == "__main__":
+    main()
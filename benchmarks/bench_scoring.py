@@ -0,0 +1,46 @@
+"""Benchmark calculate_match_scores against the row-wise calculate_match_score apply.
+
+Run from the repository root:
+    python benchmarks/bench_scoring.py [rows]
+"""
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+# Add the parent directory to the Python path to ensure utils can be found
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.utils import calculate_match_score, calculate_match_scores, AUTO_SCORE_WEIGHTS, TELEOP_SCORE_WEIGHTS
+
+SCORE_COLUMNS = ['auto_score', 'teleop_score', 'endgame_score', 'total_score']
+
+def make_match_rows(n, seed=4270):
+    """Synthetic match scouting rows with the value mix seen in Firestore."""
+    rng = np.random.default_rng(seed)
+    data = {col: rng.integers(0, 6, n) for col in list(AUTO_SCORE_WEIGHTS) + list(TELEOP_SCORE_WEIGHTS)}
+    data['auto_taxi_left'] = rng.choice(np.array([True, False, 'True', '', None], dtype=object), n)
+    data['climb_status'] = rng.choice(np.array(['None', 'Parked', 'Shallow Climb', 'Deep Climb', None], dtype=object), n)
+    return pd.DataFrame(data)
+
+def time_call(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    df = make_match_rows(rows)
+
+    expected, apply_seconds = time_call(lambda frame: frame.apply(calculate_match_score, axis=1), df)
+    result, vectorized_seconds = time_call(calculate_match_scores, df)
+
+    pd.testing.assert_frame_equal(result[SCORE_COLUMNS], expected[SCORE_COLUMNS], check_dtype=False)
+    print(f"rows:        {rows}")
+    print(f"apply:       {apply_seconds:.3f}s")
+    print(f"vectorized:  {vectorized_seconds:.4f}s")
+    print(f"speedup:     {apply_seconds / vectorized_seconds:.0f}x (results identical)")
+
+if __name__ == "__main__":
+    main()
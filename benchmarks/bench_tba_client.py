@@ -0,0 +1,163 @@
+"""Time TBA requests through utils.tba_api.TBAClient against plain requests.get, on a local stub server, and write the results as JSON.
+
+The stub serves the 2025alhu schedule of match_schedule_cache.json as
+/event/2025alhu/matches and generated /team/frc{n} records, with an ETag and a
+Cache-Control max-age, and answers If-None-Match with 304. Run from the repository root:
+    python benchmarks/bench_tba_client.py --requests 200
+    python benchmarks/bench_tba_client.py --requests 200 --latency-ms 30
+
+Methods, each making --requests calls spread over the stub's endpoints:
+    plain          requests.get with the auth header, a new connection every call (what the pages did)
+    session        TBAClient, every call revalidated before returning: unchanged data comes back as 304
+    background     TBAClient with max-age 0: kept responses are returned at once and revalidated in the background
+    max_age        TBAClient with max-age --max-age: calls within it never reach the server
+    offline        a new TBAClient on the on-disk cache of max_age, revalidating every call with the stub stopped
+It also checks the client's counters against the requests the stub received.
+"""
+import argparse
+import hashlib
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import requests
+
+# Add the parent directory to the Python path to ensure utils can be found
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bench_pipeline import git_commit, time_stage, RESULTS_DIR
+from utils.tba_api import TBAClient
+from utils.tba_cache import TBACache
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def make_payloads(teams):
+    with open(os.path.join(ROOT, 'match_schedule_cache.json')) as f:
+        schedule = json.load(f)['2025alhu']
+    payloads = {'/event/2025alhu/matches': json.dumps(schedule).encode()}
+    for team in range(1, teams + 1):
+        payloads[f'/team/frc{team}'] = json.dumps({'key': f'frc{team}', 'team_number': team, 'nickname': f'Team {team}',
+                                                   'city': 'Honolulu', 'state_prov': 'HI', 'country': 'USA'}).encode()
+    return payloads
+
+def start_stub(payloads, settings):
+    """A TBA-like server on a free local port; settings['max_age'] and ['latency'] can change between runs."""
+    etags = {path: '"' + hashlib.sha1(body).hexdigest() + '"' for path, body in payloads.items()}
+    received = {'200': 0, '304': 0}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True  # Headers and body are separate writes on a kept-alive connection
+
+        def do_GET(self):
+            time.sleep(settings['latency'])
+            path = self.path.replace('/api/v3', '', 1)
+            if path not in payloads:
+                self.send_response(404)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            not_modified = self.headers.get('If-None-Match') == etags[path]
+            with lock:
+                received['304' if not_modified else '200'] += 1
+            self.send_response(304 if not_modified else 200)
+            self.send_header('ETag', etags[path])
+            self.send_header('Cache-Control', f"public, max-age={settings['max_age']}")
+            body = b'' if not_modified else payloads[path]
+            if not not_modified:
+                self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, received
+
+def workload(payloads, count):
+    # Mostly team lookups, with the schedule every tenth call
+    teams = [path for path in payloads if path.startswith('/team/')]
+    return ['/event/2025alhu/matches' if i % 10 == 0 else teams[i % len(teams)] for i in range(count)]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=200, help='calls per method')
+    parser.add_argument('--teams', type=int, default=40, help='team records served by the stub')
+    parser.add_argument('--max-age', type=int, default=60, help='max-age of the max_age method')
+    parser.add_argument('--latency-ms', type=float, default=0, help='delay the stub adds to every response')
+    parser.add_argument('--output', help='JSON file to write (default: benchmarks/results/tba_client_<commit>_<requests>.json)')
+    args = parser.parse_args()
+
+    payloads = make_payloads(args.teams)
+    settings = {'max_age': 0, 'latency': args.latency_ms / 1000}
+    server, received = start_stub(payloads, settings)
+    base_url = f"http://127.0.0.1:{server.server_port}/api/v3"
+    paths = workload(payloads, args.requests)
+
+    def plain():
+        for path in paths:
+            response = requests.get(f"{base_url}{path}", headers={"X-TBA-Auth-Key": "stub"}, timeout=10)
+            response.raise_for_status()
+            response.json()
+
+    def with_client(client, revalidate):
+        for path in paths:
+            client.get(path, revalidate=revalidate)
+
+    cache_path = os.path.join(tempfile.mkdtemp(), 'tba_cache.db')
+    methods = {}
+    for name, max_age in (('plain', 0), ('session', 0), ('background', 0), ('max_age', args.max_age), ('offline', 0)):
+        settings['max_age'] = max_age
+        received.update({'200': 0, '304': 0})
+        if name == 'offline':
+            server.shutdown()
+            server.server_close()
+        client = TBAClient("stub", base_url=base_url, cache=TBACache(cache_path) if name in ('max_age', 'offline') else None,
+                           background=name != 'offline')
+        _, runs = time_stage(plain if name == 'plain' else lambda: with_client(client, name in ('session', 'offline')), 1)
+        client.close()  # Background revalidations finish before the counts are read
+        methods[name] = {'seconds': runs[0], 'ms_per_call': runs[0] / len(paths) * 1000,
+                         'server_200': received['200'], 'server_304': received['304']}
+        if name != 'plain':
+            stats = client.stats()
+            methods[name]['client'] = stats.to_dict(orient='records')
+            # Every request the server saw was counted by the client, and nothing else reached it
+            assert stats['downloaded'].sum() == received['200'], (name, stats)
+            assert stats['not_modified'].sum() == received['304'], (name, stats)
+            # Background revalidations (304s here: the stub's data does not change) are calls of their own
+            background = stats['not_modified'].sum() if name == 'background' else 0
+            assert stats['calls'].sum() - background == len(paths), (name, stats)
+            if name == 'offline':
+                assert stats['offline'].sum() == len(paths), stats
+
+    commit = git_commit()
+    results = {
+        'benchmark': 'tba_client',
+        'git_commit': commit,
+        'created_at': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'params': {key: value for key, value in vars(args).items() if key != 'output'},
+        'methods': methods
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"tba_client_{commit or 'nogit'}_{args.requests}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print(f"{len(paths)} calls, {args.teams} teams, stub latency {args.latency_ms} ms")
+    for name, method in methods.items():
+        print(f"  {name:10s} {method['seconds']:8.3f}s  {method['ms_per_call']:7.2f} ms/call   "
+              f"{method['server_200']:4d} x 200  {method['server_304']:4d} x 304")
+    print(f"results written to {output}")
+
+if __name__ == "__main__":
+    main()
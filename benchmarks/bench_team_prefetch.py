@@ -0,0 +1,85 @@
+"""Time flipping through every team of an event on Team Statistics, with and without the TBA prefetch, and write the results as JSON.
+
+Runs against the local stub server of bench_tba_client.py. Run from the repository root:
+    python benchmarks/bench_team_prefetch.py --teams 40 --latency-ms 100
+
+Stages:
+    blocking_flips     one /team/frc{n} request per team switch, waiting on each (what the page did)
+    prefetch           utils.tba_api.prefetch_teams: concurrent and rate-limited into the TBA cache
+    flips_after        every team switch after the prefetch, through the same client
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+from datetime import datetime
+import requests
+
+# Add the parent directory to the Python path to ensure utils can be found
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bench_pipeline import git_commit, time_stage, RESULTS_DIR
+from bench_tba_client import make_payloads, start_stub
+from utils.tba_api import TBAClient, prefetch_teams, TBA_PREFETCH_RATE
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--teams', type=int, default=40)
+    parser.add_argument('--latency-ms', type=float, default=100, help='delay the stub adds to every response')
+    parser.add_argument('--workers', type=int, default=8, help='concurrent prefetch requests')
+    parser.add_argument('--rate', type=float, default=TBA_PREFETCH_RATE, help='prefetch requests per second')
+    parser.add_argument('--max-age', type=int, default=60, help='max-age of the team records')
+    parser.add_argument('--output', help='JSON file to write (default: benchmarks/results/team_prefetch_<commit>_<teams>.json)')
+    args = parser.parse_args()
+
+    settings = {'max_age': args.max_age, 'latency': args.latency_ms / 1000}
+    server, received = start_stub(make_payloads(args.teams), settings)
+    base_url = f"http://127.0.0.1:{server.server_port}/api/v3"
+    teams = list(range(1, args.teams + 1))
+
+    def blocking_flips():
+        for team in teams:
+            requests.get(f"{base_url}/team/frc{team}", headers={"X-TBA-Auth-Key": "stub"}, timeout=10).json()
+
+    stages = {}
+    _, runs = time_stage(blocking_flips, 1)
+    stages['blocking_flips'] = {'seconds': runs[0], 'ms_per_switch': runs[0] / len(teams) * 1000}
+
+    client = TBAClient("stub", base_url=base_url)
+    received.update({'200': 0, '304': 0})
+    errors, runs = time_stage(lambda: prefetch_teams(client, teams, args.workers, args.rate), 1)
+    assert not errors, errors
+    # The limiter spaces the requests 1/rate apart
+    assert runs[0] >= (len(teams) - 1) / args.rate, runs
+    stages['prefetch'] = {'seconds': runs[0], 'server': dict(received)}
+
+    received.update({'200': 0, '304': 0})
+    _, runs = time_stage(lambda: [client.get(f"/team/frc{team}") for team in teams], 1)
+    stages['flips_after'] = {'seconds': runs[0], 'ms_per_switch': runs[0] / len(teams) * 1000, 'server': dict(received)}
+    assert received['200'] + received['304'] == 0
+    client.close()
+    server.shutdown()
+
+    commit = git_commit()
+    results = {
+        'benchmark': 'team_prefetch',
+        'git_commit': commit,
+        'created_at': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'params': {key: value for key, value in vars(args).items() if key != 'output'},
+        'stages': stages
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"team_prefetch_{commit or 'nogit'}_{args.teams}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print(f"{args.teams} teams, stub latency {args.latency_ms} ms, {args.workers} workers at {args.rate} requests/s")
+    for name, stage in stages.items():
+        per_switch = f"   {stage['ms_per_switch']:8.2f} ms per team switch" if 'ms_per_switch' in stage else ''
+        print(f"  {name:15s} {stage['seconds']:8.3f}s{per_switch}")
+    print(f"results written to {output}")
+
+if __name__ == "__main__":
+    main()
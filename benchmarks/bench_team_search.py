@@ -0,0 +1,140 @@
+"""Time loading and searching the TBA team directory, before and after utils.team_index, and write the results as JSON.
+
+Runs against the local stub server of bench_tba_client.py serving synthetic
+/teams/{page}/simple pages (500 teams each). Run from the repository root:
+    python benchmarks/bench_team_search.py --teams 10000 --latency-ms 50
+
+Stages:
+    sequential_pages   every page fetched one after another with requests.get (what search_teams did)
+    concurrent_pages   utils.team_index.fetch_team_pages through a TBAClient
+    revalidate_pages   the same again once max-age has passed: every page comes back as 304
+    linear_search      the old substring scan over every team, per query
+    index_build        TeamIndex over the fetched teams
+    index_search       TeamIndex.search, per query (results checked against linear_search)
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+from datetime import datetime
+import requests
+
+# Add the parent directory to the Python path to ensure utils can be found
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bench_pipeline import git_commit, time_stage, RESULTS_DIR
+from bench_tba_client import start_stub
+from utils.tba_api import TBAClient
+from utils.team_index import TeamIndex, fetch_team_pages
+
+WORDS = ['Robo', 'Tech', 'Titans', 'Gear', 'Bots', 'Cyber', 'Storm', 'Falcons', 'Iron', 'Lions', 'Spartans',
+         'Thunder', 'Wolves', 'Byte', 'Knights', 'Dragons', 'Circuit', 'Pirates', 'Rockets', 'Eagles']
+QUERIES = ['4270', '42', '1', 'robo', 'storm', 'high school', 'tech titans', 'zzz', 'ea', 'foundation']
+
+def make_teams(count, seed):
+    rng = random.Random(seed)
+    numbers = sorted(rng.sample(range(1, count * 11 // 10), count))
+    return [{'key': f'frc{n}', 'team_number': n, 'nickname': ' '.join(rng.sample(WORDS, 2)),
+             'name': f"{rng.choice(WORDS)} Foundation & {rng.choice(WORDS)} High School",
+             'city': 'Honolulu', 'state_prov': 'HI', 'country': 'USA'} for n in numbers]
+
+def team_pages(teams, empty_pages):
+    # TBA pages hold the teams with number // 500 == page, and answer [] past the last one
+    pages = {}
+    for team in teams:
+        pages.setdefault(team['team_number'] // 500, []).append(team)
+    return {f'/teams/{page}/simple': json.dumps(pages.get(page, [])).encode()
+            for page in range(max(pages) + 1 + empty_pages)}
+
+def linear_search(teams, query):
+    # The substring scan search_teams did before utils.team_index
+    found = []
+    for team in teams:
+        if (query.lower() in str(team.get('team_number', '')).lower() or
+                query.lower() in team.get('nickname', '').lower() or
+                query.lower() in team.get('name', '').lower()):
+            found.append(team)
+    return found
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--teams', type=int, default=10000)
+    parser.add_argument('--latency-ms', type=float, default=50, help='delay the stub adds to every response')
+    parser.add_argument('--workers', type=int, default=8, help='concurrent page requests')
+    parser.add_argument('--repeat', type=int, default=20, help='runs of every search')
+    parser.add_argument('--seed', type=int, default=4270)
+    parser.add_argument('--output', help='JSON file to write (default: benchmarks/results/team_search_<commit>_<teams>.json)')
+    args = parser.parse_args()
+
+    teams = make_teams(args.teams, args.seed)
+    payloads = team_pages(teams, args.workers)
+    settings = {'max_age': 0, 'latency': args.latency_ms / 1000}
+    server, received = start_stub(payloads, settings)
+    base_url = f"http://127.0.0.1:{server.server_port}/api/v3"
+
+    def sequential():
+        fetched, page = [], 0
+        while True:
+            page_teams = requests.get(f"{base_url}/teams/{page}/simple", headers={"X-TBA-Auth-Key": "stub"}, timeout=10).json()
+            if not page_teams:
+                return fetched
+            fetched.extend(page_teams)
+            page += 1
+
+    stages = {}
+
+    def record(name, func, repeat=1):
+        result, runs = time_stage(func, repeat)
+        stages[name] = {'seconds': min(runs), 'runs': runs}
+        return result
+
+    fetched = record('sequential_pages', sequential)
+    client = TBAClient("stub", base_url=base_url, background=False)
+    received.update({'200': 0, '304': 0})
+    concurrent = record('concurrent_pages', lambda: fetch_team_pages(client, args.workers))
+    stages['concurrent_pages']['server'] = dict(received)
+    received.update({'200': 0, '304': 0})
+    record('revalidate_pages', lambda: fetch_team_pages(client, args.workers))
+    stages['revalidate_pages']['server'] = dict(received)
+    server.shutdown()
+    assert fetched == concurrent == teams
+
+    index = record('index_build', lambda: TeamIndex(concurrent))
+    searches = {}
+    for query in QUERIES:
+        expected, linear_runs = time_stage(lambda: linear_search(teams, query), args.repeat)
+        found, index_runs = time_stage(lambda: index.search(query), args.repeat)
+        # Same teams; the index ranks number matches first
+        assert sorted(team['team_number'] for team in found) == [team['team_number'] for team in expected], query
+        searches[query] = {'matches': len(found), 'linear_ms': min(linear_runs) * 1000, 'index_ms': min(index_runs) * 1000}
+    stages['linear_search'] = {'seconds': sum(s['linear_ms'] for s in searches.values()) / 1000 / len(QUERIES)}
+    stages['index_search'] = {'seconds': sum(s['index_ms'] for s in searches.values()) / 1000 / len(QUERIES)}
+
+    commit = git_commit()
+    results = {
+        'benchmark': 'team_search',
+        'git_commit': commit,
+        'created_at': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'params': {key: value for key, value in vars(args).items() if key != 'output'},
+        'pages': len(payloads) - args.workers,
+        'stages': stages,
+        'searches': searches
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"team_search_{commit or 'nogit'}_{args.teams}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print(f"{args.teams} teams in {len(payloads) - args.workers} pages, stub latency {args.latency_ms} ms, {args.workers} workers")
+    for name, stage in stages.items():
+        print(f"  {name:18s} {stage['seconds'] * 1000:10.2f} ms" + (f"   server {stage['server']}" if 'server' in stage else ''))
+    for query, search in searches.items():
+        print(f"  {query!r:16s} {search['matches']:6d} matches   linear {search['linear_ms']:7.2f} ms   index {search['index_ms']:7.2f} ms")
+    print(f"results written to {output}")
+
+if __name__ == "__main__":
+    main()
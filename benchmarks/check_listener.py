@@ -0,0 +1,129 @@
+"""Check that the collection listener delivers added, modified and removed documents to
+load_collection() and bumps the collection version, and time how long each takes.
+
+Runs against the Firestore emulator when FIRESTORE_EMULATOR_HOST is set, otherwise
+against a temporary SQLite store (utils.storage.SQLiteStorage, whose on_snapshot
+polls the changes log). Run from the repository root:
+    firebase emulators:start --only firestore        # in another terminal
+    FIRESTORE_EMULATOR_HOST=localhost:8080 python benchmarks/check_listener.py
+    python benchmarks/check_listener.py --backend sqlite
+
+Exits with status 1 if a change does not reach the cache within --timeout seconds.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# Add the parent directory to the Python path to ensure utils can be found
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bench_pipeline import git_commit, RESULTS_DIR
+from bench_bulk_move import clear
+from utils.storage import SQLiteStorage
+from utils.utils import (
+    MATCH_SCOUT_COLLECTION, start_collection_listener, load_collection, get_collection_version, LISTENER_READY_TIMEOUT
+)
+
+def connect(backend, project):
+    if backend == 'emulator':
+        from google.cloud import firestore
+        return firestore.Client(project=project)
+    path = os.path.join(tempfile.mkdtemp(prefix='check_listener_'), 'scouting.db')
+    # load_collection() opens the same file through get_storage()
+    os.environ['SCOUTING_STORAGE'], os.environ['SCOUTING_SQLITE_PATH'] = 'sqlite', path
+    return SQLiteStorage(path)
+
+def row(team, match, points):
+    return {'team_number': team, 'match_number': match, 'alliance_color': 'Red', 'event_key': '2025test',
+            'auto_coral_l1': points, 'timestamp': datetime.now().isoformat()}
+
+def wait_for(check, version, timeout):
+    """Seconds until check(load_collection()) holds and the version moved past version, or None."""
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        if get_collection_version(MATCH_SCOUT_COLLECTION) != version and check(load_collection(MATCH_SCOUT_COLLECTION)):
+            return time.perf_counter() - start
+        time.sleep(0.01)
+    return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--backend', choices=['auto', 'emulator', 'sqlite'], default='auto',
+                        help='auto: the emulator if FIRESTORE_EMULATOR_HOST is set, else sqlite')
+    parser.add_argument('--project', default='demo-scouting', help='emulator project id')
+    parser.add_argument('--docs', type=int, default=200, help='match records present before the listener starts')
+    parser.add_argument('--timeout', type=float, default=10.0, help='seconds a change may take to reach the cache')
+    parser.add_argument('--output', help='JSON file to write (default: benchmarks/results/listener_<commit>_<backend>.json)')
+    args = parser.parse_args()
+
+    backend = args.backend
+    if backend == 'auto':
+        backend = 'emulator' if os.environ.get('FIRESTORE_EMULATOR_HOST') else 'sqlite'
+    db = connect(backend, args.project)
+    collection = db.collection(MATCH_SCOUT_COLLECTION)
+    clear(db, MATCH_SCOUT_COLLECTION)
+    for start in range(0, args.docs, 500):
+        batch = db.batch()
+        for i in range(start, min(start + 500, args.docs)):
+            batch.set(collection.document(f"seed_{i}"), row(str(1000 + i % 60), i // 6 + 1, i % 5))
+        batch.commit()
+
+    start = time.perf_counter()
+    ready = start_collection_listener(MATCH_SCOUT_COLLECTION, db)
+    if not ready.wait(LISTENER_READY_TIMEOUT):
+        print(f"listener delivered no snapshot within {LISTENER_READY_TIMEOUT}s")
+        sys.exit(1)
+    steps = {'first_snapshot': time.perf_counter() - start}
+    if len(load_collection(MATCH_SCOUT_COLLECTION)) != args.docs:
+        print(f"first snapshot holds {len(load_collection(MATCH_SCOUT_COLLECTION))} of {args.docs} documents")
+        sys.exit(1)
+
+    def ids(df):
+        return set(df['doc_id']) if 'doc_id' in df.columns else set()
+
+    changes = [
+        ('added', lambda: collection.document('check_new').set(row('4270', 999, 3)),
+         lambda df: 'check_new' in ids(df)),
+        ('modified', lambda: collection.document('check_new').update({'auto_coral_l1': 7}),
+         lambda df: (df.loc[df['doc_id'] == 'check_new', 'auto_coral_l1'] == 7).any()),
+        ('removed', lambda: collection.document('check_new').delete(),
+         lambda df: 'check_new' not in ids(df) and len(df) == args.docs)
+    ]
+    failed = []
+    for name, write, check in changes:
+        version = get_collection_version(MATCH_SCOUT_COLLECTION)
+        write()
+        steps[name] = wait_for(check, version, args.timeout)
+        if steps[name] is None:
+            failed.append(name)
+
+    commit = git_commit()
+    results = {
+        'benchmark': 'listener',
+        'git_commit': commit,
+        'created_at': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'backend': backend,
+        'params': {key: value for key, value in vars(args).items() if key != 'output'},
+        'seconds': steps,
+        'failed': failed
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"listener_{commit or 'nogit'}_{backend}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print(f"{args.docs} match records on {backend}")
+    for name, seconds in steps.items():
+        print(f"  {name:15s} " + (f"{seconds:8.3f}s" if seconds is not None else "  not seen"))
+    print(f"results written to {output}")
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
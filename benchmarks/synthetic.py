@@ -0,0 +1,108 @@
+"""Synthetic match scouting data with the schema of Past_Scout_Data/MatchScout2025HIHO.csv.
+
+make_events(n_events, n_matches) returns one row per robot per qualification
+match: n_events x n_matches x 6 rows, each tagged with its event_key. Count columns follow the averages of the
+sample CSV; a small share of rows can be corrupted so that error inspection has
+something to report.
+"""
+import os
+import sys
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+
+# Add the parent directory to the Python path to ensure utils can be found
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.schema import MATCH_SCHEMA, MATCH_FORM_SECTIONS, iter_form_fields
+
+SAMPLE_CSV = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                          'Past_Scout_Data', 'MatchScout2025HIHO.csv')
+ROBOTS_PER_ALLIANCE = 3
+TEAMS_PER_EVENT = 40
+SCOUTERS = ['Marcus', 'Colt', 'Piper', 'Kai', 'Leilani', 'Noa', 'Makoa', 'Ava']
+WORDS = ['fast', 'slow', 'defense', 'coral', 'algae', 'reef', 'barge', 'climb', 'missed', 'scored',
+         'driver', 'auto', 'path', 'intake', 'stuck', 'pushed', 'cage', 'consistent', 'penalty', 'good']
+
+def sample_columns():
+    """Column order and per-column averages of the sample CSV (form order and defaults if it is missing)."""
+    if not os.path.exists(SAMPLE_CSV):
+        return ['timestamp'] + list(MATCH_SCHEMA), {}
+    sample = pd.read_csv(SAMPLE_CSV)
+    means = sample.select_dtypes('number').mean().to_dict()
+    return list(sample.columns), means
+
+def _free_text(rng, n, max_words=25):
+    lengths = rng.integers(0, max_words, n)
+    words = rng.choice(WORDS, lengths.sum())
+    texts = np.split(words, np.cumsum(lengths)[:-1])
+    return [' '.join(text) for text in texts]
+
+def make_event(event_index, n_matches, rng, means):
+    """Rows for one event: every qualification match has 3 red and 3 blue robots.
+
+    Match numbers start at 1 in every event, as at real events; the rows carry an
+    event_key (2025syn0, 2025syn1, ...) and the metrics group alliances by event and match.
+    """
+    teams = rng.choice(np.arange(1, 10000), TEAMS_PER_EVENT, replace=False)
+    n = n_matches * 2 * ROBOTS_PER_ALLIANCE
+    schedule = np.concatenate([rng.choice(teams, 2 * ROBOTS_PER_ALLIANCE, replace=False) for _ in range(n_matches)])
+    match_numbers = np.repeat(np.arange(1, n_matches + 1), 2 * ROBOTS_PER_ALLIANCE)
+    alliance = np.tile(['Red'] * ROBOTS_PER_ALLIANCE + ['Blue'] * ROBOTS_PER_ALLIANCE, n_matches)
+    red_won = np.repeat(rng.random(n_matches) < 0.5, 2 * ROBOTS_PER_ALLIANCE)
+    start = datetime(2025, 3, 1) + timedelta(days=7 * event_index)
+
+    data = {
+        'timestamp': [(start + timedelta(seconds=int(s))).isoformat() for s in np.sort(rng.integers(0, 3 * 86400, n))],
+        'event_key': f"2025syn{event_index}",
+        'team_number': schedule,
+        'match_number': match_numbers,
+        'alliance_color': alliance,
+        'match_outcome': np.where((alliance == 'Red') == red_won, 'Won', 'Lost')
+    }
+    for field in iter_form_fields(MATCH_FORM_SECTIONS):
+        name = field['name']
+        if name in data:
+            continue
+        if name == 'scouter_name':
+            data[name] = rng.choice(SCOUTERS, n)
+        elif field['type'] == 'number':
+            data[name] = rng.poisson(max(means.get(name, 1.0), 0.01), n)
+        elif field['type'] == 'slider':
+            data[name] = rng.integers(field.get('min', 1), field.get('max', 5) + 1, n)
+        elif field['type'] == 'checkbox':
+            data[name] = rng.random(n) < 0.8
+        elif field.get('options'):
+            data[name] = rng.choice(field['options'], n)
+        else:
+            data[name] = _free_text(rng, n)
+    return pd.DataFrame(data)
+
+def corrupt(df, rng, error_rate):
+    """Blank, non-numeric, negative and out-of-range values plus duplicate rows in error_rate of the rows."""
+    n_bad = int(len(df) * error_rate)
+    if n_bad == 0:
+        return df
+    df = df.astype({'scouter_name': object, 'auto_coral_l1': object, 'teleop_coral_l2': object, 'speed_rating': object})
+    df.loc[rng.choice(df.index, n_bad), 'scouter_name'] = ''
+    df.loc[rng.choice(df.index, n_bad), 'auto_coral_l1'] = 'two'
+    df.loc[rng.choice(df.index, n_bad), 'teleop_coral_l2'] = -1
+    df.loc[rng.choice(df.index, n_bad), 'speed_rating'] = 7
+    duplicates = df.loc[rng.choice(df.index, n_bad)]
+    return pd.concat([df, duplicates], ignore_index=True)
+
+def make_events(n_events, n_matches, seed=4270, error_rate=0.0):
+    """n_events x n_matches qualification matches x 6 robots, in the sample CSV's column order
+    (plus event_key, which the sample does not have)."""
+    rng = np.random.default_rng(seed)
+    columns, means = sample_columns()
+    df = pd.concat([make_event(i, n_matches, rng, means) for i in range(n_events)], ignore_index=True)
+    df = corrupt(df, rng, error_rate)
+    return df[columns + [col for col in ['event_key'] if col not in columns]]
+
+def to_documents(df):
+    """Rows as the dicts Firestore returns from to_dict(), each with a 'doc_id'."""
+    records = df.to_dict('records')
+    for i, record in enumerate(records):
+        record['doc_id'] = f"team{record['team_number']}_match{record['match_number']}_{i}"
+    return records
@@ -3,7 +3,7 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import hashlib
-from utils.utils import load_data, load_pit_data, calculate_match_score, setup_sidebar_navigation, PAGE_CONFIG, get_firebase_instances
+from utils.utils import load_data, load_pit_data, calculate_match_scores, setup_sidebar_navigation, PAGE_CONFIG, get_storage
 
 # Set page configuration as the first command
 st.set_page_config(
@@ -27,7 +27,7 @@ st.set_option('client.showErrorDetails', False)
 
 # Initialize Firebase using the utility function
 try:
-    db, bucket = get_firebase_instances()
+    db, bucket = get_storage()
     st.session_state.firebase_db = db
     st.session_state.firebase_bucket = bucket
 except Exception as e:
@@ -138,7 +138,7 @@ if accessible_pages:
 # Display recent matches
 def display_recent_matches():
     try:
-        df = load_data()
+        df = load_data(columns='scoring')
         if df is not None and not df.empty:
             # Calculate scores if possible
             required_columns = [
@@ -152,8 +152,7 @@ def display_recent_matches():
             if all(col in df.columns for col in required_columns):
                 # Only calculate scores if they don't already exist
                 if not all(col in df.columns for col in score_columns):
-                    scores = df.apply(calculate_match_score, axis=1)
-                    df[score_columns] = scores
+                    df[score_columns] = calculate_match_scores(df)
             else:
                 st.warning("Match scores not calculated due to missing data.")
 
@@ -184,7 +183,7 @@ def display_recent_matches():
 # Display quick stats for match scouting
 def display_quick_stats_match():
     try:
-        df = load_data()
+        df = load_data(columns='scoring')
         if df is not None and not df.empty:
             # Calculate scores if possible
             required_columns = [
@@ -198,8 +197,7 @@ def display_quick_stats_match():
             if all(col in df.columns for col in required_columns):
                 # Only calculate scores if they don't already exist
                 if not all(col in df.columns for col in score_columns):
-                    scores = df.apply(calculate_match_score, axis=1)
-                    df[score_columns] = scores
+                    df[score_columns] = calculate_match_scores(df)
             else:
                 st.warning("Match scores not calculated due to missing data.")
 
@@ -229,7 +227,7 @@ def display_quick_stats_match():
 # Display quick stats for pit scouting
 def display_quick_stats_pit():
     try:
-        df = load_pit_data()
+        df = load_pit_data(columns='scoring')
         if df is not None and not df.empty:
             st.subheader("Pit Scouting Quick Stats")
             col1, col2, col3 = st.columns(3)
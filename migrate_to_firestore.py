@@ -1,21 +1,50 @@
 # migrate_to_firestore.py
-import pandas as pd
+# Import scouting CSVs (by default every file in Past_Scout_Data) with the streaming
+# import pipeline in utils/csv_import.py. Re-running after a failure resumes the import.
+#   python migrate_to_firestore.py                              # Firestore, firestore-key.json
+#   python migrate_to_firestore.py data.csv --kind pit --collection pit_scout_data --event 2025hiho
+#   SCOUTING_STORAGE=sqlite python migrate_to_firestore.py      # local SQLite store
+# Rows without an event_key column get --event, or the event in the file name
+# (MatchScout2025HIHO.csv -> 2025hiho); without either they keep ids scoped to the file.
+# Rows with validation errors are imported and flagged for review unless --skip-invalid.
+import argparse
+import glob
+import os
 from google.cloud import firestore
-from google.oauth2 import service_account
-import streamlit as st
+from utils.storage import SQLiteStorage, storage_settings
+from utils.csv_import import import_csv
+from utils.summaries import rebuild_team_summaries
 
-# Initialize Firestore
-db = firestore.Client.from_service_account_json("firestore-key.json")
-COLLECTION_NAME = "scouting_data"
+parser = argparse.ArgumentParser(description="Import scouting CSV files into Firestore.")
+parser.add_argument('paths', nargs='*', help="CSV files (default: Past_Scout_Data/*.csv)")
+parser.add_argument('--kind', choices=['match', 'pit'], default='match')
+parser.add_argument('--collection', help="target collection (default: match_scout_data or pit_scout_data)")
+parser.add_argument('--key', default="firestore-key.json", help="service account key for Firestore")
+parser.add_argument('--event', help="event key of rows without one (default: from the file name, e.g. 2025hiho)")
+parser.add_argument('--skip-invalid', action='store_true', help="leave out rows with validation errors")
+args = parser.parse_args()
 
-# Load existing data from scouting_data.csv
-df = pd.read_csv("scouting_data.csv")
+# Initialize storage
+backend, sqlite_path = storage_settings()
+if backend == "sqlite":
+    db = SQLiteStorage(sqlite_path)
+else:
+    db = firestore.Client.from_service_account_json(args.key)
+collection = args.collection or f"{args.kind}_scout_data"
+paths = args.paths or sorted(glob.glob(os.path.join("Past_Scout_Data", "*.csv")))
 
-# Migrate each row to Firestore
-for _, row in df.iterrows():
-    match_data = row.to_dict()
-    # Convert NaN to None for Firestore compatibility
-    match_data = {k: (None if pd.isna(v) else v) for k, v in match_data.items()}
-    db.collection(COLLECTION_NAME).add(match_data)
+for path in paths:
+    result = import_csv(db, collection, path, args.kind, skip_invalid=args.skip_invalid, event_key=args.event)
+    if not result['event_key']:
+        print(f"{path}: no event given or in the file name; rows without an event_key keep ids scoped to this file")
+    print(f"{path}: {result['written']} of {result['rows']} rows written to {collection} "
+          f"in {result['batches']} batches ({result['seconds']:.2f}s)"
+          + (f", {result['resumed']} resumed" if result['resumed'] else ""))
+    if not result['errors'].empty:
+        print(f"  {result['invalid']} rows with errors ({'left out' if args.skip_invalid else 'imported and flagged'}):")
+        print(result['errors'].to_string(index=False, max_rows=20))
 
-print("Data migration to Firestore completed successfully!")
\ No newline at end of file
+if args.kind == 'match' and collection == 'match_scout_data' and paths:
+    # Imported rows bypass the team summaries
+    print(f"Team summaries rebuilt for {rebuild_team_summaries(db)} teams.")
+print("Data migration to Firestore completed successfully!")
@@ -3,7 +3,8 @@ import streamlit as st
 import pandas as pd
 from utils.form_config import MATCH_INFO, AUTONOMOUS, TELEOP, ENDGAME, PERFORMANCE_RATINGS, ANALYSIS, MATCH_OUTCOME, STRATEGY
 from utils.form_config import PIT_INFO, ROBOT_SPECIFICATIONS, CAPABILITIES, PIT_STRATEGY, PIT_NOTES
-from utils.utils import save_data, setup_sidebar_navigation, upload_photo_to_storage, get_firebase_instances
+from utils.utils import save_data, setup_sidebar_navigation, upload_photo_to_storage, get_storage
+from utils.validation import flagged_errors, MATCH_RULES, PIT_RULES
 
 # Set page configuration
 st.set_page_config(
@@ -15,7 +16,7 @@ st.set_page_config(
 
 # Initialize Firebase
 try:
-    db, bucket = get_firebase_instances()
+    db, bucket = get_storage()
     st.session_state.firebase_db = db
     st.session_state.firebase_bucket = bucket
 except Exception as e:
@@ -875,172 +876,43 @@ st.markdown("---")
 st.header("Inspect Scouting Data Errors")
 st.markdown("This section allows you to inspect potential errors in the submitted Match Scouting and Pit Scouting data.")
 
-# Define required fields and expected types
-match_required_fields = [
-    "team_number", "match_number", "scouter_name", "alliance_color",
-    "starting_position", "match_outcome", "primary_role"
-]
-match_numeric_fields = [
-    "team_number", "match_number",
-    "auto_coral_l1_scored", "auto_coral_l2_scored", "auto_coral_l3_scored", "auto_coral_l4_scored",
-    "auto_coral_l1_missed", "auto_coral_l2_missed", "auto_coral_l3_missed", "auto_coral_l4_missed",
-    "auto_algae_to_barge", "auto_algae_to_processor", "auto_algae_to_barge_missed", "auto_algae_to_processor_missed",
-    "auto_algae_removed",
-    "teleop_coral_l1_scored", "teleop_coral_l2_scored", "teleop_coral_l3_scored", "teleop_coral_l4_scored",
-    "teleop_coral_l1_missed", "teleop_coral_l2_missed", "teleop_coral_l3_missed", "teleop_coral_l4_missed",
-    "teleop_algae_to_barge", "teleop_algae_to_processor", "teleop_algae_to_barge_missed", "teleop_algae_to_processor_missed",
-    "teleop_algae_removed",
-    "offensive_rating", "defensive_rating", "mobility_rating", "driver_skill_rating"
-]
-match_rating_fields = [
-    "offensive_rating", "defensive_rating", "mobility_rating", "driver_skill_rating"
-]
-
-pit_required_fields = [
-    "team_number", "scouter_name", "drivetrain_type", "endgame_capability", "preferred_role"
-]
-pit_numeric_fields = ["team_number"]
-
-# Function to fetch data
-def fetch_data(collection_name):
+# Function to fetch the errors of a collection: the records flagged when they were
+# saved, duplicates included (see utils.validation), without downloading the collection
+def fetch_errors(collection_name, rules):
     try:
-        db, _ = get_firebase_instances()
-        docs = db.collection(collection_name).stream()
-        data = []
-        for doc in docs:
-            doc_data = doc.to_dict()
-            doc_data['doc_id'] = doc.id
-            data.append(doc_data)
-        return pd.DataFrame(data)
+        return flagged_errors(db, collection_name, rules)
     except Exception as e:
-        st.error(f"Error fetching data from {collection_name}: {e}")
-        return pd.DataFrame()
-
-# Function to inspect errors
-def inspect_scouting_errors(data, required_fields, numeric_fields, rating_fields=None, duplicate_fields=None):
-    errors = []
-    
-    for idx, row in data.iterrows():
-        doc_id = row.get('doc_id', 'Unknown')
-        
-        # Check for missing required fields
-        for field in required_fields:
-            if field not in row or pd.isna(row[field]):
-                errors.append({
-                    "doc_id": doc_id,
-                    "error_type": "Missing Required Field",
-                    "field": field,
-                    "value": None,
-                    "message": f"Required field '{field}' is missing or None"
-                })
-        
-        # Check for invalid data types in numeric fields
-        for field in numeric_fields:
-            if field in row and not pd.isna(row[field]):
-                if not isinstance(row[field], (int, float)) or isinstance(row[field], bool):
-                    errors.append({
-                        "doc_id": doc_id,
-                        "error_type": "Invalid Data Type",
-                        "field": field,
-                        "value": row[field],
-                        "message": f"Field '{field}' should be a number, got {type(row[field])}"
-                    })
-                # Check for negative values in counts
-                if field not in (rating_fields or []) and row[field] < 0:
-                    errors.append({
-                        "doc_id": doc_id,
-                        "error_type": "Out of Range",
-                        "field": field,
-                        "value": row[field],
-                        "message": f"Field '{field}' should not be negative"
-                    })
-        
-        # Check rating fields (1-5)
-        if rating_fields:
-            for field in rating_fields:
-                if field in row and not pd.isna(row[field]):
-                    if not isinstance(row[field], (int, float)):
-                        errors.append({
-                            "doc_id": doc_id,
-                            "error_type": "Invalid Data Type",
-                            "field": field,
-                            "value": row[field],
-                            "message": f"Rating field '{field}' should be a number, got {type(row[field])}"
-                        })
-                    elif row[field] < 1 or row[field] > 5:
-                        errors.append({
-                            "doc_id": doc_id,
-                            "error_type": "Out of Range",
-                            "field": field,
-                            "value": row[field],
-                            "message": f"Rating field '{field}' should be between 1 and 5"
-                        })
-    
-    # Check for duplicates
-    if duplicate_fields and not data.empty:
-        duplicates = data.duplicated(subset=duplicate_fields, keep=False)
-        for idx, is_duplicate in enumerate(duplicates):
-            if is_duplicate:
-                row = data.iloc[idx]
-                doc_id = row.get('doc_id', 'Unknown')
-                duplicate_values = {field: row[field] for field in duplicate_fields}
-                errors.append({
-                    "doc_id": doc_id,
-                    "error_type": "Duplicate Entry",
-                    "field": ", ".join(duplicate_fields),
-                    "value": duplicate_values,
-                    "message": f"Duplicate entry for {duplicate_values}"
-                })
-    
-    return pd.DataFrame(errors)
+        st.error(f"Error fetching data errors from {collection_name}: {e}")
+        return None
 
 # Inspect Match Scouting Data
 st.subheader("Match Scouting Data Errors")
-match_data = fetch_data("match_scout_data")
-if not match_data.empty:
-    match_errors = inspect_scouting_errors(
-        match_data,
-        required_fields=match_required_fields,
-        numeric_fields=match_numeric_fields,
-        rating_fields=match_rating_fields,
-        duplicate_fields=["team_number", "match_number"]
+match_errors = fetch_errors("match_scout_data", MATCH_RULES)
+if match_errors is not None and not match_errors.empty:
+    st.dataframe(match_errors, use_container_width=True)
+    csv = match_errors.to_csv(index=False)
+    st.download_button(
+        label="Download Match Scouting Errors as CSV",
+        data=csv,
+        file_name="match_scouting_errors.csv",
+        mime="text/csv",
+        key="download_match_errors_csv"
     )
-    if not match_errors.empty:
-        st.dataframe(match_errors, use_container_width=True)
-        csv = match_errors.to_csv(index=False)
-        st.download_button(
-            label="Download Match Scouting Errors as CSV",
-            data=csv,
-            file_name="match_scouting_errors.csv",
-            mime="text/csv",
-            key="download_match_errors_csv"
-        )
-    else:
-        st.success("No errors found in the Match Scouting data.")
-else:
-    st.info("No Match Scouting data available to inspect.")
+elif match_errors is not None:
+    st.success("No errors found in the Match Scouting data.")
 
 # Inspect Pit Scouting Data
 st.subheader("Pit Scouting Data Errors")
-pit_data = fetch_data("pit_scout_data")
-if not pit_data.empty:
-    pit_errors = inspect_scouting_errors(
-        pit_data,
-        required_fields=pit_required_fields,
-        numeric_fields=pit_numeric_fields,
-        duplicate_fields=["team_number"]
+pit_errors = fetch_errors("pit_scout_data", PIT_RULES)
+if pit_errors is not None and not pit_errors.empty:
+    st.dataframe(pit_errors, use_container_width=True)
+    csv = pit_errors.to_csv(index=False)
+    st.download_button(
+        label="Download Pit Scouting Errors as CSV",
+        data=csv,
+        file_name="pit_scouting_errors.csv",
+        mime="text/csv",
+        key="download_pit_errors_csv"
     )
-    if not pit_errors.empty:
-        st.dataframe(pit_errors, use_container_width=True)
-        csv = pit_errors.to_csv(index=False)
-        st.download_button(
-            label="Download Pit Scouting Errors as CSV",
-            data=csv,
-            file_name="pit_scouting_errors.csv",
-            mime="text/csv",
-            key="download_pit_errors_csv"
-        )
-    else:
-        st.success("No errors found in the Pit Scouting data.")
-else:
-    st.info("No Pit Scouting data available to inspect.")
\ No newline at end of file
+elif pit_errors is not None:
+    st.success("No errors found in the Pit Scouting data.")
@@ -13,7 +13,9 @@ sys.path.append(parent_dir)
 
 # Try importing from utils.utils
 try:
-    from utils.utils import setup_sidebar_navigation, load_data, load_pit_data, calculate_match_score, get_firebase_instances
+    from utils.utils import setup_sidebar_navigation, load_pit_data, get_storage, get_collection_version, rerun_on_collection_change, describe_collection_load, MATCH_SCOUT_COLLECTION, PIT_SCOUT_COLLECTION
+    from utils.metrics import load_enriched_match_data, MATCH_SCORING_COLUMNS
+    from utils.export import export_controls
     print("Successfully imported from utils.utils")
 except ImportError as e:
     print(f"Failed to import from utils.utils: {e}")
@@ -24,7 +26,7 @@ st.set_page_config(page_title="Data Analysis", page_icon="📊", layout="wide",
 
 # Get Firebase instances after setting page config
 try:
-    db, bucket = get_firebase_instances()
+    db, bucket = get_storage()
     st.session_state.firebase_db = db
     st.session_state.firebase_bucket = bucket
 except Exception as e:
@@ -41,7 +43,7 @@ setup_sidebar_navigation()
 
 # Page content
 st.title("📊 Data Analysis")
-st.info("This page automatically updates every 30 seconds to reflect new scouting data. Use the button below to refresh manually.")
+st.info("This page automatically updates as soon as new scouting data arrives. Use the button below to refresh manually.")
 
 # Track the active page
 if 'active_page' not in st.session_state:
@@ -50,7 +52,7 @@ if 'active_page' not in st.session_state:
 # Set the active page to "Data Analysis" when this page is loaded
 st.session_state.active_page = "Data Analysis"
 
-# Function to fetch both match and pit scouting data with 30-second polling and manual refresh
+# Function to fetch both match and pit scouting data; re-fetched only when the shared cache changes
 def fetch_data(force_refresh=False):
     # Initialize data in session state if not present
     if 'match_data' not in st.session_state:
@@ -58,23 +60,22 @@ def fetch_data(force_refresh=False):
     if 'pit_data' not in st.session_state:
         st.session_state.pit_data = None
     
-    # Initialize last fetch time if not present
-    if 'last_fetch_time_analysis' not in st.session_state:
-        st.session_state.last_fetch_time_analysis = 0
-    
     # Only fetch if we're on the Data Analysis page or if force_refresh is True
     if st.session_state.active_page != "Data Analysis" and not force_refresh:
         return st.session_state.match_data, st.session_state.pit_data
 
-    # Fetch data if 30 seconds have passed, cache is empty, or force_refresh is True
-    current_time = time.time()
-    if force_refresh or current_time - st.session_state.last_fetch_time_analysis >= 30 or st.session_state.match_data is None or st.session_state.pit_data is None:
+    # Fetch data if the cached collections changed, cache is empty, or force_refresh is True
+    versions = [get_collection_version(MATCH_SCOUT_COLLECTION), get_collection_version(PIT_SCOUT_COLLECTION)]
+    if force_refresh or versions != st.session_state.get('data_version_analysis') or st.session_state.match_data is None or st.session_state.pit_data is None:
         try:
-            match_df = load_data()  # Uses st.session_state.firebase_db
-            pit_df = load_pit_data()  # Uses st.session_state.firebase_db
+            # Served from the process-wide cache, which a snapshot listener keeps current
+            # Match data comes back scored, with bonuses, EPA and success ratios
+            match_df = load_enriched_match_data(force_refresh=force_refresh, sync=True)
+            pit_df = load_pit_data(force_refresh=force_refresh, sync=True)
             st.session_state.match_data = match_df
             st.session_state.pit_data = pit_df
-            st.session_state.last_fetch_time_analysis = current_time
+            st.session_state.data_version_analysis = versions
+            current_time = time.time()
             st.session_state.fetch_log_analysis = (
                 f"Data fetched at {datetime.fromtimestamp(current_time).strftime('%Y-%m-%d %H:%M:%S')}: "
                 f"{len(match_df) if match_df is not None else 0} match records, "
@@ -100,18 +101,13 @@ with st.spinner("Loading data for analysis..."):
 # Display fetch log
 if 'fetch_log_analysis' in st.session_state:
     st.write(f"{st.session_state.fetch_log_analysis}")
+    load_summary = describe_collection_load(MATCH_SCOUT_COLLECTION)
+    if load_summary:
+        st.caption(f"Match data: {load_summary}")
 
-# Display static countdown to next refresh
-if 'last_fetch_time_analysis' in st.session_state:
-    time_since_last_fetch = time.time() - st.session_state.last_fetch_time_analysis
-    time_until_next_fetch = max(0, 30 - time_since_last_fetch)
-    st.write(f"Next refresh in {int(time_until_next_fetch)} seconds")
-
-# Schedule the next refresh (only if on Data Analysis page)
+# Re-run the page when new scouting data arrives (only while on Data Analysis)
 if st.session_state.active_page == "Data Analysis":
-    time_since_last_fetch = time.time() - st.session_state.last_fetch_time_analysis
-    if time_since_last_fetch >= 30:
-        st.rerun()
+    rerun_on_collection_change([MATCH_SCOUT_COLLECTION, PIT_SCOUT_COLLECTION], 'data_version_analysis')
 
 # Stop if no match data is available
 if match_df is None or match_df.empty:
@@ -123,176 +119,15 @@ if pit_df is None or pit_df.empty:
     st.warning("No pit data available for analysis. Pit scouting statistics will be unavailable.")
     pit_df = pd.DataFrame()
 
-# Ensure numeric columns are properly typed for match data
-numeric_cols = [
-    'match_number', 'team_number',
-    'auto_coral_l1', 'auto_coral_l2', 'auto_coral_l3', 'auto_coral_l4',
-    'auto_missed_coral_l1', 'auto_missed_coral_l2', 'auto_missed_coral_l3', 'auto_missed_coral_l4',
-    'auto_algae_barge', 'auto_algae_processor', 'auto_missed_algae_barge', 'auto_missed_algae_processor', 'auto_algae_removed',
-    'teleop_coral_l1', 'teleop_coral_l2', 'teleop_coral_l3', 'teleop_coral_l4',
-    'teleop_missed_coral_l1', 'teleop_missed_coral_l2', 'teleop_missed_coral_l3', 'teleop_missed_coral_l4',
-    'teleop_algae_barge', 'teleop_algae_processor', 'teleop_missed_algae_barge', 'teleop_missed_algae_processor', 'teleop_algae_removed',
-    'defense_rating', 'speed_rating', 'driver_skill_rating'
-]
-for col in numeric_cols:
-    if col in match_df.columns:
-        match_df[col] = pd.to_numeric(match_df[col], errors='coerce').fillna(0)
-
-# Ensure numeric and boolean columns in pit data
-pit_numeric_cols = ['team_number']
-pit_boolean_cols = [
-    'can_score_coral_l1', 'can_score_coral_l2', 'can_score_coral_l3', 'can_score_coral_l4',
-    'can_score_algae_barge', 'can_score_algae_processor', 'can_remove_algae_l1', 'can_remove_algae_l2'
-]
-for col in pit_numeric_cols:
-    if col in pit_df.columns:
-        pit_df[col] = pd.to_numeric(pit_df[col], errors='coerce').fillna(0)
-for col in pit_boolean_cols:
-    if col in pit_df.columns:
-        pit_df[col] = pit_df[col].astype(bool)
-
-# Convert team_number to string to ensure consistency
-if 'team_number' in match_df.columns:
-    match_df['team_number'] = match_df['team_number'].astype(str)
-else:
+# Check team_number (converted to string by the metrics pipeline)
+if 'team_number' not in match_df.columns:
     st.error("Required column 'team_number' is missing in the match data.")
     st.stop()
 
-if 'team_number' in pit_df.columns:
-    pit_df['team_number'] = pit_df['team_number'].astype(str)
-
-# Define required columns for scoring (match data)
-required_cols = [
-    'auto_coral_l1', 'auto_coral_l2', 'auto_coral_l3', 'auto_coral_l4',
-    'auto_algae_barge', 'auto_algae_processor', 'auto_algae_removed',
-    'teleop_coral_l1', 'teleop_coral_l2', 'teleop_coral_l3', 'teleop_coral_l4',
-    'teleop_algae_barge', 'teleop_algae_processor', 'teleop_algae_removed',
-    'auto_taxi_left', 'climb_status', 'match_number', 'alliance_color'
-]
-
-# Calculate match scores and alliance bonuses
-score_columns = ['auto_score', 'teleop_score', 'endgame_score', 'total_score']
-if all(col in match_df.columns for col in required_cols):
-    # Only calculate scores if they don't already exist
-    if not all(col in match_df.columns for col in score_columns):
-        scores = match_df.apply(calculate_match_score, axis=1)
-        match_df[score_columns] = scores
-
-    def calculate_alliance_bonuses(df):
-        # Ensure match_number and alliance_color are in the correct format
-        if 'match_number' in df.columns and 'alliance_color' in df.columns:
-            # Handle NaN values and ensure match_number is a string
-            df['match_number'] = df['match_number'].astype(str)
-            # Standardize alliance_color (e.g., to lowercase)
-            df['alliance_color'] = df['alliance_color'].fillna('unknown').str.lower()
-        else:
-            df['coop_bonus'] = 0
-            df['harmony_bonus'] = 0
-            return df
-
-        # Co-op Bonus: 15 points if alliance scores 5 coral on at least 3 levels
-        coral_cols = [
-            'auto_coral_l1', 'auto_coral_l2', 'auto_coral_l3', 'auto_coral_l4',
-            'teleop_coral_l1', 'teleop_coral_l2', 'teleop_coral_l3', 'teleop_coral_l4'
-        ]
-        # Ensure all coral columns exist; fill missing ones with 0
-        for col in coral_cols:
-            if col not in df.columns:
-                df[col] = 0
-        alliance_coral = df.groupby(['match_number', 'alliance_color'])[coral_cols].sum().reset_index()
-        alliance_coral['l1_total'] = alliance_coral['auto_coral_l1'] + alliance_coral['teleop_coral_l1']
-        alliance_coral['l2_total'] = alliance_coral['auto_coral_l2'] + alliance_coral['teleop_coral_l2']
-        alliance_coral['l3_total'] = alliance_coral['auto_coral_l3'] + alliance_coral['teleop_coral_l3']
-        alliance_coral['l4_total'] = alliance_coral['auto_coral_l4'] + alliance_coral['teleop_coral_l4']
-        alliance_coral['levels_with_5_plus'] = (
-            (alliance_coral['l1_total'] >= 5).astype(int) +
-            (alliance_coral['l2_total'] >= 5).astype(int) +
-            (alliance_coral['l3_total'] >= 5).astype(int) +
-            (alliance_coral['l4_total'] >= 5).astype(int)
-        )
-        alliance_coral['coop_bonus'] = alliance_coral['levels_with_5_plus'].apply(
-            lambda x: 15 if x >= 3 else 0
-        )
-
-        # Ensure merge keys are consistent
-        alliance_coral['match_number'] = alliance_coral['match_number'].astype(str)
-        alliance_coral['alliance_color'] = alliance_coral['alliance_color'].str.lower()
-
-        # Merge coop_bonus into df
-        df = df.merge(
-            alliance_coral[['match_number', 'alliance_color', 'coop_bonus']],
-            on=['match_number', 'alliance_color'],
-            how='left'
-        )
-
-        # Ensure coop_bonus exists, even if merge fails
-        if 'coop_bonus' not in df.columns:
-            df['coop_bonus'] = 0
-
-        # Harmony Bonus: 15 points if all robots in the alliance climb (Shallow or Deep)
-        if 'climb_status' in df.columns:
-            alliance_climb = df.groupby(['match_number', 'alliance_color'])['climb_status'].value_counts().unstack(fill_value=0)
-            alliance_climb['num_robots'] = df.groupby(['match_number', 'alliance_color'])['team_number'].nunique()
-            alliance_climb['num_climbs'] = alliance_climb.get('Shallow Climb', 0) + alliance_climb.get('Deep Climb', 0)
-            alliance_climb['harmony_bonus'] = alliance_climb.apply(
-                lambda row: 15 if row['num_climbs'] == row['num_robots'] and row['num_robots'] > 0 else 0, axis=1
-            )
-        else:
-            alliance_climb = df.groupby(['match_number', 'alliance_color'])['team_number'].nunique()
-            alliance_climb['harmony_bonus'] = 0
-
-        # Reset the index to convert match_number and alliance_color to columns
-        alliance_climb = alliance_climb.reset_index()
-
-        # Standardize the columns after resetting the index
-        alliance_climb['match_number'] = alliance_climb['match_number'].astype(str)
-        alliance_climb['alliance_color'] = alliance_climb['alliance_color'].str.lower()
-
-        # Merge harmony_bonus into df
-        df = df.merge(
-            alliance_climb[['match_number', 'alliance_color', 'harmony_bonus']],
-            on=['match_number', 'alliance_color'],
-            how='left'
-        )
-
-        # Ensure harmony_bonus exists, even if merge fails
-        if 'harmony_bonus' not in df.columns:
-            df['harmony_bonus'] = 0
-
-        # Add bonuses to total score
-        df['total_score'] = (
-            df['total_score'] +
-            df['coop_bonus'].fillna(0) +
-            df['harmony_bonus'].fillna(0)
-        )
-
-        return df
-
-    match_df = calculate_alliance_bonuses(match_df)
-
-    def calculate_epa(df):
-        if 'match_number' in df.columns and 'alliance_color' in df.columns:
-            # Ensure consistent types for grouping
-            df['match_number'] = df['match_number'].astype(str)
-            df['alliance_color'] = df['alliance_color'].str.lower()
-            alliance_avg = df.groupby(['match_number', 'alliance_color'])['total_score'].mean().reset_index()
-            alliance_avg = alliance_avg.rename(columns={'total_score': 'alliance_avg'})
-            # Merge the average back into the original DataFrame
-            alliance_avg['match_number'] = alliance_avg['match_number'].astype(str)
-            alliance_avg['alliance_color'] = alliance_avg['alliance_color'].str.lower()
-            df = df.merge(alliance_avg, on=['match_number', 'alliance_color'], how='left')
-            # Calculate EPA as team score minus alliance average
-            df['epa'] = df['total_score'] - df['alliance_avg']
-            # Drop the temporary column
-            df = df.drop(columns=['alliance_avg'])
-        else:
-            df['epa'] = 0
-        return df
-
-    match_df = calculate_epa(match_df)
-else:
-    st.warning("Cannot calculate match scores. Missing required columns: " +
-               ", ".join([col for col in required_cols if col not in match_df.columns]))
+# Scores, alliance bonuses and EPA need these columns
+missing_cols = [col for col in MATCH_SCORING_COLUMNS if col not in match_df.columns]
+if missing_cols:
+    st.warning("Cannot calculate match scores. Missing required columns: " + ", ".join(missing_cols))
     st.stop()
 
 # Team selection for detailed analysis
@@ -307,21 +142,6 @@ else:
     st.error("Team number data not available in match data.")
     st.stop()
 
-# Calculate success ratios for match data (needed for leaderboard and scoring accuracy analysis)
-coral_scored_cols = [f"{period}_coral_l{level}" for period in ['auto', 'teleop'] for level in range(1, 5)]
-coral_missed_cols = [f"{period}_missed_coral_l{level}" for period in ['auto', 'teleop'] for level in range(1, 5)]
-match_df['total_coral_scored'] = match_df[coral_scored_cols].sum(axis=1)
-match_df['total_coral_missed'] = match_df[coral_missed_cols].sum(axis=1)
-match_df['total_coral_attempts'] = match_df['total_coral_scored'] + match_df['total_coral_missed']
-match_df['coral_success_ratio'] = (match_df['total_coral_scored'] / match_df['total_coral_attempts'].replace(0, pd.NA)).fillna(0)
-
-algae_scored_cols = [f"{period}_algae_{target}" for period in ['auto', 'teleop'] for target in ['barge', 'processor']]
-algae_missed_cols = [f"{period}_missed_algae_{target}" for period in ['auto', 'teleop'] for target in ['barge', 'processor']]
-match_df['total_algae_scored'] = match_df[algae_scored_cols].sum(axis=1)
-match_df['total_algae_missed'] = match_df[algae_missed_cols].sum(axis=1)
-match_df['total_algae_attempts'] = match_df['total_algae_scored'] + match_df['total_algae_missed']
-match_df['algae_success_ratio'] = (match_df['total_algae_scored'] / match_df['total_algae_attempts'].replace(0, pd.NA)).fillna(0)
-
 # Create tabs for Match Scouting and Pit Scouting
 match_tab, pit_tab = st.tabs(["Match Scouting Analysis", "Pit Scouting Analysis"])
 
@@ -332,7 +152,7 @@ with match_tab:
     st.markdown("Teams ranked based on performance metrics, including pit scouting data. Select a metric to sort the table.")
 
     # Calculate metrics for the leaderboard (match data)
-    leaderboard_data = match_df.groupby('team_number').agg({
+    leaderboard_data = match_df.groupby('team_number', observed=True).agg({
         'total_score': 'mean',           # Average Total Score
         'epa': 'mean',                   # Average EPA
         'coral_success_ratio': 'mean',   # Average Coral Success Ratio
@@ -344,7 +164,7 @@ with match_tab:
 
     # Merge with pit scouting data
     if not pit_df.empty:
-        pit_leaderboard = pit_df.groupby('team_number').agg({
+        pit_leaderboard = pit_df.groupby('team_number', observed=True).agg({
             'drivetrain_type': lambda x: x.mode()[0] if not x.mode().empty else 'Unknown',  # Most common drivetrain type
             'preferred_role': lambda x: x.mode()[0] if not x.mode().empty else 'Unknown',  # Most common preferred role
             'endgame_capability': lambda x: x.mode()[0] if not x.mode().empty else 'Unknown',  # Most common endgame capability
@@ -458,7 +278,7 @@ with match_tab:
     st.subheader("Expected Points Added (EPA)")
     st.markdown("EPA measures a team's contribution to their alliance's score relative to the average performance of teams in the same alliance color. Higher EPA indicates a greater positive impact.")
     if 'epa' in match_df.columns:
-        epa_data = match_df.groupby('team_number')['epa'].mean().reset_index()
+        epa_data = match_df.groupby('team_number', observed=True)['epa'].mean().reset_index()
         fig = px.bar(epa_data, x='team_number', y='epa', title='Average EPA by Team',
                      labels={'team_number': 'Team Number', 'epa': 'EPA'})
         st.plotly_chart(fig, use_container_width=True)
@@ -470,7 +290,7 @@ with match_tab:
     st.markdown("Analysis of endgame performance, including parking and climbing statistics.")
     if 'climb_status' in match_df.columns and 'endgame_score' in match_df.columns:
         # Climb and Park Rates by Team (Stacked Bar Chart)
-        climb_stats = match_df.groupby('team_number')['climb_status'].value_counts(normalize=True).unstack(fill_value=0) * 100
+        climb_stats = match_df.groupby('team_number', observed=True)['climb_status'].value_counts(normalize=True).unstack(fill_value=0) * 100
         climb_stats = climb_stats.reset_index()
         fig = go.Figure()
         for status in ['None', 'Parked', 'Shallow Climb', 'Deep Climb']:
@@ -490,7 +310,7 @@ with match_tab:
         st.plotly_chart(fig, use_container_width=True)
 
         # Average Endgame Score by Team
-        endgame_scores = match_df.groupby('team_number')['endgame_score'].mean().reset_index()
+        endgame_scores = match_df.groupby('team_number', observed=True)['endgame_score'].mean().reset_index()
         fig = px.bar(endgame_scores, x='team_number', y='endgame_score',
                      title="Average Endgame Score by Team",
                      labels={'team_number': 'Team Number', 'endgame_score': 'Average Endgame Score'})
@@ -506,7 +326,7 @@ with match_tab:
     st.markdown("#### Autonomous Coral Scored")
     st.markdown("Average number of coral scored per match in each level during autonomous.")
     if all(col in match_df.columns for col in ['auto_coral_l1', 'auto_coral_l2', 'auto_coral_l3', 'auto_coral_l4']):
-        auto_coral = match_df.groupby('team_number')[['auto_coral_l1', 'auto_coral_l2', 'auto_coral_l3', 'auto_coral_l4']].mean().reset_index()
+        auto_coral = match_df.groupby('team_number', observed=True)[['auto_coral_l1', 'auto_coral_l2', 'auto_coral_l3', 'auto_coral_l4']].mean().reset_index()
         fig = go.Figure()
         for level in ['auto_coral_l1', 'auto_coral_l2', 'auto_coral_l3', 'auto_coral_l4']:
             fig.add_trace(go.Bar(
@@ -529,7 +349,7 @@ with match_tab:
     st.markdown("#### Autonomous Coral Missed")
     st.markdown("Average number of coral missed per match in each level during autonomous.")
     if all(col in match_df.columns for col in ['auto_missed_coral_l1', 'auto_missed_coral_l2', 'auto_missed_coral_l3', 'auto_missed_coral_l4']):
-        auto_missed_coral = match_df.groupby('team_number')[['auto_missed_coral_l1', 'auto_missed_coral_l2', 'auto_missed_coral_l3', 'auto_missed_coral_l4']].mean().reset_index()
+        auto_missed_coral = match_df.groupby('team_number', observed=True)[['auto_missed_coral_l1', 'auto_missed_coral_l2', 'auto_missed_coral_l3', 'auto_missed_coral_l4']].mean().reset_index()
         fig = go.Figure()
         for level in ['auto_missed_coral_l1', 'auto_missed_coral_l2', 'auto_missed_coral_l3', 'auto_missed_coral_l4']:
             fig.add_trace(go.Bar(
@@ -552,7 +372,7 @@ with match_tab:
     st.markdown("#### Teleop Coral Scored")
     st.markdown("Average number of coral scored per match in each level during teleop.")
     if all(col in match_df.columns for col in ['teleop_coral_l1', 'teleop_coral_l2', 'teleop_coral_l3', 'teleop_coral_l4']):
-        teleop_coral = match_df.groupby('team_number')[['teleop_coral_l1', 'teleop_coral_l2', 'teleop_coral_l3', 'teleop_coral_l4']].mean().reset_index()
+        teleop_coral = match_df.groupby('team_number', observed=True)[['teleop_coral_l1', 'teleop_coral_l2', 'teleop_coral_l3', 'teleop_coral_l4']].mean().reset_index()
         fig = go.Figure()
         for level in ['teleop_coral_l1', 'teleop_coral_l2', 'teleop_coral_l3', 'teleop_coral_l4']:
             fig.add_trace(go.Bar(
@@ -575,7 +395,7 @@ with match_tab:
     st.markdown("#### Teleop Coral Missed")
     st.markdown("Average number of coral missed per match in each level during teleop.")
     if all(col in match_df.columns for col in ['teleop_missed_coral_l1', 'teleop_missed_coral_l2', 'teleop_missed_coral_l3', 'teleop_missed_coral_l4']):
-        teleop_missed_coral = match_df.groupby('team_number')[['teleop_missed_coral_l1', 'teleop_missed_coral_l2', 'teleop_missed_coral_l3', 'teleop_missed_coral_l4']].mean().reset_index()
+        teleop_missed_coral = match_df.groupby('team_number', observed=True)[['teleop_missed_coral_l1', 'teleop_missed_coral_l2', 'teleop_missed_coral_l3', 'teleop_missed_coral_l4']].mean().reset_index()
         fig = go.Figure()
         for level in ['teleop_missed_coral_l1', 'teleop_missed_coral_l2', 'teleop_missed_coral_l3', 'teleop_missed_coral_l4']:
             fig.add_trace(go.Bar(
@@ -601,7 +421,7 @@ with match_tab:
     # Autonomous Algae Management
     st.markdown("#### Autonomous Algae Management")
     if all(col in match_df.columns for col in ['auto_algae_barge', 'auto_algae_processor', 'auto_algae_removed', 'auto_missed_algae_barge', 'auto_missed_algae_processor']):
-        auto_algae = match_df.groupby('team_number')[['auto_algae_barge', 'auto_algae_processor', 'auto_algae_removed', 'auto_missed_algae_barge', 'auto_missed_algae_processor']].mean().reset_index()
+        auto_algae = match_df.groupby('team_number', observed=True)[['auto_algae_barge', 'auto_algae_processor', 'auto_algae_removed', 'auto_missed_algae_barge', 'auto_missed_algae_processor']].mean().reset_index()
         fig = go.Figure()
         for metric in ['auto_algae_barge', 'auto_algae_processor', 'auto_algae_removed', 'auto_missed_algae_barge', 'auto_missed_algae_processor']:
             fig.add_trace(go.Bar(
@@ -623,7 +443,7 @@ with match_tab:
     # Teleop Algae Management
     st.markdown("#### Teleop Algae Management")
     if all(col in match_df.columns for col in ['teleop_algae_barge', 'teleop_algae_processor', 'teleop_algae_removed', 'teleop_missed_algae_barge', 'teleop_missed_algae_processor']):
-        teleop_algae = match_df.groupby('team_number')[['teleop_algae_barge', 'teleop_algae_processor', 'teleop_algae_removed', 'teleop_missed_algae_barge', 'teleop_missed_algae_processor']].mean().reset_index()
+        teleop_algae = match_df.groupby('team_number', observed=True)[['teleop_algae_barge', 'teleop_algae_processor', 'teleop_algae_removed', 'teleop_missed_algae_barge', 'teleop_missed_algae_processor']].mean().reset_index()
         fig = go.Figure()
         for metric in ['teleop_algae_barge', 'teleop_algae_processor', 'teleop_algae_removed', 'teleop_missed_algae_barge', 'teleop_missed_algae_processor']:
             fig.add_trace(go.Bar(
@@ -647,7 +467,7 @@ with match_tab:
     st.markdown("Average ratings for defense, speed, and driver skill, as assessed by scouters (1 to 5).")
     if 'defense_rating' in match_df.columns and 'speed_rating' in match_df.columns and 'driver_skill_rating' in match_df.columns:
         # Calculate average ratings for each team
-        ratings = match_df.groupby('team_number')[['defense_rating', 'speed_rating', 'driver_skill_rating']].mean().reset_index()
+        ratings = match_df.groupby('team_number', observed=True)[['defense_rating', 'speed_rating', 'driver_skill_rating']].mean().reset_index()
 
         # If specific teams are selected, use only those teams
         if selected_teams:
@@ -726,7 +546,7 @@ with match_tab:
     st.subheader("Taxi Rate by Team")
     st.markdown("Percentage of matches where each team successfully taxied (left starting position) during autonomous.")
     if 'auto_taxi_left' in match_df.columns:
-        taxi_rates = match_df.groupby('team_number')['auto_taxi_left'].mean() * 100
+        taxi_rates = match_df.groupby('team_number', observed=True)['auto_taxi_left'].mean() * 100
         taxi_df = pd.DataFrame({
             'Team Number': taxi_rates.index,
             'Taxi Rate (%)': taxi_rates.values
@@ -739,8 +559,8 @@ with match_tab:
 
     # Scoring Accuracy Analysis
     st.subheader("Scoring Accuracy Analysis")
-    avg_coral_success = match_df.groupby('team_number')['coral_success_ratio'].mean() * 100
-    avg_algae_success = match_df.groupby('team_number')['algae_success_ratio'].mean() * 100
+    avg_coral_success = match_df.groupby('team_number', observed=True)['coral_success_ratio'].mean() * 100
+    avg_algae_success = match_df.groupby('team_number', observed=True)['algae_success_ratio'].mean() * 100
 
     # Plot success ratios
     success_data = pd.DataFrame({
@@ -808,14 +628,8 @@ with match_tab:
     # Display match scouting data
     st.dataframe(match_df_reordered, use_container_width=True)
 
-    # Download button for match scouting data
-    match_csv = match_df_reordered.to_csv(index=False)
-    st.download_button(
-        label="Download Match Scouting Data as CSV",
-        data=match_csv,
-        file_name="match_scouting_data.csv",
-        mime="text/csv"
-    )
+    # Export of the match scouting data, streamed from Firestore on click
+    export_controls(db, 'match', key="analysis_match_export")
 
 # Pit Scouting Analysis Tab
 with pit_tab:
@@ -831,7 +645,7 @@ with pit_tab:
 
         # Drivetrain Type Distribution
         st.markdown("#### Drivetrain Type Distribution")
-        drivetrain_counts = pit_df.groupby('drivetrain_type')['team_number'].nunique().reset_index()
+        drivetrain_counts = pit_df.groupby('drivetrain_type', observed=True)['team_number'].nunique().reset_index()
         drivetrain_counts.columns = ['Drivetrain Type', 'Number of Teams']
         fig = px.bar(drivetrain_counts, x='Drivetrain Type', y='Number of Teams',
                      title="Number of Teams by Drivetrain Type",
@@ -844,7 +658,7 @@ with pit_tab:
             'can_score_coral_l1', 'can_score_coral_l2', 'can_score_coral_l3', 'can_score_coral_l4',
             'can_score_algae_barge', 'can_score_algae_processor', 'can_remove_algae_l1', 'can_remove_algae_l2'
         ]
-        capability_data = pit_df.groupby('team_number')[capability_cols].mean() * 100  # Convert to percentage
+        capability_data = pit_df.groupby('team_number', observed=True)[capability_cols].mean() * 100  # Convert to percentage
         capability_data = capability_data.reset_index()
         
         fig = go.Figure()
@@ -886,7 +700,7 @@ with pit_tab:
         st.markdown("Photos of robots submitted during pit scouting, organized by team.")
         if 'robot_photo_url' in pit_df.columns and pit_df['robot_photo_url'].notna().any():
             # Group by team number and collect all photo URLs for each team
-            photo_data = pit_df.groupby('team_number')['robot_photo_url'].apply(list).reset_index()
+            photo_data = pit_df.groupby('team_number', observed=True)['robot_photo_url'].apply(list).reset_index()
             
             for _, row in photo_data.iterrows():
                 team = row['team_number']
@@ -951,11 +765,5 @@ with pit_tab:
         # Display pit scouting data
         st.dataframe(pit_df_reordered, use_container_width=True)
 
-        # Download button for pit scouting data
-        pit_csv = pit_df_reordered.to_csv(index=False)
-        st.download_button(
-            label="Download Pit Scouting Data as CSV",
-            data=pit_csv,
-            file_name="pit_scouting_data.csv",
-            mime="text/csv"
-        )
\ No newline at end of file
+        # Export of the pit scouting data, streamed from Firestore on click
+        export_controls(db, 'pit', key="analysis_pit_export")
\ No newline at end of file
@@ -3,10 +3,11 @@ import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
-import requests
-from utils.utils import load_data, load_pit_data, calculate_match_score
-from utils.utils import setup_sidebar_navigation
-from utils.tba_api import get_tba_api_key
+from utils.utils import load_pit_data
+from utils.metrics import load_team_matches, aggregate_team_stats, MATCH_SCORING_COLUMNS
+from utils.summaries import load_team_summaries, summary_team_stats, summaries_current
+from utils.utils import setup_sidebar_navigation, current_event_key
+from utils.tba_api import get_tba_client, start_team_prefetch
 
 st.set_page_config(page_title="Team Statistics", page_icon="📊", layout="wide", initial_sidebar_state="collapsed")
 
@@ -115,13 +116,12 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # Function to fetch team data from The Blue Alliance API
-def fetch_team_data(team_number, auth_key):
-    url = f"https://www.thebluealliance.com/api/v3/team/frc{team_number}"
-    headers = {"X-TBA-Auth-Key": auth_key}
+def fetch_team_data(team_number, client):
     try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        data = response.json()
+        if client is None:
+            raise ValueError("no TBA API key")
+        # Shared TBA client: repeat views are answered from its cache or with a 304
+        data = client.get(f"/team/frc{team_number}")
         return {
             "team_number": data.get("team_number", team_number),
             "nickname": data.get("nickname", "Unknown"),
@@ -141,12 +141,11 @@ def fetch_team_data(team_number, auth_key):
             "motto": "Not Provided"
         }
 
-# Load match and pit data
-try:
-    match_df = load_data()
-except Exception as e:
-    st.error(f"Failed to load match data: {str(e)}")
-    match_df = pd.DataFrame()
+# Load the per-team match summaries (one document per team) and pit data; match
+# records are read below for the selected team only
+summaries = load_team_summaries()
+if summaries is None:
+    summaries = pd.DataFrame()
 
 try:
     pit_df = load_pit_data()
@@ -155,140 +154,45 @@ except Exception as e:
     pit_df = pd.DataFrame()
 
 # Check if both datasets are empty
-if (match_df is None or match_df.empty) and (pit_df is None or pit_df.empty):
+if summaries.empty and (pit_df is None or pit_df.empty):
     st.info("No match or pit scouting data available to display team statistics. Please upload data in the Data Upload page.")
     st.stop()
 
 # Warn if either dataset is empty
-if match_df is None or match_df.empty:
+if summaries.empty:
     st.warning("No match data available. Only pit scouting data will be displayed.")
-    match_df = pd.DataFrame()
 if pit_df is None or pit_df.empty:
     st.warning("No pit scouting data available. Only match scouting data will be displayed.")
     pit_df = pd.DataFrame()
 
-# Ensure numeric columns
-numeric_cols = [
-    'match_number', 'team_number',
-    'auto_coral_l1', 'auto_coral_l2', 'auto_coral_l3', 'auto_coral_l4',
-    'auto_missed_coral_l1', 'auto_missed_coral_l2', 'auto_missed_coral_l3', 'auto_missed_coral_l4',
-    'auto_algae_barge', 'auto_algae_processor', 'auto_missed_algae_barge', 'auto_missed_algae_processor', 'auto_algae_removed',
-    'teleop_coral_l1', 'teleop_coral_l2', 'teleop_coral_l3', 'teleop_coral_l4',
-    'teleop_missed_coral_l1', 'teleop_missed_coral_l2', 'teleop_missed_coral_l3', 'teleop_missed_coral_l4',
-    'teleop_algae_barge', 'teleop_algae_processor', 'teleop_missed_algae_barge', 'teleop_missed_algae_processor', 'teleop_algae_removed',
-    'defense_rating', 'speed_rating', 'driver_skill_rating'
-]
-for col in numeric_cols:
-    if col in match_df.columns:
-        match_df[col] = pd.to_numeric(match_df[col], errors='coerce').fillna(0)
-
-pit_numeric_cols = ['team_number']
-pit_boolean_cols = [
-    'can_score_coral_l1', 'can_score_coral_l2', 'can_score_coral_l3', 'can_score_coral_l4',
-    'can_score_algae_barge', 'can_score_algae_processor', 'can_remove_algae_l1', 'can_remove_algae_l2'
-]
-for col in pit_numeric_cols:
-    if col in pit_df.columns:
-        pit_df[col] = pd.to_numeric(pit_df[col], errors='coerce').fillna(0)
-for col in pit_boolean_cols:
-    if col in pit_df.columns:
-        pit_df[col] = pit_df[col].astype(bool)
-
-# Convert team_number to string
-if 'team_number' in match_df.columns:
-    match_df['team_number'] = match_df['team_number'].astype(str)
-if 'team_number' in pit_df.columns:
-    pit_df['team_number'] = pit_df['team_number'].astype(str)
-
-# Calculate match scores and alliance bonuses if match data exists
-if not match_df.empty:
-    required_cols = [
-        'auto_coral_l1', 'auto_coral_l2', 'auto_coral_l3', 'auto_coral_l4',
-        'auto_algae_barge', 'auto_algae_processor', 'auto_algae_removed',
-        'teleop_coral_l1', 'teleop_coral_l2', 'teleop_coral_l3', 'teleop_coral_l4',
-        'teleop_algae_barge', 'teleop_algae_processor', 'teleop_algae_removed',
-        'auto_taxi_left', 'climb_status', 'match_number', 'alliance_color'
-    ]
-
-    score_columns = ['auto_score', 'teleop_score', 'endgame_score', 'total_score']
-    if all(col in match_df.columns for col in required_cols):
-        if not all(col in match_df.columns for col in score_columns):
-            scores = match_df.apply(calculate_match_score, axis=1)
-            match_df[score_columns] = scores
-
-        def calculate_alliance_bonuses(df):
-            if 'match_number' in df.columns and 'alliance_color' in df.columns:
-                df['match_number'] = df['match_number'].astype(str)
-                df['alliance_color'] = df['alliance_color'].fillna('unknown').str.lower()
-            else:
-                df['coop_bonus'] = 0
-                df['harmony_bonus'] = 0
-                return df
+# Team selection: Combine teams from both the match summaries and pit_df
+match_teams = summaries['team_number'].unique() if 'team_number' in summaries.columns else []
+pit_teams = pit_df['team_number'].unique() if 'team_number' in pit_df.columns else []
+all_teams = sorted(set(match_teams).union(set(pit_teams)))
 
-            coral_cols = [
-                'auto_coral_l1', 'auto_coral_l2', 'auto_coral_l3', 'auto_coral_l4',
-                'teleop_coral_l1', 'teleop_coral_l2', 'teleop_coral_l3', 'teleop_coral_l4'
-            ]
-            for col in coral_cols:
-                if col not in df.columns:
-                    df[col] = 0
-            alliance_coral = df.groupby(['match_number', 'alliance_color'])[coral_cols].sum().reset_index()
-            alliance_coral['l1_total'] = alliance_coral['auto_coral_l1'] + alliance_coral['teleop_coral_l1']
-            alliance_coral['l2_total'] = alliance_coral['auto_coral_l2'] + alliance_coral['teleop_coral_l2']
-            alliance_coral['l3_total'] = alliance_coral['auto_coral_l3'] + alliance_coral['teleop_coral_l3']
-            alliance_coral['l4_total'] = alliance_coral['auto_coral_l4'] + alliance_coral['teleop_coral_l4']
-            alliance_coral['levels_with_5_plus'] = (
-                (alliance_coral['l1_total'] >= 5).astype(int) +
-                (alliance_coral['l2_total'] >= 5).astype(int) +
-                (alliance_coral['l3_total'] >= 5).astype(int) +
-                (alliance_coral['l4_total'] >= 5).astype(int)
-            )
-            alliance_coral['coop_bonus'] = alliance_coral['levels_with_5_plus'].apply(
-                lambda x: 15 if x >= 3 else 0
-            )
-            alliance_coral['match_number'] = alliance_coral['match_number'].astype(str)
-            alliance_coral['alliance_color'] = alliance_coral['alliance_color'].str.lower()
-            df = df.merge(
-                alliance_coral[['match_number', 'alliance_color', 'coop_bonus']],
-                on=['match_number', 'alliance_color'],
-                how='left'
-            )
-            if 'coop_bonus' not in df.columns:
-                df['coop_bonus'] = 0
-
-            if 'climb_status' in df.columns:
-                alliance_climb = df.groupby(['match_number', 'alliance_color'])['climb_status'].value_counts().unstack(fill_value=0)
-                alliance_climb['num_robots'] = df.groupby(['match_number', 'alliance_color'])['team_number'].nunique()
-                alliance_climb['num_climbs'] = alliance_climb.get('Shallow Climb', 0) + alliance_climb.get('Deep Climb', 0)
-                alliance_climb['harmony_bonus'] = alliance_climb.apply(
-                    lambda row: 15 if row['num_climbs'] == row['num_robots'] and row['num_robots'] > 0 else 0, axis=1
-                )
-            else:
-                alliance_climb = df.groupby(['match_number', 'alliance_color'])['team_number'].nunique()
-                alliance_climb['harmony_bonus'] = 0
-
-            alliance_climb = alliance_climb.reset_index()
-            alliance_climb['match_number'] = alliance_climb['match_number'].astype(str)
-            alliance_climb['alliance_color'] = alliance_climb['alliance_color'].str.lower()
-            df = df.merge(
-                alliance_climb[['match_number', 'alliance_color', 'harmony_bonus']],
-                on=['match_number', 'alliance_color'],
-                how='left'
-            )
-            if 'harmony_bonus' not in df.columns:
-                df['harmony_bonus'] = 0
+if not all_teams:
+    st.error("No teams found in match or pit scouting data.")
+    st.stop()
 
-            df['total_score'] = (
-                df['total_score'] +
-                df['coop_bonus'].fillna(0) +
-                df['harmony_bonus'].fillna(0)
-            )
-            return df
+# Fetch the TBA records of every team (and of the current event's teams) in the background,
+# so switching teams is answered from the TBA cache
+prefetch = start_team_prefetch(all_teams, current_event_key())
 
-        match_df = calculate_alliance_bonuses(match_df)
-    else:
-        st.warning("Cannot calculate match scores. Missing required columns: " +
-                   ", ".join([col for col in required_cols if col not in match_df.columns]))
+selected_team = st.selectbox("Select a Team", options=all_teams)
+if prefetch is not None and not prefetch.done():
+    st.caption(f"Loading TBA team info for {len(all_teams)} teams in the background...")
+
+# Every row of the matches the selected team played: scored, with alliance bonuses,
+# EPA and success ratios (outcomes need the other robots' rows too)
+match_df = load_team_matches([selected_team])
+if match_df is None:
+    match_df = pd.DataFrame()
+
+# Check scoring columns and resolve duplicate submissions if match data exists
+if not match_df.empty:
+    missing_cols = [col for col in MATCH_SCORING_COLUMNS if col not in match_df.columns]
+    if missing_cols:
+        st.warning("Cannot calculate match scores. Missing required columns: " + ", ".join(missing_cols))
 
     # Check for duplicates in match data
     duplicates = match_df[match_df.duplicated(subset=['team_number', 'match_number'], keep=False)]
@@ -303,25 +207,6 @@ if not match_df.empty:
             match_df = match_df.drop_duplicates(subset=['team_number', 'match_number'], keep='first')
             st.info("Duplicates resolved by keeping the first submission. Consider adding a timestamp column.")
 
-    # Calculate success ratios and additional metrics
-    match_df['auto_coral_success'] = match_df['auto_coral_l1'] + match_df['auto_coral_l2'] + match_df['auto_coral_l3'] + match_df['auto_coral_l4']
-    match_df['auto_coral_missed'] = match_df['auto_missed_coral_l1'] + match_df['auto_missed_coral_l2'] + match_df['auto_missed_coral_l3'] + match_df['auto_missed_coral_l4']
-    match_df['teleop_coral_success'] = match_df['teleop_coral_l1'] + match_df['teleop_coral_l2'] + match_df['teleop_coral_l3'] + match_df['teleop_coral_l4']
-    match_df['teleop_coral_missed'] = match_df['teleop_missed_coral_l1'] + match_df['teleop_missed_coral_l2'] + match_df['teleop_missed_coral_l3'] + match_df['teleop_missed_coral_l4']
-    match_df['auto_coral_attempts'] = match_df['auto_coral_success'] + match_df['auto_coral_missed']
-    match_df['teleop_coral_attempts'] = match_df['teleop_coral_success'] + match_df['teleop_coral_missed']
-    match_df['auto_coral_success_ratio'] = (match_df['auto_coral_success'] / match_df['auto_coral_attempts'].replace(0, pd.NA)).fillna(0)
-    match_df['teleop_coral_success_ratio'] = (match_df['teleop_coral_success'] / match_df['teleop_coral_attempts'].replace(0, pd.NA)).fillna(0)
-
-    match_df['auto_algae_success'] = match_df['auto_algae_barge'] + match_df['auto_algae_processor']
-    match_df['auto_algae_missed'] = match_df['auto_missed_algae_barge'] + match_df['auto_missed_algae_processor']
-    match_df['teleop_algae_success'] = match_df['teleop_algae_barge'] + match_df['teleop_algae_processor']
-    match_df['teleop_algae_missed'] = match_df['teleop_missed_algae_barge'] + match_df['teleop_missed_algae_processor']
-    match_df['auto_algae_attempts'] = match_df['auto_algae_success'] + match_df['auto_algae_missed']
-    match_df['teleop_algae_attempts'] = match_df['teleop_algae_success'] + match_df['teleop_algae_missed']
-    match_df['auto_algae_success_ratio'] = (match_df['auto_algae_success'] / match_df['auto_algae_attempts'].replace(0, pd.NA)).fillna(0)
-    match_df['teleop_algae_success_ratio'] = (match_df['teleop_algae_success'] / match_df['teleop_algae_attempts'].replace(0, pd.NA)).fillna(0)
-
     # Calculate match outcomes
     def calculate_match_outcomes(df):
         df['alliance_color'] = df['alliance_color'].str.title()
@@ -380,17 +265,6 @@ if not match_df.empty:
         st.warning("Discrepancies found between manual and calculated match outcomes:")
         st.write(discrepancies[['match_number', 'team_number', 'alliance_color', 'match_outcome', 'calculated_winner', 'outcome_discrepancy']])
 
-# Team selection: Combine teams from both match_df and pit_df
-match_teams = match_df['team_number'].unique() if 'team_number' in match_df.columns else []
-pit_teams = pit_df['team_number'].unique() if 'team_number' in pit_df.columns else []
-all_teams = sorted(set(match_teams).union(set(pit_teams)))
-
-if not all_teams:
-    st.error("No teams found in match or pit scouting data.")
-    st.stop()
-
-selected_team = st.selectbox("Select a Team", options=all_teams)
-
 # Filter data for the selected team
 team_data = match_df[match_df['team_number'] == selected_team] if not match_df.empty else pd.DataFrame()
 team_pit_data = pit_df[pit_df['team_number'] == selected_team] if not pit_df.empty else pd.DataFrame()
@@ -476,142 +350,17 @@ team_stats = pd.DataFrame({
 
 # Calculate team statistics if match data exists
 if not team_data.empty:
-    team_stats = team_data.groupby('team_number').agg({
-        'total_score': 'mean',
-        'auto_score': 'mean',
-        'teleop_score': 'mean',
-        'endgame_score': 'mean',
-        'auto_coral_success': ['mean', 'sum'],
-        'auto_coral_missed': ['mean', 'sum'],
-        'teleop_coral_success': ['mean', 'sum'],
-        'teleop_coral_missed': ['mean', 'sum'],
-        'auto_coral_l1': ['mean', 'sum'],
-        'auto_coral_l2': ['mean', 'sum'],
-        'auto_coral_l3': ['mean', 'sum'],
-        'auto_coral_l4': ['mean', 'sum'],
-        'teleop_coral_l1': ['mean', 'sum'],
-        'teleop_coral_l2': ['mean', 'sum'],
-        'teleop_coral_l3': ['mean', 'sum'],
-        'teleop_coral_l4': ['mean', 'sum'],
-        'auto_missed_coral_l1': ['mean', 'sum'],
-        'auto_missed_coral_l2': ['mean', 'sum'],
-        'auto_missed_coral_l3': ['mean', 'sum'],
-        'auto_missed_coral_l4': ['mean', 'sum'],
-        'teleop_missed_coral_l1': ['mean', 'sum'],
-        'teleop_missed_coral_l2': ['mean', 'sum'],
-        'teleop_missed_coral_l3': ['mean', 'sum'],
-        'teleop_missed_coral_l4': ['mean', 'sum'],
-        'auto_algae_processor': ['mean', 'sum'],
-        'teleop_algae_processor': ['mean', 'sum'],
-        'auto_algae_barge': ['mean', 'sum'],
-        'teleop_algae_barge': ['mean', 'sum'],
-        'auto_missed_algae_barge': ['mean', 'sum'],
-        'teleop_missed_algae_barge': ['mean', 'sum'],
-        'auto_missed_algae_processor': ['mean', 'sum'],
-        'teleop_missed_algae_processor': ['mean', 'sum'],
-        'auto_algae_removed': ['mean', 'sum'],
-        'teleop_algae_removed': ['mean', 'sum'],
-        'auto_coral_success_ratio': 'mean',
-        'teleop_coral_success_ratio': 'mean',
-        'auto_algae_success_ratio': 'mean',
-        'teleop_algae_success_ratio': 'mean',
-        'defense_rating': 'mean',
-        'speed_rating': 'mean',
-        'driver_skill_rating': 'mean'
-    }).reset_index()
-
-    team_stats.columns = ['_'.join(col).strip() if isinstance(col, tuple) else col for col in team_stats.columns]
-    team_stats = team_stats.rename(columns={
-        'team_number_': 'team_number',
-        'total_score_mean': 'avg_total_score',
-        'auto_score_mean': 'avg_auto_score',
-        'teleop_score_mean': 'avg_teleop_score',
-        'endgame_score_mean': 'avg_endgame_score',
-        'auto_coral_success_mean': 'avg_auto_coral_success',
-        'auto_coral_success_sum': 'total_auto_coral_success',
-        'auto_coral_missed_mean': 'avg_auto_coral_missed',
-        'auto_coral_missed_sum': 'total_auto_coral_missed',
-        'teleop_coral_success_mean': 'avg_teleop_coral_success',
-        'teleop_coral_success_sum': 'total_teleop_coral_success',
-        'teleop_coral_missed_mean': 'avg_teleop_coral_missed',
-        'teleop_coral_missed_sum': 'total_teleop_coral_missed',
-        'auto_coral_l1_mean': 'avg_auto_coral_l1',
-        'auto_coral_l1_sum': 'total_auto_coral_l1',
-        'auto_coral_l2_mean': 'avg_auto_coral_l2',
-        'auto_coral_l2_sum': 'total_auto_coral_l2',
-        'auto_coral_l3_mean': 'avg_auto_coral_l3',
-        'auto_coral_l3_sum': 'total_auto_coral_l3',
-        'auto_coral_l4_mean': 'avg_auto_coral_l4',
-        'auto_coral_l4_sum': 'total_auto_coral_l4',
-        'teleop_coral_l1_mean': 'avg_teleop_coral_l1',
-        'teleop_coral_l1_sum': 'total_teleop_coral_l1',
-        'teleop_coral_l2_mean': 'avg_teleop_coral_l2',
-        'teleop_coral_l2_sum': 'total_teleop_coral_l2',
-        'teleop_coral_l3_mean': 'avg_teleop_coral_l3',
-        'teleop_coral_l3_sum': 'total_teleop_coral_l3',
-        'teleop_coral_l4_mean': 'avg_teleop_coral_l4',
-        'teleop_coral_l4_sum': 'total_teleop_coral_l4',
-        'auto_missed_coral_l1_mean': 'avg_auto_missed_coral_l1',
-        'auto_missed_coral_l1_sum': 'total_auto_missed_coral_l1',
-        'auto_missed_coral_l2_mean': 'avg_auto_missed_coral_l2',
-        'auto_missed_coral_l2_sum': 'total_auto_missed_coral_l2',
-        'auto_missed_coral_l3_mean': 'avg_auto_missed_coral_l3',
-        'auto_missed_coral_l3_sum': 'total_auto_missed_coral_l3',
-        'auto_missed_coral_l4_mean': 'avg_auto_missed_coral_l4',
-        'auto_missed_coral_l4_sum': 'total_auto_missed_coral_l4',
-        'teleop_missed_coral_l1_mean': 'avg_teleop_missed_coral_l1',
-        'teleop_missed_coral_l1_sum': 'total_teleop_missed_coral_l1',
-        'teleop_missed_coral_l2_mean': 'avg_teleop_missed_coral_l2',
-        'teleop_missed_coral_l2_sum': 'total_teleop_missed_coral_l2',
-        'teleop_missed_coral_l3_mean': 'avg_teleop_missed_coral_l3',
-        'teleop_missed_coral_l3_sum': 'total_teleop_missed_coral_l3',
-        'teleop_missed_coral_l4_mean': 'avg_teleop_missed_coral_l4',
-        'teleop_missed_coral_l4_sum': 'total_teleop_missed_coral_l4',
-        'auto_algae_processor_mean': 'avg_auto_algae_processor',
-        'auto_algae_processor_sum': 'total_auto_algae_processor',
-        'teleop_algae_processor_mean': 'avg_teleop_algae_processor',
-        'teleop_algae_processor_sum': 'total_teleop_algae_processor',
-        'auto_algae_barge_mean': 'avg_auto_algae_barge',
-        'auto_algae_barge_sum': 'total_auto_algae_barge',
-        'teleop_algae_barge_mean': 'avg_teleop_algae_barge',
-        'teleop_algae_barge_sum': 'total_teleop_algae_barge',
-        'auto_missed_algae_barge_mean': 'avg_auto_missed_algae_barge',
-        'auto_missed_algae_barge_sum': 'total_auto_missed_algae_barge',
-        'teleop_missed_algae_barge_mean': 'avg_teleop_missed_algae_barge',
-        'teleop_missed_algae_barge_sum': 'total_teleop_missed_algae_barge',
-        'auto_missed_algae_processor_mean': 'avg_auto_missed_algae_processor',
-        'auto_missed_algae_processor_sum': 'total_auto_missed_algae_processor',
-        'teleop_missed_algae_processor_mean': 'avg_teleop_missed_algae_processor',
-        'teleop_missed_algae_processor_sum': 'total_teleop_missed_algae_processor',
-        'auto_algae_removed_mean': 'avg_auto_algae_removed',
-        'auto_algae_removed_sum': 'total_auto_algae_removed',
-        'teleop_algae_removed_mean': 'avg_teleop_algae_removed',
-        'teleop_algae_removed_sum': 'total_teleop_algae_removed',
-        'auto_coral_success_ratio_mean': 'avg_auto_coral_success_ratio',
-        'teleop_coral_success_ratio_mean': 'avg_teleop_coral_success_ratio',
-        'auto_algae_success_ratio_mean': 'avg_auto_algae_success_ratio',
-        'teleop_algae_success_ratio_mean': 'avg_teleop_algae_success_ratio',
-        'defense_rating_mean': 'avg_defense_rating',
-        'speed_rating_mean': 'avg_speed_rating',
-        'driver_skill_rating_mean': 'avg_driver_skill_rating'
-    })
-
-    team_stats = team_stats.fillna(0)
-
-    team_stats['total_auto_objects_scored'] = (
-        team_stats['total_auto_coral_success'] +
-        team_stats['total_auto_algae_barge'] +
-        team_stats['total_auto_algae_processor']
-    )
-    team_stats['total_teleop_objects_scored'] = (
-        team_stats['total_teleop_coral_success'] +
-        team_stats['total_teleop_algae_barge'] +
-        team_stats['total_teleop_algae_processor']
-    )
-    team_stats['total_objects_scored'] = (
-        team_stats['total_auto_objects_scored'] +
-        team_stats['total_teleop_objects_scored']
-    )
+    # From the team's running summary; while the summaries are out of date (match data
+    # written around them, e.g. by a CSV import), from the rows loaded above
+    summary = summaries[summaries['team_number'] == str(selected_team)] if not summaries.empty else pd.DataFrame()
+    current = summaries_current()
+    if not summary.empty and current:
+        team_stats = summary_team_stats(summary)
+    else:
+        if not current:
+            st.caption("Team summaries are out of date; these statistics are computed from the match records. "
+                       "Rebuild them on the Data Management page.")
+        team_stats = aggregate_team_stats(team_data)
 
     # Check for duplicates in team_data
     team_duplicates = team_data[team_data.duplicated(subset=['match_number'], keep=False)]
@@ -628,14 +377,14 @@ if not team_data.empty:
         'Parked': 'No Climb'
     }).fillna('No Climb')
 
-    climb_stats = team_data.groupby('team_number')['climb_category'].value_counts(normalize=True).unstack(fill_value=0) * 100
+    climb_stats = team_data.groupby('team_number', observed=True)['climb_category'].value_counts(normalize=True).unstack(fill_value=0) * 100
     climb_stats = climb_stats.reset_index()
     for status in ['Shallow Climb', 'Deep Climb', 'No Climb']:
         if status not in climb_stats.columns:
             climb_stats[status] = 0
 
     win_loss_data = team_data.drop_duplicates(subset=['match_number'])
-    win_loss = win_loss_data.groupby('team_number')['match_outcome_final'].value_counts().unstack(fill_value=0).reset_index()
+    win_loss = win_loss_data.groupby('team_number', observed=True)['match_outcome_final'].value_counts().unstack(fill_value=0).reset_index()
     win_loss = win_loss.rename(columns={'Won': 'Wins', 'Lost': 'Losses', 'Tie': 'Ties'})
     if 'Wins' not in win_loss.columns:
         win_loss['Wins'] = 0
@@ -645,7 +394,7 @@ if not team_data.empty:
         win_loss['Ties'] = 0
 
     if 'primary_role' in team_data.columns:
-        role_distribution = team_data.groupby('team_number')['primary_role'].value_counts(normalize=True).unstack(fill_value=0) * 100
+        role_distribution = team_data.groupby('team_number', observed=True)['primary_role'].value_counts(normalize=True).unstack(fill_value=0) * 100
         role_distribution = role_distribution.reset_index()
         for role in ['Offense', 'Defense', 'Both', 'Neither']:
             if role not in role_distribution.columns:
@@ -659,8 +408,7 @@ else:
     role_distribution = pd.DataFrame({'team_number': [selected_team], 'Offense': [0], 'Defense': [0], 'Both': [0], 'Neither': [0]})
 
 # Fetch team data from The Blue Alliance API
-TBA_AUTH_KEY = get_tba_api_key()
-team_info = fetch_team_data(selected_team, TBA_AUTH_KEY)
+team_info = fetch_team_data(selected_team, get_tba_client())
 
 # Get robot image from pit scouting data
 robot_image_url = None
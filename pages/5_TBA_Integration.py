@@ -4,8 +4,9 @@ import plotly.express as px
 import requests
 from datetime import datetime
 import time
-from utils.tba_api import get_team_info, get_team_events, get_event_teams, get_event_matches, search_teams, get_tba_api_key
+from utils.tba_api import get_team_info, get_team_events, get_event_teams, get_event_matches, search_teams, get_tba_api_key, get_tba_client
 from utils.utils import setup_sidebar_navigation
+from utils.team_index import TEAM_FIELDS
 
 st.set_page_config(page_title="TBA Data", page_icon="🔍", layout="wide",initial_sidebar_state="collapsed")
 
@@ -65,6 +66,23 @@ if current_time - st.session_state.last_refresh >= REFRESH_INTERVAL:
 # Display a small indicator to show the last refresh time
 st.write(f"Last refreshed: {datetime.fromtimestamp(st.session_state.last_refresh).strftime('%Y-%m-%d %H:%M:%S')} (refreshes every {REFRESH_INTERVAL} seconds)")
 
+# Team search over the local team directory (see utils.team_index)
+with st.expander("Find a Team"):
+    search_col, scope_col = st.columns(2)
+    with search_col:
+        team_query = st.text_input("Team number, nickname or name", key="team_search_query")
+    with scope_col:
+        search_event = st.text_input("Only teams at event (optional)", placeholder="e.g. 2025hiho", key="team_search_event").strip().lower()
+    if team_query:
+        start = time.perf_counter()
+        found = search_teams(team_query, event_key=search_event or None, limit=100)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if found:
+            st.dataframe(pd.DataFrame(found).reindex(columns=TEAM_FIELDS).drop(columns='key'), use_container_width=True, hide_index=True)
+        else:
+            st.info("No teams match the search.")
+        st.caption(f"{len(found)} teams shown ({elapsed_ms:.0f} ms)")
+
 # Team input and year selection
 team_input = st.text_input("Enter Team Number", st.session_state.team_input, key="new_team_input", on_change=update_team_input)
 selected_year = st.selectbox("Select Year", options=year_options, index=0)
@@ -123,4 +141,12 @@ if team_data:
         else:
             st.info("No match data available for this event.")
 else:
-    st.error("Could not retrieve team information.")
\ No newline at end of file
+    st.error("Could not retrieve team information.")
+
+# Requests made through the shared TBA client since the server started
+with st.expander("TBA API Usage"):
+    client = get_tba_client()
+    if client is not None:
+        st.caption("fresh: answered from the cache; stale: answered from the cache and revalidated in the background; "
+                   "not_modified: revalidated with a 304; downloaded: full response; offline: TBA unreachable, answered from the cache.")
+        st.dataframe(client.stats(), use_container_width=True, hide_index=True)
@@ -2,9 +2,10 @@
 import streamlit as st
 import requests
 import pandas as pd
+import numpy as np
 from datetime import datetime
-import pytz
 from utils.utils import setup_sidebar_navigation
+from utils.tba_api import get_tba_client
 
 st.set_page_config(page_title="Match Schedule", page_icon="📅", layout="wide",initial_sidebar_state="collapsed")
 
@@ -34,22 +35,11 @@ if st.session_state.get("authority") not in allowed_authorities:
 st.title("📅 Match Schedule")
 st.markdown("View the match schedule for a specific event to plan your scouting.")
 
-# Use Streamlit secrets for the TBA API key
-try:
-    TBA_API_KEY = st.secrets["TBA"]["TBA_API_KEY"]
-except KeyError:
-    st.error("TBA API key not found in .streamlit/secrets.toml. Please ensure the file exists and contains 'TBA_API_KEY' under the [TBA] section.")
+# Shared TBA client (pooled connections, ETag revalidation, see utils.tba_api)
+tba = get_tba_client()
+if tba is None:
     st.stop()
 
-# Base URL for The Blue Alliance API v3
-BASE_URL = "https://www.thebluealliance.com/api/v3"
-
-# Headers for API requests
-headers = {
-    "X-TBA-Auth-Key": TBA_API_KEY,
-    "User-Agent": "ScoutingApp/1.0"
-}
-
 # Simple mapping of event locations to timezones (approximate)
 EVENT_TIMEZONES = {
     "cmptx": "America/Chicago",  # Houston, TX (Championship)
@@ -63,39 +53,27 @@ EVENT_TIMEZONES = {
 
 # Function to fetch all events for a given year
 def fetch_events_for_year(year):
-    url = f"{BASE_URL}/events/{year}/simple"
     try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        events = response.json()
-        return events
+        return tba.get(f"/events/{year}/simple")
     except requests.exceptions.RequestException as e:
         st.error(f"Error fetching events for {year}: {e}")
         return []
 
 # Function to fetch event details (to get location for timezone)
 def fetch_event_details(event_key):
-    url = f"{BASE_URL}/event/{event_key}"
     try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        event = response.json()
-        return event
+        return tba.get(f"/event/{event_key}")
     except requests.exceptions.RequestException as e:
         st.error(f"Error fetching event details: {e}")
         return None
 
 # Function to fetch match schedule from TBA API (live data only)
-def fetch_match_schedule(event_key):
-    url = f"{BASE_URL}/event/{event_key}/matches"
+def fetch_match_schedule(event_key, revalidate=False):
     try:
-        # Always fetch live data
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        matches = response.json()
-        return matches
+        # Served from the TBA cache first and revalidated in the background (see utils.tba_api)
+        return tba.get(f"/event/{event_key}/matches", revalidate=revalidate)
     except requests.exceptions.HTTPError as e:
-        if response.status_code == 404:
+        if e.response is not None and e.response.status_code == 404:
             st.error(f"Event key '{event_key}' not found. Please check the event key and try again.")
         else:
             st.error(f"Error fetching match schedule: {e}")
@@ -104,121 +82,78 @@ def fetch_match_schedule(event_key):
         st.error(f"Error connecting to The Blue Alliance API: {e}")
         return None
 
-# Function to process match data into a DataFrame
-def process_match_data(matches, event_key, team_number_filter=None):
-    if not matches:
-        return pd.DataFrame()
+# Readable names of the match levels shown, in schedule order
+COMP_LEVELS = {'qm': "Qualification", 'qf': "Quarterfinal", 'sf': "Semifinal", 'f': "Final"}
 
-    # Fetch event details to determine timezone
+# Function to find the event's timezone (from TBA, else guessed from the event key)
+def event_timezone(event_key):
     event = fetch_event_details(event_key)
-    if event and 'timezone' in event:
-        event_timezone = event['timezone']
-    else:
-        # Fallback: Guess timezone based on event key
-        event_code = event_key[4:]  # e.g., 'cmptx' from '2025cmptx'
-        event_timezone = EVENT_TIMEZONES.get(event_code, "UTC")
-        st.warning(f"Could not determine event timezone. Using {event_timezone} as a fallback.")
-
-    timezone = pytz.timezone(event_timezone)
-
-    # List to store match data
-    match_list = []
-
-    for match in matches:
-        # Skip matches that aren't qualification or playoff matches
-        if match['comp_level'] not in ['qm', 'qf', 'sf', 'f']:
-            continue
-
-        # Extract match number and competition level
-        comp_level = match['comp_level']
-        match_number = match['match_number']
-        
-        # Convert comp_level to a readable format
-        if comp_level == 'qm':
-            comp_level_readable = "Qualification"
-        elif comp_level == 'qf':
-            comp_level_readable = "Quarterfinal"
-        elif comp_level == 'sf':
-            comp_level_readable = "Semifinal"
-        elif comp_level == 'f':
-            comp_level_readable = "Final"
-        
-        match_display = f"{comp_level_readable} {match_number}"
-
-        # Extract team numbers for Red and Blue alliances
-        red_teams = match['alliances']['red']['team_keys']
-        blue_teams = match['alliances']['blue']['team_keys']
-        
-        # Remove 'frc' prefix from team keys for display
-        red_teams = [team.replace('frc', '') for team in red_teams]
-        blue_teams = [team.replace('frc', '') for team in blue_teams]
-        
-        red_teams_str = ", ".join(red_teams)
-        blue_teams_str = ", ".join(blue_teams)
-
-        # Check if the filtered team is in this match
-        highlight = False
-        if team_number_filter:
-            highlight = team_number_filter in red_teams or team_number_filter in blue_teams
-
-        # Extract scheduled and actual times
-        scheduled_time = match.get('time')
-        actual_time = match.get('actual_time')
-
-        # Determine the display time
-        if actual_time:
-            match_time = datetime.utcfromtimestamp(actual_time)
-            match_time = pytz.utc.localize(match_time).astimezone(timezone)
-            time_display = match_time.strftime('%Y-%m-%d %H:%M:%S %Z')
-        elif scheduled_time:
-            match_time = datetime.utcfromtimestamp(scheduled_time)
-            match_time = pytz.utc.localize(match_time).astimezone(timezone)
-            time_display = match_time.strftime('%Y-%m-%d %H:%M:%S %Z')
-        else:
-            time_display = "Not scheduled"
-
-        # Get match outcome if played
-        outcome = "N/A"
-        if actual_time:
-            red_score = match['alliances']['red']['score']
-            blue_score = match['alliances']['blue']['score']
-            if red_score > blue_score:
-                outcome = "Red Wins"
-            elif blue_score > red_score:
-                outcome = "Blue Wins"
-            else:
-                outcome = "Tie"
-
-        # Determine if the match is completed based on the outcome
-        is_completed = outcome != "N/A"
-
-        # Add match data to the list (no Status column)
-        match_list.append({
-            "Match": match_display,
-            "Time": time_display,
-            "Red Alliance": red_teams_str,
-            "Blue Alliance": blue_teams_str,
-            "Outcome": outcome,
-            "Highlight": highlight,
-            "IsCompleted": is_completed  # Hidden column for CSS
-        })
-
-    # Create DataFrame
-    df = pd.DataFrame(match_list)
-    
-    if df.empty:
-        return df
-
-    # Sort by match type and number
-    df['match_type_order'] = df['Match'].apply(lambda x: {'Qualification': 1, 'Quarterfinal': 2, 'Semifinal': 3, 'Final': 4}[x.split()[0]])
-    df['match_number'] = df['Match'].apply(lambda x: int(x.split()[1]))
-    df = df.sort_values(by=['match_type_order', 'match_number']).drop(columns=['match_type_order', 'match_number'])
-
-    # Filter by team number if provided
-    if team_number_filter:
-        df = df[df['Highlight']]
-
-    return df
+    if event and event.get('timezone'):
+        return event['timezone']
+    event_code = event_key[4:]  # e.g., 'cmptx' from '2025cmptx'
+    fallback = EVENT_TIMEZONES.get(event_code, "UTC")
+    st.warning(f"Could not determine event timezone. Using {fallback} as a fallback.")
+    return fallback
+
+# Function to build the schedule of an event, with column operations instead of a loop over matches.
+# Cached per version of the TBA response (its ETag), so reruns and team filters reuse it.
+@st.cache_data(max_entries=20, show_spinner=False)
+def build_schedule(event_key, version, timezone, _matches):
+    columns = ["Match", "Time", "Red Alliance", "Blue Alliance", "Outcome", "IsCompleted"]
+    if not _matches:
+        return pd.DataFrame(columns=columns)
+    # Only the fields shown are flattened: score_breakdown alone would add hundreds of columns
+    fields = ['comp_level', 'set_number', 'match_number', 'time', 'actual_time', 'alliances']
+    matches = pd.json_normalize([{field: match.get(field) for field in fields} for match in _matches])
+    matches = matches[matches['comp_level'].isin(list(COMP_LEVELS))]
+    if matches.empty:
+        return pd.DataFrame(columns=columns)
+    # Playoff sets share match numbers, so the set breaks ties
+    matches = matches.assign(
+        level_order=matches['comp_level'].map({level: order for order, level in enumerate(COMP_LEVELS)})
+    ).sort_values(['level_order', 'match_number', 'set_number'], kind='stable').reset_index(drop=True)
+
+    # Actual time once played, else the scheduled time, shown in the event's timezone
+    actual = pd.to_numeric(matches['actual_time'], errors='coerce')
+    actual = actual.where(actual > 0)
+    scheduled = pd.to_numeric(matches['time'], errors='coerce')
+    times = pd.to_datetime(actual.fillna(scheduled.where(scheduled > 0)), unit='s', utc=True).dt.tz_convert(timezone)
+
+    red_score = matches['alliances.red.score']
+    blue_score = matches['alliances.blue.score']
+    played = actual.notna()
+    outcome = np.select([red_score > blue_score, blue_score > red_score], ["Red Wins", "Blue Wins"], "Tie")
+
+    return pd.DataFrame({
+        "Match": matches['comp_level'].map(COMP_LEVELS) + " " + matches['match_number'].astype(str),
+        "Time": times.dt.strftime('%Y-%m-%d %H:%M:%S %Z').fillna("Not scheduled"),
+        "Red Alliance": matches['alliances.red.team_keys'].str.join(", ").str.replace("frc", "", regex=False),
+        "Blue Alliance": matches['alliances.blue.team_keys'].str.join(", ").str.replace("frc", "", regex=False),
+        "Outcome": np.where(played, outcome, "N/A"),
+        "IsCompleted": played
+    })
+
+# Function to keep the matches a team plays in (a mask over the cached schedule)
+def filter_schedule(schedule, team_number_filter):
+    if not team_number_filter:
+        return schedule
+    team = f", {team_number_filter.strip()}, "
+    in_match = (", " + schedule["Red Alliance"] + ", ").str.contains(team, regex=False) | \
+               (", " + schedule["Blue Alliance"] + ", ").str.contains(team, regex=False)
+    return schedule[in_match]
+
+# Function to style the schedule for st.dataframe: alliance colors, completed matches shaded
+def style_schedule(schedule):
+    completed = schedule["IsCompleted"].to_numpy()
+
+    def cell_styles(frame):
+        styles = pd.DataFrame("", index=frame.index, columns=frame.columns)
+        styles.loc[completed, :] = "background-color: #e6f3ff"
+        styles["Red Alliance"] += "; color: #d32f2f; font-weight: bold"
+        styles["Blue Alliance"] += "; color: #1976d2; font-weight: bold"
+        return styles
+
+    return schedule.drop(columns="IsCompleted").style.apply(cell_styles, axis=None)
 
 # Initialize session state for selected event and custom event key
 if 'selected_event' not in st.session_state:
@@ -263,51 +198,28 @@ with col2:
 
 # Fetch and display match schedule
 if event_key:
+    refresh_column, fetched_column = st.columns([1, 3])
+    with refresh_column:
+        refresh = st.button("Refresh from TBA", help="Check TBA for schedule changes now instead of in the background.")
     with st.spinner("Fetching match schedule..."):
-        matches = fetch_match_schedule(event_key)
-        if matches:
-            df = process_match_data(matches, event_key, team_number_filter)
-            if not df.empty:
-                st.subheader(f"Match Schedule for Event {event_key}")
-                # Add custom CSS to highlight filtered matches, color alliances, and highlight completed matches
-                st.markdown("""
-                    <style>
-                    /* Highlight rows for filtered team */
-                    tr:has(td[data-highlight="True"]) {
-                        background-color: #e6f3ff; /* Light blue background for filtered teams */
-                    }
-                    /* Color Red Alliance column */
-                    td:nth-child(3) {
-                        color: #d32f2f; /* Red */
-                        font-weight: bold;
-                    }
-                    /* Color Blue Alliance column */
-                    td:nth-child(4) {
-                        color: #1976d2; /* Blue */
-                        font-weight: bold;
-                    }
-                    /* Highlight completed matches in light blue */
-                    tr:has(td[data-completed="True"]) {
-                        background-color: #e6f3ff; /* Light blue for completed matches */
-                    }
-                    /* Style not-yet-completed matches with a white background */
-                    tr:has(td[data-completed="False"]) {
-                        background-color: #ffffff; /* White for not-yet-completed matches */
-                    }
-                    </style>
-                """, unsafe_allow_html=True)
-
-                # Add data-testid attributes for CSS targeting
-                for i, row in df.iterrows():
-                    df.at[i, 'IsCompleted'] = str(row['IsCompleted'])
-                    df.at[i, 'Highlight'] = str(row['Highlight'])
-                
-                # Drop hidden columns before rendering
-                display_df = df.drop(columns=['IsCompleted', 'Highlight'])
-                
-                # Render the table using st.markdown
-                st.markdown(display_df.to_html(escape=False, index=False), unsafe_allow_html=True)
-            else:
+        matches = fetch_match_schedule(event_key, revalidate=refresh)
+        kept = tba.cached(f"/event/{event_key}/matches")
+        if kept is not None:
+            with fetched_column:
+                st.caption(f"Schedule as of {datetime.fromtimestamp(kept['fetched_at']).strftime('%Y-%m-%d %H:%M:%S')} "
+                           "(kept locally; shown when TBA cannot be reached).")
+        if matches and kept is not None:
+            # Body and version from the same kept response: a background revalidation may
+            # replace it after fetch_match_schedule returned. Seeded ones have no ETag yet
+            schedule = build_schedule(event_key, kept['etag'] or kept['fetched_at'], event_timezone(event_key), kept['data'])
+            if schedule.empty:
                 st.warning("No qualification or playoff matches found for this event.")
+            else:
+                shown = filter_schedule(schedule, team_number_filter)
+                st.subheader(f"Match Schedule for Event {event_key}")
+                if shown.empty:
+                    st.info(f"Team {team_number_filter} has no matches in this schedule.")
+                else:
+                    st.dataframe(style_schedule(shown), use_container_width=True, hide_index=True)
 else:
     st.info("Please enter an event key to view the match schedule.")
\ No newline at end of file
@@ -1,13 +1,18 @@
 # app/7_Data_Management.py
 import streamlit as st
 import pandas as pd
-import firebase_admin
-from firebase_admin import credentials, firestore, storage
 from io import StringIO
-import time
 from datetime import datetime
 import hashlib
-from utils.utils import setup_sidebar_navigation
+from utils.validation import (
+    MATCH_RULES, PIT_RULES, check_records, error_flag_writes, apply_writes, flagged_errors, revalidate_collection
+)
+from utils.storage import DESCENDING, run_transaction
+from utils.summaries import write_match_documents, rebuild_team_summaries
+from utils.bulk import move_documents, delete_documents, rekey_match_documents
+from utils.csv_import import import_csv, event_from_filename
+from utils.export import export_controls
+from utils.utils import setup_sidebar_navigation, get_storage, load_collection, query_page, cached_documents, patch_collection_cache, current_event_key, assign_match_doc_ids, pit_doc_id, invalidate_collection_cache, get_collection_version, rerun_on_collection_change, describe_collection_load, deletion_marker
 import requests
 
 st.set_page_config(page_title="Data Management", page_icon="🔧", layout="wide", initial_sidebar_state="collapsed")
@@ -36,34 +41,19 @@ st.session_state.active_page = "Data Management"
 st.title("🔧 Data Management")
 st.info(f"Welcome, {st.session_state.username}! Manage scouting data, users, and robot photos in Firebase.")
 
-# Initialize Firebase
+# Initialize storage using the utility function
 try:
-    firebase_creds = {
-        "type": st.secrets["firebase"]["type"],
-        "project_id": st.secrets["firebase"]["project_id"],
-        "private_key_id": st.secrets["firebase"]["private_key_id"],
-        "private_key": st.secrets["firebase"]["private_key"],
-        "client_email": st.secrets["firebase"]["client_email"],
-        "client_id": st.secrets["firebase"]["client_id"],
-        "auth_uri": st.secrets["firebase"]["auth_uri"],
-        "token_uri": st.secrets["firebase"]["token_uri"],
-        "auth_provider_x509_cert_url": st.secrets["firebase"]["auth_provider_x509_cert_url"],
-        "client_x509_cert_url": st.secrets["firebase"]["client_x509_cert_url"]
-    }
-    if not firebase_admin._apps:
-        cred = credentials.Certificate(firebase_creds)
-        firebase_admin.initialize_app(cred, {
-            'storageBucket': f"{st.secrets['firebase']['project_id']}.appspot.com"
-        })
-except KeyError as e:
-    st.error(f"Firebase credentials not found in secrets.toml: {e}")
-    st.stop()
+    db, bucket = get_storage()
 except Exception as e:
-    st.error(f"Error initializing Firebase: {e}")
+    st.error(f"Error initializing storage: {e}")
     st.stop()
 
-db = firestore.client()
-bucket = storage.bucket()
+# Messages of actions that end with st.rerun(), shown once on the next run
+def notify_after_rerun(message):
+    st.session_state.setdefault("data_management_notices", []).append(message)
+
+for notice in st.session_state.pop("data_management_notices", []):
+    st.success(notice)
 
 # Function to hash passwords
 def hash_password(password):
@@ -100,111 +90,99 @@ pit_desired_columns = [
     'robot_photo_url'
 ]
 
-# Define required fields for error checking
-match_required_fields = [
-    'team_number', 'match_number', 'alliance_color', 'starting_position', 'scouter_name',
-    'match_outcome', 'auto_taxi_left', 'climb_status', 'defense_rating', 'speed_rating', 'driver_skill_rating', 'primary_role'
-]
-
-# Define required fields for error checking
-pit_required_fields = [
-    'team_number', 'scouter_name', 'drivetrain_type', 'endgame_capability', 'preferred_role',
-    'programming_language', 'coral_pickup_method', 'algae_pickup_method'
-]
-
-# Define numeric fields that should be non-negative integers
-match_numeric_fields = [
-    'team_number', 'match_number',
-    'auto_coral_l1', 'auto_coral_l2', 'auto_coral_l3', 'auto_coral_l4',
-    'auto_missed_coral_l1', 'auto_missed_coral_l2', 'auto_missed_coral_l3', 'auto_missed_coral_l4',
-    'auto_algae_barge', 'auto_algae_processor', 'auto_missed_algae_barge', 'auto_missed_algae_processor', 'auto_algae_removed',
-    'teleop_coral_l1', 'teleop_coral_l2', 'teleop_coral_l3', 'teleop_coral_l4',
-    'teleop_missed_coral_l1', 'teleop_missed_coral_l2', 'teleop_missed_coral_l3', 'teleop_missed_coral_l4',
-    'teleop_algae_barge', 'teleop_algae_processor', 'teleop_missed_algae_barge', 'teleop_missed_algae_processor', 'teleop_algae_removed'
-]
-
-pit_numeric_fields = [
-    'team_number'
-]
+# Function to check whether a collection has any records, reading at most one document id
+def has_records(collection):
+    try:
+        return bool(db.collection(collection).select([]).limit(1).get())
+    except Exception as e:
+        st.error(f"Error checking {collection} for records: {e}")
+        return False
 
-# Define rating fields that should be between 1 and 5
-match_rating_fields = ['defense_rating', 'speed_rating', 'driver_skill_rating']
-pit_rating_fields = []
-
-# Function to fetch match data
-def fetch_match_data(for_selection=False, force_refresh=False):
-    if 'match_data' not in st.session_state:
-        st.session_state.match_data = pd.DataFrame()
-    
-    if 'last_match_fetch_time' not in st.session_state:
-        st.session_state.last_match_fetch_time = 0
-    
-    if st.session_state.active_page != "Data Management" and not force_refresh:
-        return st.session_state.match_data if not for_selection else st.session_state.match_data.copy()
-
-    current_time = time.time()
-    if force_refresh or current_time - st.session_state.last_match_fetch_time >= 30 or st.session_state.match_data.empty:
-        try:
-            docs = db.collection(MATCH_SCOUT_COLLECTION)\
-                     .select(match_desired_columns + ['doc_id'])\
-                     .order_by('timestamp', direction=firestore.Query.DESCENDING)\
-                     .get()
-            data = []
-            for doc in docs:
-                doc_data = doc.to_dict()
-                doc_data['doc_id'] = doc.id
-                data.append(doc_data)
-            st.session_state.match_data = pd.DataFrame(data)
-            st.session_state.last_match_fetch_time = current_time
-            st.session_state.match_fetch_log = f"Match data fetched at {datetime.fromtimestamp(current_time).strftime('%Y-%m-%d %H:%M:%S')}: {len(data)} documents"
-        except Exception as e:
-            st.error(f"Error fetching match data from Firestore: {e}")
-            st.session_state.match_data = pd.DataFrame()
-
-    if for_selection:
-        return st.session_state.match_data.copy()
-    return st.session_state.match_data
-
-# Function to fetch pit data
-def fetch_pit_data(for_selection=False, force_refresh=False):
-    if 'pit_data' not in st.session_state:
-        st.session_state.pit_data = pd.DataFrame()
-    
-    if 'last_pit_fetch_time' not in st.session_state:
-        st.session_state.last_pit_fetch_time = 0
-    
-    if st.session_state.active_page != "Data Management" and not force_refresh:
-        return st.session_state.pit_data if not for_selection else st.session_state.pit_data.copy()
+# Function to fetch the records a selector offers: their doc_id and the given columns only, newest first
+def fetch_record_options(collection, columns=()):
+    """A column projection served from the shared cache (see load_collection), so the
+    Delete, Archive and Unarchive tabs never load whole records."""
+    try:
+        data = load_collection(collection, sync=True, columns=list(columns))
+    except Exception as e:
+        st.error(f"Error fetching {collection} records from Firestore: {e}")
+        return pd.DataFrame()
+    if 'timestamp' in data.columns:
+        data = data.sort_values('timestamp', ascending=False, key=lambda col: col.astype(str))
+    return data.reset_index(drop=True)
+
+# Filters of the View Data tables: (field, label, kind); applied by Firestore
+VIEW_FILTERS = {
+    MATCH_SCOUT_COLLECTION: [('team_number', "Team Number", 'number'), ('match_number', "Match Number", 'number'),
+                             ('scouter_name', "Scouter Name", 'text')],
+    PIT_SCOUT_COLLECTION: [('team_number', "Team Number", 'number'), ('scouter_name', "Scouter Name", 'text')]
+}
+# The archive tables page through the same way, without filters
+VIEW_FILTERS[ARCHIVED_MATCH_SCOUT_COLLECTION] = []
+VIEW_FILTERS[ARCHIVED_PIT_SCOUT_COLLECTION] = []
+
+# Function to show a collection one page at a time, newest first, with Firestore-side filters
+def show_data_page(collection, label, desired_columns, export=True):
+    """Only the current page is read; exports are streamed page by page (see utils.export)."""
+    key = f"view_{label}"
+    filter_columns = st.columns(len(VIEW_FILTERS[collection]) + 1)
+    filters = []
+    for column, (field, field_label, kind) in zip(filter_columns, VIEW_FILTERS[collection]):
+        with column:
+            value = st.text_input(field_label, key=f"{key}_{field}").strip()
+        if value and kind == 'number':
+            if not value.isdigit():
+                st.warning(f"{field_label} must be a number.")
+                return
+            value = int(value)
+        if value:
+            filters.append((field, value))
+    with filter_columns[-1]:
+        page_size = st.selectbox("Rows per page", [25, 50, 100], index=1, key=f"{key}_page_size")
+
+    # Last document of every page before the current one; back to the first page when the filters change
+    if st.session_state.get(f"{key}_query") != (filters, page_size):
+        st.session_state[f"{key}_query"] = (filters, page_size)
+        st.session_state[f"{key}_cursors"] = [None]
+    cursors = st.session_state[f"{key}_cursors"]
+    # The version the table is rendered with, for rerun_on_collection_change(key + '_version')
+    st.session_state[f"{key}_version"] = [get_collection_version(collection)]
+    try:
+        page, last, more = query_page(collection, filters, page_size, start_after=cursors[-1])
+    except Exception as e:
+        st.error(f"Error fetching {label} data from Firestore: {e}")
+        return
+
+    if not page.empty:
+        display_columns = [col for col in desired_columns if col in page.columns and col != 'doc_id']
+        st.dataframe(page[display_columns], use_container_width=True)
+    elif filters:
+        st.info(f"No {label} records match the filters.")
+    else:
+        st.info(f"No {label} data available in the {collection} collection.")
 
-    current_time = time.time()
-    if force_refresh or current_time - st.session_state.last_pit_fetch_time >= 30 or st.session_state.pit_data.empty:
-        try:
-            docs = db.collection(PIT_SCOUT_COLLECTION)\
-                     .select(pit_desired_columns + ['doc_id'])\
-                     .order_by('timestamp', direction=firestore.Query.DESCENDING)\
-                     .get()
-            data = []
-            for doc in docs:
-                doc_data = doc.to_dict()
-                doc_data['doc_id'] = doc.id
-                data.append(doc_data)
-            st.session_state.pit_data = pd.DataFrame(data)
-            st.session_state.last_pit_fetch_time = current_time
-            st.session_state.pit_fetch_log = f"Pit data fetched at {datetime.fromtimestamp(current_time).strftime('%Y-%m-%d %H:%M:%S')}: {len(data)} documents"
-        except Exception as e:
-            st.error(f"Error fetching pit data from Firestore: {e}")
-            st.session_state.pit_data = pd.DataFrame()
+    previous_column, page_column, next_column = st.columns([1, 2, 1])
+    with previous_column:
+        if st.button("Previous Page", key=f"{key}_previous", disabled=len(cursors) == 1):
+            cursors.pop()
+            st.rerun()
+    with page_column:
+        st.caption(f"Page {len(cursors)} ({len(page)} records)")
+    with next_column:
+        if st.button("Next Page", key=f"{key}_next", disabled=not more):
+            cursors.append(last)
+            st.rerun()
 
-    if for_selection:
-        return st.session_state.pit_data.copy()
-    return st.session_state.pit_data
+    # Streamed straight from Firestore when the download button is clicked
+    if export:
+        export_controls(db, label, key=f"export_{label}")
 
 # Function to fetch edit history
 def fetch_edit_history(collection_type="match"):
     try:
         docs = db.collection(EDIT_HISTORY_COLLECTION)\
                  .where('collection_type', '==', collection_type)\
-                 .order_by('edit_timestamp', direction=firestore.Query.DESCENDING).get()
+                 .order_by('edit_timestamp', direction=DESCENDING).get()
         data = []
         for doc in docs:
             doc_data = doc.to_dict()
@@ -218,6 +196,33 @@ def fetch_edit_history(collection_type="match"):
             st.error(f"Error fetching edit history from Firestore: {e}")
         return pd.DataFrame()
 
+# Columns shown for every edit history record
+HISTORY_COLUMNS = ['History ID', 'Original Document ID', 'Edit Timestamp', 'Changes']
+
+# Function to turn edit history records into one table row each
+def flatten_edit_history(edit_history):
+    """Edits store the changed fields ('changes'); older records hold a copy of the whole
+    original document ('original_data'), shown in the field columns as before."""
+    flattened_data = []
+    for _, row in edit_history.iterrows():
+        record = {
+            'History ID': row['history_id'],
+            'Original Document ID': row['original_doc_id'],
+            'Edit Timestamp': row['edit_timestamp'],
+            'Changes': ''
+        }
+        changes = row.get('changes')
+        if isinstance(changes, dict):
+            record['Changes'] = "; ".join(f"{field}: {change.get('old')} → {change.get('new')}" for field, change in changes.items())
+            if isinstance(row.get('new_doc_id'), str):
+                record['Changes'] = f"moved to {row['new_doc_id']}; " + record['Changes']
+        original_data = row.get('original_data')
+        if isinstance(original_data, dict):
+            for key, value in original_data.items():
+                record[key] = value
+        flattened_data.append(record)
+    return pd.DataFrame(flattened_data)
+
 # Function to delete edit history records from Firestore
 def delete_edit_history(history_ids):
     try:
@@ -230,53 +235,17 @@ def delete_edit_history(history_ids):
 # Function to delete all edit history records from Firestore
 def delete_all_edit_history(collection_type):
     try:
-        docs = db.collection(EDIT_HISTORY_COLLECTION).where('collection_type', '==', collection_type).get()
-        history_ids = [doc.id for doc in docs]
-        if not history_ids:
+        query = db.collection(EDIT_HISTORY_COLLECTION).where('collection_type', '==', collection_type)
+        result = bulk_delete(EDIT_HISTORY_COLLECTION, f"{collection_type} edit history", query, unflag=False)
+        if result is None:
             st.info(f"No edit history records to delete for {collection_type} data.")
             return
-        for history_id in history_ids:
-            db.collection(EDIT_HISTORY_COLLECTION).document(history_id).delete()
-        st.success(f"Successfully deleted all {len(history_ids)} edit history records for {collection_type} data.")
+        if result['deleted']:
+            st.success(f"Successfully deleted all {len(result['deleted'])} edit history records for {collection_type} data "
+                       f"({result['per_second']:.0f} records/s).")
     except Exception as e:
         st.error(f"Error deleting all edit history records: {e}")
 
-# Function to fetch all archived match data from Firestore with caching
-def fetch_archived_match_data(for_selection=False):
-    if 'archived_match_data' not in st.session_state:
-        try:
-            docs = db.collection(ARCHIVED_MATCH_SCOUT_COLLECTION).get()
-            data = []
-            for doc in docs:
-                doc_data = doc.to_dict()
-                doc_data['doc_id'] = doc.id
-                data.append(doc_data)
-            st.session_state.archived_match_data = pd.DataFrame(data)
-        except Exception as e:
-            st.error(f"Error fetching archived match data from Firestore: {e}")
-            st.session_state.archived_match_data = pd.DataFrame()
-    if for_selection:
-        return st.session_state.archived_match_data.copy()
-    return st.session_state.archived_match_data
-
-# Function to fetch all archived pit data from Firestore with caching
-def fetch_archived_pit_data(for_selection=False):
-    if 'archived_pit_data' not in st.session_state:
-        try:
-            docs = db.collection(ARCHIVED_PIT_SCOUT_COLLECTION).get()
-            data = []
-            for doc in docs:
-                doc_data = doc.to_dict()
-                doc_data['doc_id'] = doc.id
-                data.append(doc_data)
-            st.session_state.archived_pit_data = pd.DataFrame(data)
-        except Exception as e:
-            st.error(f"Error fetching archived pit data from Firestore: {e}")
-            st.session_state.archived_pit_data = pd.DataFrame()
-    if for_selection:
-        return st.session_state.archived_pit_data.copy()
-    return st.session_state.archived_pit_data
-
 # Function to fetch doc IDs for the edit dropdown
 def fetch_doc_ids_for_edit(collection, label_fields):
     cache_key = f"doc_ids_for_edit_{collection}"
@@ -318,57 +287,124 @@ def fetch_single_record(collection, doc_id):
         st.error(f"Error fetching record {doc_id} from {collection}: {e}")
         return pd.DataFrame()
 
-# Function to update a record in Firestore by deleting and recreating
+# Function to work out which fields an edit changes
+def field_changes(before, updated):
+    """{field: {'old': value, 'new': value}} for the fields of updated that differ from before."""
+    changes = {}
+    for field, value in updated.items():
+        old = before.get(field)
+        # The edit form shows missing text fields as '' (or 'nan'); leaving them alone is no change
+        if old is None and value in (None, '', 'nan'):
+            continue
+        if old != value:
+            changes[field] = {'old': old, 'new': value}
+    return changes
+
+# Function to update a record in place, with only the changed fields in the edit history
 def update_data(collection, doc_id, updated_data, collection_type):
     try:
-        original_doc = db.collection(collection).document(doc_id).get()
-        if original_doc.exists:
-            edit_timestamp = datetime.now().strftime('%Y%m%dT%H%M%S')
-            edit_history_data = {
-                'collection_type': collection_type,
-                'original_doc_id': doc_id,
-                'original_data': original_doc.to_dict(),
-                'edit_timestamp': edit_timestamp
-            }
-            db.collection(EDIT_HISTORY_COLLECTION).document(f"edit_{doc_id}_{edit_timestamp}").set(edit_history_data)
-        else:
-            st.warning(f"Original record {doc_id} not found in {collection}. Proceeding with new record creation.")
+        doc_ref = db.collection(collection).document(doc_id)
+        original_doc = doc_ref.get()
+        if not original_doc.exists:
+            st.error(f"Record {doc_id} not found in {collection}.")
+            return
+        original_data = original_doc.to_dict()
+        if not updated_data.get('event_key') and original_data.get('event_key'):
+            updated_data['event_key'] = original_data['event_key']
 
-        db.collection(collection).document(doc_id).delete()
-        
-        team_number = updated_data['team_number']
-        timestamp = datetime.now().strftime('%Y%m%dT%H%M%S')
+        # The id follows the event, match, team and scouter; an edit that keeps them updates in place
         if collection == MATCH_SCOUT_COLLECTION:
-            match_number = updated_data['match_number']
-            new_doc_id = f"team{team_number}_match{match_number}_{timestamp}"
+            new_doc_id = assign_match_doc_ids(db, [updated_data], replacing=[doc_id])[0]
         else:  # PIT_SCOUT_COLLECTION
-            new_doc_id = f"team{team_number}_pit_{timestamp}"
-        
-        updated_data['timestamp'] = timestamp
-        db.collection(collection).document(new_doc_id).set(updated_data)
-        
-        if f"doc_ids_for_edit_{collection}" in st.session_state:
-            del st.session_state[f"doc_ids_for_edit_{collection}"]
-        
+            new_doc_id = pit_doc_id(updated_data['event_key'], updated_data['team_number'])
+        # Only the fields this edit changes are written, so concurrent changes to other fields survive
+        edited = {field: updated_data[field] for field in field_changes(original_data, updated_data)}
+        if not edited and new_doc_id == doc_id:
+            st.info(f"No changes to record {doc_id}.")
+            return
+        edit_timestamp = datetime.now().strftime('%Y%m%dT%H%M%S')
+        history_ref = db.collection(EDIT_HISTORY_COLLECTION).document(f"edit_{doc_id}_{edit_timestamp}")
+
+        def history(before):
+            # The diff is taken against the record as read inside the transaction
+            changes = field_changes(before, {field: value for field, value in edited.items() if field != 'timestamp'})
+            entry = {'collection_type': collection_type, 'original_doc_id': doc_id, 'changes': changes,
+                     'edit_timestamp': edit_timestamp}
+            if new_doc_id != doc_id:
+                entry['new_doc_id'] = new_doc_id
+            return entry, dict({field: change['new'] for field, change in changes.items()}, timestamp=edited['timestamp'])
+
+        # ISO format like save_data, so the record sorts after the incremental sync watermark
+        edited['timestamp'] = datetime.now().isoformat()
+        rules = MATCH_RULES if collection == MATCH_SCOUT_COLLECTION else PIT_RULES
+
+        def flag_writes(new_data):
+            # The edited record is checked again; the old id leaves the index when the record moves
+            flagged, checked = check_records(db, collection, {new_doc_id: new_data}, rules, exclude={doc_id})
+            return error_flag_writes(db, collection, checked | {doc_id}, flagged)
+
         if collection == MATCH_SCOUT_COLLECTION:
-            if 'match_data' in st.session_state:
-                del st.session_state.match_data
-            st.session_state.last_match_fetch_time = 0
+            # Update the record, record the edit and update team_summaries in one transaction
+            def record_edit(transaction, before):
+                transaction.set(history_ref, history(before[doc_id])[0])
+                apply_writes(transaction, flag_writes(dict(before[doc_id], **edited)))
+            if new_doc_id == doc_id:
+                write_match_documents(db, updates={doc_id: edited}, extra_writes=record_edit)
+            else:
+                write_match_documents(db, {new_doc_id: dict(original_data, **edited)}, [doc_id], extra_writes=record_edit)
         else:
-            if 'pit_data' in st.session_state:
-                del st.session_state.pit_data
-            st.session_state.last_pit_fetch_time = 0
-        st.success(f"Record successfully updated! Old record {doc_id} deleted, new record created with ID {new_doc_id}. Edit history recorded.")
-        st.rerun()
+            def apply(transaction):
+                snapshot = doc_ref.get(transaction=transaction)
+                if not snapshot.exists:
+                    raise KeyError(f"Record {doc_id} no longer exists")
+                before = snapshot.to_dict()
+                entry, fields = history(before)
+                transaction.set(history_ref, entry)
+                apply_writes(transaction, flag_writes(dict(before, **fields)))
+                if new_doc_id == doc_id:
+                    transaction.update(doc_ref, fields)
+                else:
+                    transaction.delete(doc_ref)
+                    transaction.set(db.collection(collection).document(new_doc_id), dict(before, **fields))
+                    apply_writes(transaction, [deletion_marker(db, collection)])
+                return dict(before, **fields)
+            new_data = run_transaction(db, apply)
+            patch_collection_cache(collection, upserts={new_doc_id: new_data},
+                                   deleted_ids=[doc_id] if new_doc_id != doc_id else ())
+
+        # The cached collection was patched in place; the tables pick it up through its version.
+        # Only a changed id changes the labels of the edit selector
+        if new_doc_id == doc_id:
+            st.success(f"Record {doc_id} successfully updated! Edit history recorded.")
+        else:
+            if f"doc_ids_for_edit_{collection}" in st.session_state:
+                del st.session_state[f"doc_ids_for_edit_{collection}"]
+            st.success(f"Record successfully updated! Old record {doc_id} deleted, new record created with ID {new_doc_id}. Edit history recorded.")
     except Exception as e:
         st.error(f"Error updating record {doc_id} in {collection}: {e}")
 
+# Records deleted per transaction or batch: each takes two writes (the record and its
+# validation_errors entry), match records also their teams' team_summaries updates
+DELETE_CHUNK_SIZE = 100
+
 # Function to delete records from Firestore
 def delete_data(collection, doc_ids, data_type):
+    deleted = 0
     try:
-        for doc_id in doc_ids:
-            db.collection(collection).document(doc_id).delete()
-            st.success(f"Successfully deleted {data_type} record {doc_id}. The table will update automatically.")
+        doc_ids = list(doc_ids)
+        for start in range(0, len(doc_ids), DELETE_CHUNK_SIZE):
+            chunk = doc_ids[start:start + DELETE_CHUNK_SIZE]
+            if collection == MATCH_SCOUT_COLLECTION:
+                # Also patches the cached match collection
+                write_match_documents(db, delete_ids=chunk, extra_writes=lambda transaction, before: apply_writes(
+                    transaction, error_flag_writes(db, collection, before, {})))
+            else:
+                batch = db.batch()
+                apply_writes(batch, [('delete', db.collection(collection).document(doc_id), None) for doc_id in chunk] +
+                             error_flag_writes(db, collection, chunk, {}) + [deletion_marker(db, collection)])
+                batch.commit()
+                patch_collection_cache(collection, deleted_ids=chunk)
+            deleted += len(chunk)
         if f"doc_ids_for_edit_{collection}" in st.session_state:
             del st.session_state[f"doc_ids_for_edit_{collection}"]
         if collection == MATCH_SCOUT_COLLECTION:
@@ -379,21 +415,37 @@ def delete_data(collection, doc_ids, data_type):
             if 'pit_data' in st.session_state:
                 del st.session_state.pit_data
             st.session_state.last_pit_fetch_time = 0
+        notify_after_rerun(f"Successfully deleted {deleted} {data_type} records.")
         st.rerun()
     except Exception as e:
-        st.error(f"Error deleting {data_type} records: {e}")
+        st.error(f"Error deleting {data_type} records ({deleted} of {len(doc_ids)} deleted): {e}")
+
+# Function to delete every record a query returns with parallel batched deletes
+def bulk_delete(collection, label, query=None, unflag=True):
+    """Delete with utils.bulk.delete_documents behind a progress bar; None if there was nothing to delete."""
+    progress_bar = st.progress(0.0, text=f"Deleting {label} records...")
+    result = delete_documents(
+        db, collection, query, unflag=unflag,
+        progress=lambda done, listed: progress_bar.progress(min(done / listed, 1.0), text=f"{done} {label} records deleted")
+    )
+    progress_bar.empty()
+    if not result['deleted'] and not result['failed']:
+        return None
+    print(f"Deleted {len(result['deleted'])} {label} records in {result['batches']} batches "
+          f"({result['retries']} retries, {result['seconds']:.2f}s, {result['per_second']:.0f} records/s)")
+    if result['failed']:
+        st.error(f"{len(result['failed'])} {label} records could not be deleted after retries. Run the delete again to remove them.")
+    return result
 
 # Function to delete all records from Firestore
 def delete_all_data(collection, data_type):
     try:
-        docs = db.collection(collection).get()
-        doc_ids = [doc.id for doc in docs]
-        if not doc_ids:
+        result = bulk_delete(collection, data_type)
+        if result is None:
             st.info(f"No {data_type} records to delete.")
             return
-        for doc_id in doc_ids:
-            db.collection(collection).document(doc_id).delete()
-        st.success(f"Successfully deleted all {len(doc_ids)} {data_type} records. The table will update automatically.")
+        if collection == MATCH_SCOUT_COLLECTION:
+            rebuild_team_summaries(db)
         if f"doc_ids_for_edit_{collection}" in st.session_state:
             del st.session_state[f"doc_ids_for_edit_{collection}"]
         if collection == MATCH_SCOUT_COLLECTION:
@@ -404,215 +456,97 @@ def delete_all_data(collection, data_type):
             if 'pit_data' in st.session_state:
                 st.session_state.pit_data = pd.DataFrame()
             st.session_state.last_pit_fetch_time = 0
+        if result['failed']:
+            return
+        notify_after_rerun(f"Successfully deleted all {len(result['deleted'])} {data_type} records in {result['seconds']:.1f}s "
+                           f"({result['per_second']:.0f} records/s).")
         st.rerun()
     except Exception as e:
         st.error(f"Error deleting all {data_type} records: {e}")
 
-# Function to archive records
-def archive_data(collection, archived_collection, doc_ids, data_type):
-    try:
-        for doc_id in doc_ids:
-            doc_ref = db.collection(collection).document(doc_id)
-            doc = doc_ref.get()
+# Archive collections; their tables on this page are read one page at a time
+ARCHIVED_COLLECTIONS = (ARCHIVED_MATCH_SCOUT_COLLECTION, ARCHIVED_PIT_SCOUT_COLLECTION)
+
+# Function to collect the records to move from data this page already has
+def documents_to_move(collection, doc_ids=None):
+    """{doc_id: data} of the records to move (all records if doc_ids is None).
+
+    Active records come from the shared cache and only records missing there are
+    read from Firestore. Archived records are read by id; moving all of them reads
+    the archive once, so records archived elsewhere are included.
+    """
+    if collection in ARCHIVED_COLLECTIONS:
+        if doc_ids is None:
+            return {doc.id: doc.to_dict() for doc in db.collection(collection).stream()}
+        documents = {}
+    else:
+        load_collection(collection, sync=True)  # Brings the shared cache up to date
+        documents = cached_documents(collection, doc_ids)
+        if doc_ids is None:
+            return documents
+    for doc_id in doc_ids:
+        if doc_id not in documents:
+            doc = db.collection(collection).document(doc_id).get()
             if doc.exists:
-                doc_data = doc.to_dict()
-                db.collection(archived_collection).document(doc_id).set(doc_data)
-                doc_ref.delete()
-                st.success(f"Successfully archived {data_type} record {doc_id}. The table will update automatically.")
-            else:
+                documents[doc_id] = doc.to_dict()
+    return documents
+
+# Function to move records between a collection and its archive with batched writes
+def move_records(source, target, doc_ids, data_type, verb):
+    active = target if source in ARCHIVED_COLLECTIONS else source
+    try:
+        documents = documents_to_move(source, doc_ids)
+        for doc_id in doc_ids or []:
+            if doc_id not in documents:
                 st.error(f"{data_type} record {doc_id} not found.")
-        if f"doc_ids_for_edit_{collection}" in st.session_state:
-            del st.session_state[f"doc_ids_for_edit_{collection}"]
-        if collection == MATCH_SCOUT_COLLECTION:
-            try:
-                docs = db.collection(ARCHIVED_MATCH_SCOUT_COLLECTION).get()
-                data = []
-                for doc in docs:
-                    doc_data = doc.to_dict()
-                    doc_data['doc_id'] = doc.id
-                    data.append(doc_data)
-                st.session_state.archived_match_data = pd.DataFrame(data)
-            except Exception as e:
-                st.error(f"Error fetching fresh archived match data: {e}")
-                st.session_state.archived_match_data = pd.DataFrame()
+        if not documents:
+            st.info(f"No {data_type} records to {verb}.")
+            return
+
+        progress_bar = st.progress(0.0, text=f"Moving {len(documents)} {data_type} records...")
+        result = move_documents(
+            db, source, target, documents,
+            progress=lambda done, total: progress_bar.progress(done / total, text=f"{done} of {total} {data_type} records {verb}d")
+        )
+
+        if f"doc_ids_for_edit_{active}" in st.session_state:
+            del st.session_state[f"doc_ids_for_edit_{active}"]
+        if active == MATCH_SCOUT_COLLECTION:
             if 'match_data' in st.session_state:
                 del st.session_state.match_data
             st.session_state.last_match_fetch_time = 0
         else:
-            try:
-                docs = db.collection(ARCHIVED_PIT_SCOUT_COLLECTION).get()
-                data = []
-                for doc in docs:
-                    doc_data = doc.to_dict()
-                    doc_data['doc_id'] = doc.id
-                    data.append(doc_data)
-                st.session_state.archived_pit_data = pd.DataFrame(data)
-            except Exception as e:
-                st.error(f"Error fetching fresh archived pit data: {e}")
-                st.session_state.archived_pit_data = pd.DataFrame()
             if 'pit_data' in st.session_state:
                 del st.session_state.pit_data
             st.session_state.last_pit_fetch_time = 0
+        notify_after_rerun(f"Successfully {verb}d {len(result['moved'])} {data_type} records in {result['batches']} batches "
+                           f"({result['seconds']:.1f}s).")
         st.rerun()
     except Exception as e:
-        st.error(f"Error archiving {data_type} records: {e}")
+        st.error(f"Error moving {data_type} records from {source} to {target}: {e}")
+
+# Function to archive records
+def archive_data(collection, archived_collection, doc_ids, data_type):
+    move_records(collection, archived_collection, doc_ids, data_type, "archive")
 
 # Function to archive all records
 def archive_all_data(collection, archived_collection, data_type):
-    try:
-        docs = db.collection(collection).get()
-        doc_ids = [doc.id for doc in docs]
-        if not doc_ids:
-            st.info(f"No {data_type} records to archive.")
-            return
-        for doc_id in doc_ids:
-            doc_ref = db.collection(collection).document(doc_id)
-            doc = doc_ref.get()
-            if doc.exists:
-                doc_data = doc.to_dict()
-                db.collection(archived_collection).document(doc_id).set(doc_data)
-                doc_ref.delete()
-        st.success(f"Successfully archived all {len(doc_ids)} {data_type} records. The table will update automatically.")
-        if f"doc_ids_for_edit_{collection}" in st.session_state:
-            del st.session_state[f"doc_ids_for_edit_{collection}"]
-        if collection == MATCH_SCOUT_COLLECTION:
-            try:
-                docs = db.collection(ARCHIVED_MATCH_SCOUT_COLLECTION).get()
-                data = []
-                for doc in docs:
-                    doc_data = doc.to_dict()
-                    doc_data['doc_id'] = doc.id
-                    data.append(doc_data)
-                st.session_state.archived_match_data = pd.DataFrame(data)
-            except Exception as e:
-                st.error(f"Error fetching fresh archived match data: {e}")
-                st.session_state.archived_match_data = pd.DataFrame()
-            if 'match_data' in st.session_state:
-                st.session_state.match_data = pd.DataFrame()
-            st.session_state.last_match_fetch_time = 0
-        else:
-            try:
-                docs = db.collection(ARCHIVED_PIT_SCOUT_COLLECTION).get()
-                data = []
-                for doc in docs:
-                    doc_data = doc.to_dict()
-                    doc_data['doc_id'] = doc.id
-                    data.append(doc_data)
-                st.session_state.archived_pit_data = pd.DataFrame(data)
-            except Exception as e:
-                st.error(f"Error fetching fresh archived pit data: {e}")
-                st.session_state.archived_pit_data = pd.DataFrame()
-            if 'pit_data' in st.session_state:
-                st.session_state.pit_data = pd.DataFrame()
-            st.session_state.last_pit_fetch_time = 0
-        st.rerun()
-    except Exception as e:
-        st.error(f"Error archiving all {data_type} records: {e}")
+    move_records(collection, archived_collection, None, data_type, "archive")
 
 # Function to unarchive records
 def unarchive_data(collection, archived_collection, doc_ids, data_type):
-    try:
-        for doc_id in doc_ids:
-            doc_ref = db.collection(archived_collection).document(doc_id)
-            doc = doc_ref.get()
-            if doc.exists:
-                doc_data = doc.to_dict()
-                db.collection(collection).document(doc_id).set(doc_data)
-                doc_ref.delete()
-                st.success(f"Successfully unarchived {data_type} record {doc_id}. The table will update automatically.")
-            else:
-                st.error(f"Archived {data_type} record {doc_id} not found.")
-        if f"doc_ids_for_edit_{collection}" in st.session_state:
-            del st.session_state[f"doc_ids_for_edit_{collection}"]
-        if collection == MATCH_SCOUT_COLLECTION:
-            try:
-                docs = db.collection(ARCHIVED_MATCH_SCOUT_COLLECTION).get()
-                data = []
-                for doc in docs:
-                    doc_data = doc.to_dict()
-                    doc_data['doc_id'] = doc.id
-                    data.append(doc_data)
-                st.session_state.archived_match_data = pd.DataFrame(data)
-            except Exception as e:
-                st.error(f"Error fetching fresh archived match data: {e}")
-                st.session_state.archived_match_data = pd.DataFrame()
-            if 'match_data' in st.session_state:
-                del st.session_state.match_data
-            st.session_state.last_match_fetch_time = 0
-        else:
-            try:
-                docs = db.collection(ARCHIVED_PIT_SCOUT_COLLECTION).get()
-                data = []
-                for doc in docs:
-                    doc_data = doc.to_dict()
-                    doc_data['doc_id'] = doc.id
-                    data.append(doc_data)
-                st.session_state.archived_pit_data = pd.DataFrame(data)
-            except Exception as e:
-                st.error(f"Error fetching fresh archived pit data: {e}")
-                st.session_state.archived_pit_data = pd.DataFrame()
-            if 'pit_data' in st.session_state:
-                del st.session_state.pit_data
-            st.session_state.last_pit_fetch_time = 0
-        st.rerun()
-    except Exception as e:
-        st.error(f"Error unarchiving {data_type} records: {e}")
+    move_records(archived_collection, collection, doc_ids, data_type, "unarchive")
 
 # Function to unarchive all records
 def unarchive_all_data(collection, archived_collection, data_type):
-    try:
-        docs = db.collection(archived_collection).get()
-        doc_ids = [doc.id for doc in docs]
-        if not doc_ids:
-            st.info(f"No archived {data_type} records to unarchive.")
-            return
-        for doc_id in doc_ids:
-            doc_ref = db.collection(archived_collection).document(doc_id)
-            doc = doc_ref.get()
-            if doc.exists:
-                doc_data = doc.to_dict()
-                db.collection(collection).document(doc_id).set(doc_data)
-                doc_ref.delete()
-        st.success(f"Successfully unarchived all {len(doc_ids)} {data_type} records. The table will update automatically.")
-        if f"doc_ids_for_edit_{collection}" in st.session_state:
-            del st.session_state[f"doc_ids_for_edit_{collection}"]
-        if collection == MATCH_SCOUT_COLLECTION:
-            try:
-                docs = db.collection(ARCHIVED_MATCH_SCOUT_COLLECTION).get()
-                data = []
-                for doc in docs:
-                    doc_data = doc.to_dict()
-                    doc_data['doc_id'] = doc.id
-                    data.append(doc_data)
-                st.session_state.archived_match_data = pd.DataFrame(data)
-            except Exception as e:
-                st.error(f"Error fetching fresh archived match data: {e}")
-                st.session_state.archived_match_data = pd.DataFrame()
-            if 'match_data' in st.session_state:
-                st.session_state.match_data = pd.DataFrame()
-            st.session_state.last_match_fetch_time = 0
-        else:
-            try:
-                docs = db.collection(ARCHIVED_PIT_SCOUT_COLLECTION).get()
-                data = []
-                for doc in docs:
-                    doc_data = doc.to_dict()
-                    doc_data['doc_id'] = doc.id
-                    data.append(doc_data)
-                st.session_state.archived_pit_data = pd.DataFrame(data)
-            except Exception as e:
-                st.error(f"Error fetching fresh archived pit data: {e}")
-                st.session_state.archived_pit_data = pd.DataFrame()
-            if 'pit_data' in st.session_state:
-                st.session_state.pit_data = pd.DataFrame()
-            st.session_state.last_pit_fetch_time = 0
-        st.rerun()
-    except Exception as e:
-        st.error(f"Error unarchiving all {data_type} records: {e}")
+    move_records(archived_collection, collection, None, data_type, "unarchive")
 
 # Function to upload a new robot photo to Firebase Storage
 def upload_robot_photo(file, team_number):
     try:
+        if bucket is None:
+            st.error("Robot photos need Firebase Storage and are not available with local storage.")
+            return None
         # Define the path in Firebase Storage
         blob_path = f"robot_photos/team_{team_number}.jpg"
         blob = bucket.blob(blob_path)
@@ -633,6 +567,9 @@ def upload_robot_photo(file, team_number):
 # Function to delete a robot photo from Firebase Storage
 def delete_robot_photo(team_number):
     try:
+        if bucket is None:
+            st.error("Robot photos need Firebase Storage and are not available with local storage.")
+            return False
         blob_path = f"robot_photos/team_{team_number}.jpg"
         blob = bucket.blob(blob_path)
         if blob.exists():
@@ -656,6 +593,7 @@ def update_robot_photo_url(collection, doc_id, photo_url):
         if 'pit_data' in st.session_state:
             del st.session_state.pit_data
         st.session_state.last_pit_fetch_time = 0
+        invalidate_collection_cache(collection)
         if f"doc_ids_for_edit_{collection}" in st.session_state:
             del st.session_state[f"doc_ids_for_edit_{collection}"]
         return True
@@ -663,17 +601,23 @@ def update_robot_photo_url(collection, doc_id, photo_url):
         st.error(f"Error updating robot photo URL for document {doc_id}: {e}")
         return False
 
-# Function to upload a new record to Firestore
-def upload_data(collection, new_data):
+# Rows of an uploaded CSV shown before importing it
+PREVIEW_ROWS = 100
+
+# Function to import an uploaded CSV with the streaming import pipeline
+def import_records(collection, uploaded_file, data_type, skip_invalid=False, event_key=None):
     try:
-        doc_id = new_data.get('doc_id', None)
-        # Remove robot_photo_url from new_data if present (it should be managed separately)
-        if 'robot_photo_url' in new_data:
-            del new_data['robot_photo_url']
-        if doc_id:
-            db.collection(collection).document(doc_id).set(new_data)
-        else:
-            db.collection(collection).add(new_data)
+        progress_bar = st.progress(0.0, text=f"Importing {data_type} records...")
+        # Only a rough row count (quoted text may span lines), for the progress bar
+        total = max(uploaded_file.getvalue().count(b"\n") - 1, 1)
+        result = import_csv(
+            db, collection, uploaded_file, data_type, skip_invalid=skip_invalid, event_key=event_key,
+            progress=lambda rows: progress_bar.progress(min(rows / total, 1.0), text=f"{rows} {data_type} rows read")
+        )
+        progress_bar.empty()
+        invalidate_collection_cache(collection)
+        if collection == MATCH_SCOUT_COLLECTION:
+            rebuild_team_summaries(db)
         if f"doc_ids_for_edit_{collection}" in st.session_state:
             del st.session_state[f"doc_ids_for_edit_{collection}"]
         if collection == MATCH_SCOUT_COLLECTION:
@@ -684,81 +628,23 @@ def upload_data(collection, new_data):
             if 'pit_data' in st.session_state:
                 del st.session_state.pit_data
             st.session_state.last_pit_fetch_time = 0
-        st.rerun()
+
+        resumed = f" ({result['resumed']} rows already imported by an earlier, interrupted upload)" if result['resumed'] else ""
+        summary = (f"Imported {result['written']} of {result['rows']} {data_type} rows in {result['batches']} batches "
+                   f"({result['seconds']:.1f}s){resumed}.")
+        if result['errors'].empty:
+            # Refresh the tables; the summary is shown after the rerun
+            notify_after_rerun(summary)
+            st.rerun()
+        # The error report stays on screen, so no rerun
+        st.success(summary)
+        if skip_invalid:
+            st.warning(f"{result['invalid']} rows with errors were left out:")
+        else:
+            st.warning(f"{result['invalid']} rows were imported with errors:")
+        st.dataframe(result['errors'], use_container_width=True)
     except Exception as e:
-        st.error(f"Error uploading data to {collection}: {e}")
-
-# Function to inspect errors in the data
-def inspect_errors(data, required_fields, numeric_fields, rating_fields, duplicate_fields):
-    if data.empty:
-        return pd.DataFrame(columns=['doc_id', 'Error Type', 'Field', 'Details'])
-
-    errors = []
-    
-    # Check for missing required fields
-    for field in required_fields:
-        if field in data.columns:
-            missing = data[field].isna() | (data[field] == "")
-            for idx, is_missing in missing.items():
-                if is_missing:
-                    errors.append({
-                        'doc_id': data.iloc[idx]['doc_id'],
-                        'Error Type': 'Missing Value',
-                        'Field': field,
-                        'Details': 'Field is empty or NaN'
-                    })
-
-    # Check numeric fields
-    for field in numeric_fields:
-        if field in data.columns:
-            non_numeric = pd.to_numeric(data[field], errors='coerce').isna() & data[field].notna()
-            for idx, is_invalid in non_numeric.items():
-                if is_invalid:
-                    errors.append({
-                        'doc_id': data.iloc[idx]['doc_id'],
-                        'Error Type': 'Invalid Data Type',
-                        'Field': field,
-                        'Details': f'Value "{data.iloc[idx][field]}" is not a number'
-                    })
-            data[field] = pd.to_numeric(data[field], errors='coerce')
-            negative = data[field] < 0
-            for idx, is_negative in negative.items():
-                if is_negative and pd.notna(data.iloc[idx][field]):
-                    errors.append({
-                        'doc_id': data.iloc[idx]['doc_id'],
-                        'Error Type': 'Out of Range',
-                        'Field': field,
-                        'Details': f'Value {data.iloc[idx][field]} is negative'
-                    })
-
-    # Check rating fields
-    for field in rating_fields:
-        if field in data.columns:
-            data[field] = pd.to_numeric(data[field], errors='coerce')
-            out_of_range = (data[field] < 1) | (data[field] > 5)
-            for idx, is_invalid in out_of_range.items():
-                if is_invalid and pd.notna(data.iloc[idx][field]):
-                    errors.append({
-                        'doc_id': data.iloc[idx]['doc_id'],
-                        'Error Type': 'Out of Range',
-                        'Field': field,
-                        'Details': f'Value {data.iloc[idx][field]} is not between 1 and 5'
-                    })
-
-    # Check for duplicates
-    if duplicate_fields and all(field in data.columns for field in duplicate_fields):
-        duplicates = data.duplicated(subset=duplicate_fields, keep=False)
-        for idx, is_duplicate in duplicates.items():
-            if is_duplicate:
-                details = f"Duplicate entry for {', '.join(f'{field}: {data.iloc[idx][field]}' for field in duplicate_fields)}"
-                errors.append({
-                    'doc_id': data.iloc[idx]['doc_id'],
-                    'Error Type': 'Duplicate Record',
-                    'Field': ', '.join(duplicate_fields),
-                    'Details': details
-                })
-
-    return pd.DataFrame(errors)
+        st.error(f"Error importing {data_type} CSV into {collection}: {e}. Upload the same file again to resume the import.")
 
 # User Management Functions
 def fetch_users():
@@ -838,42 +724,47 @@ with main_tabs[0]:
     # Tab 1: View Match Data
     with match_tabs[0]:
         st.subheader("View Match Data")
-        st.markdown("Data refreshes every 30 seconds to ensure all scouting data is displayed. Use the button below to refresh manually.")
+        st.markdown("Data updates automatically as soon as new scouting data arrives. Use the button below to refresh manually.")
 
         if st.button("Refresh Match Data Now", key="manual_refresh_match"):
-            fetch_match_data(force_refresh=True)
+            st.session_state.pop("view_match_query", None)  # Back to the first page
             st.rerun()
 
-        with st.spinner("Loading match data..."):
-            match_data = fetch_match_data()
+        # Team summaries are kept up to date on every write; rebuild them after writes made outside the app
+        if st.button("Rebuild Team Summaries", key="rebuild_team_summaries"):
+            try:
+                with st.spinner("Rebuilding team summaries..."):
+                    team_count = rebuild_team_summaries(db)
+                st.success(f"Rebuilt team summaries for {team_count} teams.")
+            except Exception as e:
+                st.error(f"Error rebuilding team summaries: {e}")
 
-        if not match_data.empty:
-            display_columns = [col for col in match_desired_columns if col in match_data.columns and col != 'doc_id']
-            st.dataframe(match_data[display_columns], use_container_width=True)
+        # Records saved before ids were derived from event, match, team and scouter
+        if st.button("Merge Duplicate Match Records", key="rekey_match_records",
+                     help="Moves every record to its event/match/team/scouter id and keeps only the newest of duplicates."):
+            try:
+                with st.spinner("Merging duplicate match records..."):
+                    load_collection(MATCH_SCOUT_COLLECTION, sync=True)
+                    result = rekey_match_documents(db, cached_documents(MATCH_SCOUT_COLLECTION))
+                    rebuild_team_summaries(db)
+                if f"doc_ids_for_edit_{MATCH_SCOUT_COLLECTION}" in st.session_state:
+                    del st.session_state[f"doc_ids_for_edit_{MATCH_SCOUT_COLLECTION}"]
+                if 'match_data' in st.session_state:
+                    del st.session_state.match_data
+                st.session_state.last_match_fetch_time = 0
+                st.success(f"Moved {result['moved']} match records to their new ids and removed {result['duplicates']} duplicates.")
+            except Exception as e:
+                st.error(f"Error merging duplicate match records: {e}")
 
-            csv = match_data[display_columns].to_csv(index=False)
-            st.download_button(
-                label="Download Match Data as CSV",
-                data=csv,
-                file_name="match_data.csv",
-                mime="text/csv",
-                key="download_match_csv"
-            )
-        else:
-            st.info(f"No match data available in the {MATCH_SCOUT_COLLECTION} collection.")
-        
-        if 'match_fetch_log' in st.session_state:
-            st.write(f"{st.session_state.match_fetch_log}")
+        show_data_page(MATCH_SCOUT_COLLECTION, "match", match_desired_columns)
 
-        if 'last_match_fetch_time' in st.session_state:
-            time_since_last_fetch = time.time() - st.session_state.last_match_fetch_time
-            time_until_next_fetch = max(0, 30 - time_since_last_fetch)
-            st.write(f"Next refresh in {int(time_until_next_fetch)} seconds")
+        load_summary = describe_collection_load(MATCH_SCOUT_COLLECTION)
+        if load_summary:
+            st.caption(load_summary)
 
+        # Re-run the page when match data changes
         if st.session_state.active_page == "Data Management":
-            time_since_last_fetch = time.time() - st.session_state.last_match_fetch_time
-            if time_since_last_fetch >= 30:
-                st.rerun()
+            rerun_on_collection_change([MATCH_SCOUT_COLLECTION], 'view_match_version')
 
     # Tab 2: Edit Match Data
     with match_tabs[1]:
@@ -1143,14 +1034,14 @@ with main_tabs[0]:
                         teleop_missed_algae_barge = st.number_input(
                             "Algae Missed on Barge",
                             min_value=0,
-                            value=int(selected_record.get('teleop_algae_barge', 0)),
+                            value=int(selected_record.get('teleop_missed_algae_barge', 0)),
                             step=1,
                             key=f"edit_match_teleop_missed_algae_barge_{selected_doc_id}"
                         )
                         teleop_missed_algae_processor = st.number_input(
                             "Algae Missed on Processor",
                             min_value=0,
-                            value=int(selected_record.get('teleop_algae_processor', 0)),
+                            value=int(selected_record.get('teleop_missed_algae_processor', 0)),
                             step=1,
                             key=f"edit_match_teleop_missed_algae_processor_{selected_doc_id}"
                         )
@@ -1300,7 +1191,7 @@ with main_tabs[0]:
     # Tab 3: Delete Match Data
     with match_tabs[2]:
         st.subheader("Delete Match Data")
-        match_data = fetch_match_data(for_selection=True)
+        match_data = fetch_record_options(MATCH_SCOUT_COLLECTION)
         if not match_data.empty:
             doc_ids = match_data['doc_id'].tolist()
             selected_doc_ids = st.multiselect("Select Match Records to Delete", options=doc_ids, key="delete_match_select")
@@ -1325,7 +1216,7 @@ with main_tabs[0]:
     # Tab 4: Archive Match Data
     with match_tabs[3]:
         st.subheader("Archive Match Data")
-        match_data = fetch_match_data(for_selection=True)
+        match_data = fetch_record_options(MATCH_SCOUT_COLLECTION)
         if not match_data.empty:
             doc_ids = match_data['doc_id'].tolist()
             selected_doc_ids = st.multiselect("Select Match Records to Archive", options=doc_ids, key="archive_match_select")
@@ -1354,39 +1245,31 @@ with main_tabs[0]:
         
         uploaded_file = st.file_uploader("Upload a CSV file for Match Data", type=["csv"], key="upload_match_csv")
         if uploaded_file is not None:
-            csv_data = pd.read_csv(uploaded_file)
-            st.write("Preview of uploaded match data:")
+            csv_data = pd.read_csv(uploaded_file, nrows=PREVIEW_ROWS)
+            uploaded_file.seek(0)
+            st.write(f"Preview of uploaded match data (first {PREVIEW_ROWS} rows):")
             display_columns = [col for col in match_desired_columns if col in csv_data.columns]
             st.dataframe(csv_data[display_columns], use_container_width=True)
+            skip_invalid = st.checkbox("Leave out rows with errors", value=False, key="skip_invalid_match_csv",
+                                       help="By default every row is imported and rows with errors are flagged for review.")
+            file_event = event_from_filename(uploaded_file.name)
+            event_key = st.text_input("Event key of rows without one", value=file_event, placeholder="e.g. 2025hiho",
+                                      key=f"event_match_csv_{uploaded_file.file_id}").strip()
+            if not event_key:
+                st.warning("No event key: rows without an event_key are kept as separate records of this file "
+                           "instead of replacing entries of the same match and team.")
 
             if st.button("Upload Match CSV to Firestore", key="upload_match_button"):
-                batch = db.batch()
-                for i, row in csv_data.iterrows():
-                    new_data = row.to_dict()
-                    for field in match_numeric_fields:
-                        if field in new_data and pd.notna(new_data[field]):
-                            new_data[field] = int(new_data[field])
-                    if 'auto_taxi_left' in new_data:
-                        new_data['auto_taxi_left'] = bool(new_data['auto_taxi_left'])
-                    doc_ref = db.collection(MATCH_SCOUT_COLLECTION).document()
-                    batch.set(doc_ref, new_data)
-                batch.commit()
-                if f"doc_ids_for_edit_{MATCH_SCOUT_COLLECTION}" in st.session_state:
-                    del st.session_state[f"doc_ids_for_edit_{MATCH_SCOUT_COLLECTION}"]
-                if 'match_data' in st.session_state:
-                    del st.session_state.match_data
-                st.session_state.last_match_fetch_time = 0
-                st.rerun()
+                import_records(MATCH_SCOUT_COLLECTION, uploaded_file, "match", skip_invalid, event_key)
 
     # Tab 6: Unarchive Match Data
     with match_tabs[5]:
         st.subheader("Unarchive Match Data")
-        archived_data = fetch_archived_match_data(for_selection=True)
+        archived_data = fetch_record_options(ARCHIVED_MATCH_SCOUT_COLLECTION)
         if not archived_data.empty:
             doc_ids = archived_data['doc_id'].tolist()
-            display_columns = [col for col in match_desired_columns if col in archived_data.columns and col != 'doc_id']
-            st.dataframe(archived_data[display_columns], use_container_width=True)
-            
+            show_data_page(ARCHIVED_MATCH_SCOUT_COLLECTION, "archived match", match_desired_columns, export=False)
+
             selected_doc_ids = st.multiselect("Select Match Records to Unarchive", options=doc_ids, key="unarchive_match_select")
             if st.button("Unarchive Selected Match Records", key="unarchive_match_button"):
                 if selected_doc_ids:
@@ -1410,15 +1293,9 @@ with main_tabs[0]:
     with match_tabs[6]:
         st.subheader("Inspect Errors in Match Data")
         st.markdown("This section identifies potential errors in the match scouting data, such as missing values, invalid data types, out-of-range values, and duplicates.")
-        match_data = fetch_match_data()
-        if not match_data.empty:
-            errors_df = inspect_errors(
-                match_data,
-                match_required_fields,
-                match_numeric_fields,
-                match_rating_fields,
-                duplicate_fields=['team_number', 'match_number']
-            )
+        if has_records(MATCH_SCOUT_COLLECTION):
+            # Only the records flagged when they were written are read (see utils.validation)
+            errors_df = flagged_errors(db, MATCH_SCOUT_COLLECTION, MATCH_RULES)
             if not errors_df.empty:
                 st.dataframe(errors_df, use_container_width=True)
                 csv = errors_df.to_csv(index=False)
@@ -1433,6 +1310,14 @@ with main_tabs[0]:
                 st.success("No errors found in the match data.")
         else:
             st.info("No match data available to inspect.")
+        if st.button("Re-check All Match Records", key="revalidate_match_records",
+                     help="Check every record again, e.g. records saved before errors were flagged on save."):
+            try:
+                flagged = revalidate_collection(db, MATCH_SCOUT_COLLECTION, MATCH_RULES)
+                st.success(f"Checked all match records: {flagged} with errors.")
+                st.rerun()
+            except Exception as e:
+                st.error(f"Error checking match records: {e}")
 
     # Tab 8: Match Edit History
     with match_tabs[7]:
@@ -1440,19 +1325,8 @@ with main_tabs[0]:
         st.markdown("View and manage the history of edits made to match scouting data records.")
         edit_history = fetch_edit_history(collection_type="match")
         if not edit_history.empty:
-            flattened_data = []
-            for _, row in edit_history.iterrows():
-                record = {
-                    'History ID': row['history_id'],
-                    'Original Document ID': row['original_doc_id'],
-                    'Edit Timestamp': row['edit_timestamp']
-                }
-                original_data = row['original_data']
-                for key, value in original_data.items():
-                    record[key] = value
-                flattened_data.append(record)
-            history_df = pd.DataFrame(flattened_data)
-            display_columns = ['History ID', 'Original Document ID', 'Edit Timestamp'] + [col for col in match_desired_columns if col in history_df.columns]
+            history_df = flatten_edit_history(edit_history)
+            display_columns = HISTORY_COLUMNS + [col for col in match_desired_columns if col in history_df.columns]
             st.dataframe(history_df[display_columns], use_container_width=True)
 
             csv = history_df[display_columns].to_csv(index=False)
@@ -1500,42 +1374,21 @@ with main_tabs[1]:
     # Tab 1: View Pit Data
     with pit_tabs[0]:
         st.subheader("View Pit Data")
-        st.markdown("Data refreshes every 30 seconds to ensure all pit scouting data is displayed. Use the button below to refresh manually.")
+        st.markdown("Data updates automatically as soon as new pit scouting data arrives. Use the button below to refresh manually.")
 
         if st.button("Refresh Pit Data Now", key="manual_refresh_pit"):
-            fetch_pit_data(force_refresh=True)
+            st.session_state.pop("view_pit_query", None)  # Back to the first page
             st.rerun()
 
-        with st.spinner("Loading pit data..."):
-            pit_data = fetch_pit_data()
-
-        if not pit_data.empty:
-            display_columns = [col for col in pit_desired_columns if col in pit_data.columns and col != 'doc_id']
-            st.dataframe(pit_data[display_columns], use_container_width=True)
+        show_data_page(PIT_SCOUT_COLLECTION, "pit", pit_desired_columns)
 
-            csv = pit_data[display_columns].to_csv(index=False)
-            st.download_button(
-                label="Download Pit Data as CSV",
-                data=csv,
-                file_name="pit_data.csv",
-                mime="text/csv",
-                key="download_pit_csv"
-            )
-        else:
-            st.info(f"No pit data available in the {PIT_SCOUT_COLLECTION} collection.")
-        
-        if 'pit_fetch_log' in st.session_state:
-            st.write(f"{st.session_state.pit_fetch_log}")
-
-        if 'last_pit_fetch_time' in st.session_state:
-            time_since_last_fetch = time.time() - st.session_state.last_pit_fetch_time
-            time_until_next_fetch = max(0, 30 - time_since_last_fetch)
-            st.write(f"Next refresh in {int(time_until_next_fetch)} seconds")
+        load_summary = describe_collection_load(PIT_SCOUT_COLLECTION)
+        if load_summary:
+            st.caption(load_summary)
 
+        # Re-run the page when pit data changes
         if st.session_state.active_page == "Data Management":
-            time_since_last_fetch = time.time() - st.session_state.last_pit_fetch_time
-            if time_since_last_fetch >= 30:
-                st.rerun()
+            rerun_on_collection_change([PIT_SCOUT_COLLECTION], 'view_pit_version')
 
     # Tab 2: Edit Pit Data
     with pit_tabs[1]:
@@ -1791,7 +1644,8 @@ with main_tabs[1]:
         # Tab 3: Delete Pit Data
         with pit_tabs[2]:
             st.subheader("Delete Pit Data")
-            pit_data = fetch_pit_data(for_selection=True)
+            # Team numbers and photo URLs are needed to delete the robot photos with the records
+            pit_data = fetch_record_options(PIT_SCOUT_COLLECTION, ['team_number', 'robot_photo_url'])
             if not pit_data.empty:
                 doc_ids = pit_data['doc_id'].tolist()
                 selected_doc_ids = st.multiselect("Select Pit Records to Delete", options=doc_ids, key="delete_pit_select")
@@ -1856,7 +1710,7 @@ with main_tabs[1]:
         # Tab 4: Archive Pit Data
         with pit_tabs[3]:
             st.subheader("Archive Pit Data")
-            pit_data = fetch_pit_data(for_selection=True)
+            pit_data = fetch_record_options(PIT_SCOUT_COLLECTION)
             if not pit_data.empty:
                 doc_ids = pit_data['doc_id'].tolist()
                 selected_doc_ids = st.multiselect("Select Pit Records to Archive", options=doc_ids, key="archive_pit_select")
@@ -1885,41 +1739,31 @@ with main_tabs[1]:
             
             uploaded_file = st.file_uploader("Upload a CSV file for Pit Data", type=["csv"], key="upload_pit_csv")
             if uploaded_file is not None:
-                csv_data = pd.read_csv(uploaded_file)
-                st.write("Preview of uploaded pit data:")
+                csv_data = pd.read_csv(uploaded_file, nrows=PREVIEW_ROWS)
+                uploaded_file.seek(0)
+                st.write(f"Preview of uploaded pit data (first {PREVIEW_ROWS} rows):")
                 display_columns = [col for col in pit_desired_columns if col in csv_data.columns]
                 st.dataframe(csv_data[display_columns], use_container_width=True)
+                skip_invalid = st.checkbox("Leave out rows with errors", value=False, key="skip_invalid_pit_csv",
+                                       help="By default every row is imported and rows with errors are flagged for review.")
+                file_event = event_from_filename(uploaded_file.name)
+                event_key = st.text_input("Event key of rows without one", value=file_event, placeholder="e.g. 2025hiho",
+                                          key=f"event_pit_csv_{uploaded_file.file_id}").strip()
+                if not event_key:
+                    st.warning("No event key: rows without an event_key are kept as separate records of this file "
+                               "instead of replacing entries of the same match and team.")
 
                 if st.button("Upload Pit CSV to Firestore", key="upload_pit_button"):
-                    batch = db.batch()
-                    for i, row in csv_data.iterrows():
-                        new_data = row.to_dict()
-                        for field in pit_numeric_fields:
-                            if field in new_data and pd.notna(new_data[field]):
-                                new_data[field] = int(new_data[field])
-                        for field in ['can_score_coral_l1', 'can_score_coral_l2', 'can_score_coral_l3', 'can_score_coral_l4',
-                                    'can_score_algae_barge', 'can_score_algae_processor', 'can_remove_algae_l1', 'can_remove_algae_l2']:
-                            if field in new_data:
-                                new_data[field] = bool(new_data[field])
-                        doc_ref = db.collection(PIT_SCOUT_COLLECTION).document()
-                        batch.set(doc_ref, new_data)
-                    batch.commit()
-                    if f"doc_ids_for_edit_{PIT_SCOUT_COLLECTION}" in st.session_state:
-                        del st.session_state[f"doc_ids_for_edit_{PIT_SCOUT_COLLECTION}"]
-                    if 'pit_data' in st.session_state:
-                        del st.session_state.pit_data
-                    st.session_state.last_pit_fetch_time = 0
-                    st.rerun()
+                    import_records(PIT_SCOUT_COLLECTION, uploaded_file, "pit", skip_invalid, event_key)
 
         # Tab 6: Unarchive Pit Data
         with pit_tabs[5]:
             st.subheader("Unarchive Pit Data")
-            archived_data = fetch_archived_pit_data(for_selection=True)
+            archived_data = fetch_record_options(ARCHIVED_PIT_SCOUT_COLLECTION)
             if not archived_data.empty:
                 doc_ids = archived_data['doc_id'].tolist()
-                display_columns = [col for col in pit_desired_columns if col in archived_data.columns and col != 'doc_id']
-                st.dataframe(archived_data[display_columns], use_container_width=True)
-                
+                show_data_page(ARCHIVED_PIT_SCOUT_COLLECTION, "archived pit", pit_desired_columns, export=False)
+
                 selected_doc_ids = st.multiselect("Select Pit Records to Unarchive", options=doc_ids, key="unarchive_pit_select")
                 if st.button("Unarchive Selected Pit Records", key="unarchive_pit_button"):
                     if selected_doc_ids:
@@ -1943,15 +1787,9 @@ with main_tabs[1]:
         with pit_tabs[6]:
             st.subheader("Inspect Errors in Pit Data")
             st.markdown("This section identifies potential errors in the pit scouting data, such as missing values, invalid data types, out-of-range values, and duplicates.")
-            pit_data = fetch_pit_data()
-            if not pit_data.empty:
-                errors_df = inspect_errors(
-                    pit_data,
-                    pit_required_fields,
-                    pit_numeric_fields,
-                    pit_rating_fields,
-                    duplicate_fields=['team_number']
-                )
+            if has_records(PIT_SCOUT_COLLECTION):
+                # Only the records flagged when they were written are read (see utils.validation)
+                errors_df = flagged_errors(db, PIT_SCOUT_COLLECTION, PIT_RULES)
                 if not errors_df.empty:
                     st.dataframe(errors_df, use_container_width=True)
                     csv = errors_df.to_csv(index=False)
@@ -1966,6 +1804,14 @@ with main_tabs[1]:
                     st.success("No errors found in the pit data.")
             else:
                 st.info("No pit data available to inspect.")
+            if st.button("Re-check All Pit Records", key="revalidate_pit_records",
+                         help="Check every record again, e.g. records saved before errors were flagged on save."):
+                try:
+                    flagged = revalidate_collection(db, PIT_SCOUT_COLLECTION, PIT_RULES)
+                    st.success(f"Checked all pit records: {flagged} with errors.")
+                    st.rerun()
+                except Exception as e:
+                    st.error(f"Error checking pit records: {e}")
 
         # Tab 8: Pit Edit History
         with pit_tabs[7]:
@@ -1973,19 +1819,8 @@ with main_tabs[1]:
             st.markdown("View and manage the history of edits made to pit scouting data records.")
             edit_history = fetch_edit_history(collection_type="pit")
             if not edit_history.empty:
-                flattened_data = []
-                for _, row in edit_history.iterrows():
-                    record = {
-                        'History ID': row['history_id'],
-                        'Original Document ID': row['original_doc_id'],
-                        'Edit Timestamp': row['edit_timestamp']
-                    }
-                    original_data = row['original_data']
-                    for key, value in original_data.items():
-                        record[key] = value
-                    flattened_data.append(record)
-                history_df = pd.DataFrame(flattened_data)
-                display_columns = ['History ID', 'Original Document ID', 'Edit Timestamp'] + [col for col in pit_desired_columns if col in history_df.columns]
+                history_df = flatten_edit_history(edit_history)
+                display_columns = HISTORY_COLUMNS + [col for col in pit_desired_columns if col in history_df.columns]
                 st.dataframe(history_df[display_columns], use_container_width=True)
 
                 csv = history_df[display_columns].to_csv(index=False)
@@ -2026,8 +1861,8 @@ with pit_tabs[8]:
     st.subheader("Manage Robot Photos")
     st.markdown("View, update, or delete robot photos for each team. Photos are stored in Firebase Storage, and their URLs are linked in the pit scouting data.")
 
-    # Fetch pit data to get team numbers and photo URLs
-    pit_data = fetch_pit_data(force_refresh=True)  # Force refresh to ensure latest data
+    # Fetch team numbers and photo URLs only, brought up to date from the shared cache
+    pit_data = fetch_record_options(PIT_SCOUT_COLLECTION, ['team_number', 'robot_photo_url'])
     if not pit_data.empty:
         # Check which required columns are available
         available_columns = [col for col in ['team_number', 'doc_id', 'robot_photo_url'] if col in pit_data.columns]
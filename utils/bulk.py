@@ -0,0 +1,231 @@
+"""Batched bulk moves between collections (archive and unarchive) and bulk deletes.
+
+A move of n documents costs ceil(n / MOVE_CHUNK_SIZE) batch commits instead of a
+get, set and delete round trip per document. The documents come from the caller,
+who already has them (the shared cache, or the archive table on screen), and both
+collections' caches are patched afterwards instead of being read again.
+
+A bulk delete lists document references only (no document data) and commits
+batches of up to 500 deletes from several threads, retrying batches that fail.
+rekey_match_documents moves match documents saved under the old timestamped ids
+to the deterministic ids, dropping duplicates.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from utils.utils import (
+    MATCH_SCOUT_COLLECTION, load_collection, cached_documents, patch_collection_cache, invalidate_collection_cache,
+    current_event_key, assign_match_doc_ids, deletion_marker
+)
+from utils.summaries import TEAM_SUMMARY_COLLECTION, alliance_index, summary_changes, summary_increments, summaries_outdated
+from utils.validation import error_flag_writes
+
+# Firestore allows 500 writes per batch. A moved or deleted document also takes the
+# delete of its validation_errors entry, so a move takes three writes (set + delete + entry);
+# match documents can add up to one team_summaries increment per team of their alliance.
+# A batch that deletes also rewrites the source's deletion marker (utils.utils.deletion_marker).
+MAX_BATCH_WRITES = 500
+MOVE_CHUNK_SIZE = 100
+
+# Parallel bulk writes: batches committed at the same time, and attempts per batch
+WRITE_WORKERS = 8
+WRITE_ATTEMPTS = 4
+RETRY_DELAY = 0.5
+
+def move_documents(db, source, target, documents, progress=None, chunk_size=MOVE_CHUNK_SIZE, alliances=None):
+    """Move documents ({doc_id: data}) from the source to the target collection.
+
+    Each batch moves about chunk_size documents, whole alliances at a time, together
+    with the team_summaries increments they cause, so a failed batch leaves the data
+    and the summaries consistent. progress(done, total), if given, is called after every batch.
+    alliances is the alliance_index() of the match collection when match data
+    moves; it is built from the shared cache if not given, and updated in place.
+    Returns a dict with the moved doc ids, the number of batches and the seconds taken.
+    """
+    start = time.perf_counter()
+    source_ref, target_ref = db.collection(source), db.collection(target)
+    summaries = db.collection(TEAM_SUMMARY_COLLECTION)
+
+    # Group the documents by alliance so that no alliance is split across batches,
+    # then work out the summary changes of all alliances in one pass
+    by_alliance = alliance_index(documents)
+    deltas = {}
+    if MATCH_SCOUT_COLLECTION in (source, target):
+        index = alliances
+        if index is None:
+            load_collection(MATCH_SCOUT_COLLECTION, sync=True)  # Cached already in Data Management
+            index = alliance_index(cached_documents(MATCH_SCOUT_COLLECTION))
+        deltas = (summary_changes(index, removed=documents) if source == MATCH_SCOUT_COLLECTION
+                  else summary_changes(index, added=documents))
+    chunks, chunk, size = [], [], 0
+    for key, group in by_alliance.items():
+        chunk.append((key, group))
+        size += len(group)
+        if size >= chunk_size:
+            chunks.append(chunk)
+            chunk, size = [], 0
+    if chunk:
+        chunks.append(chunk)
+
+    moved, batches = [], 0
+    try:
+        for chunk in chunks:
+            writes = []
+            for _, group in chunk:
+                for doc_id, data in group.items():
+                    writes.append(('set', target_ref.document(doc_id), data))
+                    writes.append(('delete', source_ref.document(doc_id), None))
+                    writes += error_flag_writes(db, source, [doc_id], {})
+            increments = summary_increments([deltas[key] for key, _ in chunk if key in deltas])
+            writes += [('merge', summaries.document(team), data) for team, data in increments.items()]
+
+            # Normally one commit per chunk; split only if an alliance-heavy chunk overflows
+            for batch_start in range(0, len(writes), MAX_BATCH_WRITES - 1):
+                batch = db.batch()
+                batch_writes = writes[batch_start:batch_start + MAX_BATCH_WRITES - 1]
+                if any(kind == 'delete' for kind, _, _ in batch_writes):
+                    batch_writes.append(deletion_marker(db, source))
+                for kind, reference, data in batch_writes:
+                    if kind == 'delete':
+                        batch.delete(reference)
+                    else:
+                        batch.set(reference, data, merge=kind == 'merge')
+                batch.commit()
+                batches += 1
+            moved += [doc_id for _, group in chunk for doc_id in group]
+            if progress is not None:
+                progress(len(moved), len(documents))
+    finally:
+        # Whatever was committed is reflected in the caches, also when a batch fails
+        moved_docs = {doc_id: documents[doc_id] for doc_id in moved}
+        patch_collection_cache(source, deleted_ids=moved)
+        patch_collection_cache(target, upserts=moved_docs)
+        if deltas and moved:
+            # Summaries were written as increments; their cached copy is re-read on next use
+            invalidate_collection_cache(TEAM_SUMMARY_COLLECTION)
+    return {'moved': moved, 'batches': batches, 'seconds': time.perf_counter() - start}
+
+def commit_with_retries(db, writes, attempts=WRITE_ATTEMPTS, delay=RETRY_DELAY):
+    """Commit writes ((kind, reference, data), kind 'set' or 'delete') as one batch.
+
+    Sets of full documents and deletes are idempotent, so a failed batch is simply
+    committed again, up to attempts times with a growing delay. Returns the number
+    of retries; the last error is raised.
+    """
+    for attempt in range(attempts):
+        try:
+            batch = db.batch()
+            for kind, reference, data in writes:
+                if kind == 'delete':
+                    batch.delete(reference)
+                else:
+                    batch.set(reference, data)
+            batch.commit()
+            return attempt
+        except Exception as e:
+            if attempt == attempts - 1:
+                raise
+            print(f"Batch of {len(writes)} writes failed ({e}), retrying")
+            time.sleep(delay * 2 ** attempt)
+
+def delete_documents(db, collection, query=None, progress=None, batch_size=(MAX_BATCH_WRITES - 1) // 2,
+                     workers=WRITE_WORKERS, attempts=WRITE_ATTEMPTS, unflag=True):
+    """Delete every document of a collection, or those matching query, with parallel batches.
+
+    Only references are listed (select([])), and batches of batch_size documents are
+    committed while the listing continues. With unflag, each batch also removes its
+    documents' validation_errors entries. A batch is retried up to attempts times with a growing delay;
+    batches that still fail are reported, not raised, so the rest is deleted.
+    progress(done, listed), if given, is called after every committed batch.
+    Returns a dict with the deleted and failed doc ids, batches, retries, seconds
+    and documents per second.
+    """
+    start = time.perf_counter()
+    query = query if query is not None else db.collection(collection)
+    deleted, failed, batches, retries = [], [], 0, 0
+    listed = 0
+
+    def collect(future):
+        nonlocal batches, retries
+        doc_ids = pending.pop(future)
+        try:
+            retries += future.result()
+            batches += 1
+            deleted.extend(doc_ids)
+        except Exception as e:
+            print(f"Bulk delete: giving up on {len(doc_ids)} documents of {collection}: {e}")
+            failed.extend(doc_ids)
+        if progress is not None:
+            progress(len(deleted) + len(failed), listed)
+
+    def submit(executor, doc_ids):
+        writes = [('delete', db.collection(collection).document(doc_id), None) for doc_id in doc_ids]
+        if unflag:
+            writes += error_flag_writes(db, collection, doc_ids, {})
+        writes.append(deletion_marker(db, collection))
+        if collection == MATCH_SCOUT_COLLECTION:
+            # Deleted rows leave the summaries behind until they are rebuilt
+            writes.append(summaries_outdated(db))
+        pending[executor.submit(commit_with_retries, db, writes, attempts)] = doc_ids
+
+    pending = {}
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            try:
+                chunk = []
+                for snapshot in query.select([]).stream():
+                    chunk.append(snapshot.id)
+                    listed += 1
+                    if len(chunk) == batch_size:
+                        submit(executor, chunk)
+                        chunk = []
+                    # Keep at most a few batches in flight while the listing continues
+                    while len(pending) >= 2 * workers:
+                        collect(next(as_completed(list(pending))))
+                if chunk:
+                    submit(executor, chunk)
+            finally:
+                # Also when the listing fails: account for the batches already submitted
+                for future in as_completed(list(pending)):
+                    collect(future)
+    finally:
+        patch_collection_cache(collection, deleted_ids=deleted)
+    seconds = time.perf_counter() - start
+    return {'deleted': deleted, 'failed': failed, 'batches': batches, 'retries': retries,
+            'seconds': seconds, 'per_second': len(deleted) / seconds if seconds else 0.0}
+
+def rekey_match_documents(db, documents):
+    """Move match documents ({doc_id: data}) to their deterministic ids (utils.utils.match_doc_id).
+
+    Older ids carried the submission time, so resubmissions piled up as
+    duplicates; entries that map to the same id keep only the newest one.
+    Documents without an event_key are tagged with the current event. Team
+    summaries are not updated here but marked out of date; rebuild them afterwards.
+    Returns a dict with the number of documents moved and duplicates removed.
+    """
+    event_key = current_event_key()
+    rows = []
+    for doc_id, data in documents.items():
+        if data.get('team_number') is None or data.get('match_number') is None:
+            continue
+        data = dict(data)
+        if not data.get('event_key') and event_key:
+            data['event_key'] = event_key
+        rows.append((str(data.get('timestamp') or ''), doc_id, data))
+    # Oldest first, so the newest entry of a robot and match is the one that stays
+    rows.sort(key=lambda row: row[:2])
+    new_ids = assign_match_doc_ids(db, [data for _, _, data in rows], replacing=[doc_id for _, doc_id, _ in rows])
+    latest = {}
+    for new_id, (_, doc_id, data) in zip(new_ids, rows):
+        latest[new_id] = (doc_id, data)
+
+    writes = [('set', db.collection(MATCH_SCOUT_COLLECTION).document(new_id), data)
+              for new_id, (doc_id, data) in latest.items() if doc_id != new_id]
+    removed = [doc_id for _, doc_id, _ in rows if doc_id not in latest]
+    writes += [('delete', db.collection(MATCH_SCOUT_COLLECTION).document(doc_id), None) for doc_id in removed]
+    writes += error_flag_writes(db, MATCH_SCOUT_COLLECTION, removed, {})
+    for start in range(0, len(writes), MAX_BATCH_WRITES - 2):
+        commit_with_retries(db, writes[start:start + MAX_BATCH_WRITES - 2] +
+                            [deletion_marker(db, MATCH_SCOUT_COLLECTION), summaries_outdated(db)])
+    invalidate_collection_cache(MATCH_SCOUT_COLLECTION)
+    moved = sum(1 for new_id, (doc_id, _) in latest.items() if doc_id != new_id)
+    return {'moved': moved, 'duplicates': len(rows) - len(latest)}
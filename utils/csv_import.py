@@ -0,0 +1,288 @@
+"""Streaming CSV import for match and pit data (Data Management uploads, migrate_to_firestore.py).
+
+The file is read CHUNK_ROWS rows at a time. Each chunk is converted with column
+operations using the form_config schema, checked with validation.row_errors (rows
+with errors are reported and written, listed in the validation_errors index, or left
+out with skip_invalid) and written in batches of up to 500 sets,
+committed from several threads while the next chunk is parsed.
+
+Rows get the same deterministic ids as form submissions (event, match, team and
+scouter), so importing a row twice, or a row already entered through the form,
+replaces the entry instead of duplicating it. The event of a row is its event_key
+column, else the event of the file (given, or read from a name like
+MatchScout2025HIHO.csv); rows with no event keep ids scoped to the file, so files
+of different events never overwrite each other. A row whose id holds a document of
+another event is reported as an 'Event Conflict' error instead of overwriting it.
+A second scouter's entry for the same robot is flagged as a duplicate, with the entry
+it duplicates, in the validation_errors index.
+
+Imports are resumable: writing a row again only overwrites it, and an import_jobs document
+records how many rows are safely written. Importing the same file again after
+a failed or interrupted import skips those rows and continues where it stopped.
+"""
+import hashlib
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from utils.schema import MATCH_SCHEMA, PIT_SCHEMA, to_bool
+from utils.validation import row_errors, group_errors, error_flag_writes, check_records, MATCH_RULES, PIT_RULES
+from utils.bulk import commit_with_retries, MAX_BATCH_WRITES, WRITE_WORKERS
+from utils.summaries import summaries_outdated
+from utils.utils import assign_match_doc_ids, match_doc_id, pit_doc_id
+
+IMPORT_JOBS_COLLECTION = "import_jobs"
+CHUNK_ROWS = 5000
+
+# Text read as missing. 'None' is a real climb_status, so pandas' default list is not used
+NA_VALUES = ['', 'nan', 'NaN', 'NA', 'N/A', 'null', 'NULL']
+
+# Schema and checks per kind of data
+IMPORT_KINDS = {
+    'match': {'schema': MATCH_SCHEMA, 'rules': MATCH_RULES},
+    'pit': {'schema': PIT_SCHEMA, 'rules': PIT_RULES}
+}
+
+def file_hash(source):
+    """sha1 of a CSV path or file-like object (read in blocks; file objects are rewound)."""
+    digest = hashlib.sha1()
+    handle = open(source, 'rb') if isinstance(source, str) else source
+    try:
+        handle.seek(0)
+        for block in iter(lambda: handle.read(1 << 20), b''):
+            digest.update(block if isinstance(block, bytes) else block.encode())
+        handle.seek(0)
+    finally:
+        if isinstance(source, str):
+            handle.close()
+    return digest.hexdigest()
+
+def _numeric_fields(kind):
+    checks = IMPORT_KINDS[kind]
+    numeric = set(checks['rules']['numeric'])
+    return numeric | {name for name, (column_kind, _) in checks['schema'].items() if column_kind == 'int'}
+
+def read_chunks(source, kind, chunk_rows=CHUNK_ROWS):
+    """CSV rows, chunk_rows at a time; the index is the 0-based data row number.
+
+    Number fields are parsed by the CSV reader (text if a value is not a number),
+    everything else is read as text.
+    """
+    numeric = _numeric_fields(kind)
+    header = pd.read_csv(source, nrows=0).columns
+    if not isinstance(source, str):
+        source.seek(0)
+    return pd.read_csv(source, dtype={col: str for col in header if col not in numeric}, keep_default_na=False,
+                       na_values=NA_VALUES, chunksize=chunk_rows)
+
+def convert_chunk(df, kind):
+    """Turn a chunk of CSV values into storage types: ints for number fields, bools for checkboxes.
+
+    Other fields stay text. Number fields that are not numbers become missing
+    (row_errors reports them); decimals are truncated like the form does.
+    """
+    schema = IMPORT_KINDS[kind]['schema']
+    numeric = _numeric_fields(kind)
+    df = df.copy()
+    for col in df.columns:
+        if col in numeric:
+            df[col] = np.trunc(pd.to_numeric(df[col], errors='coerce')).astype('Int64')
+        elif schema.get(col, (None,))[0] == 'bool':
+            df[col] = to_bool(df[col])
+        else:
+            df[col] = df[col].str.strip()
+    return df
+
+def chunk_documents(df):
+    """{row: data} for a converted chunk; missing fields are left out."""
+    # Column by column: tolist() yields Python values, so rows need no per-value conversion
+    columns = [(col, df[col].tolist(), df[col].notna().to_numpy()) for col in df.columns]
+    return {row: {col: values[i] for col, values, present in columns if present[i]}
+            for i, row in enumerate(df.index)}
+
+def event_from_filename(name):
+    """TBA event key in a CSV file name ('MatchScout2025HIHO.csv' -> '2025hiho'), or ''."""
+    stem = os.path.splitext(os.path.basename(name or ''))[0].lower()
+    found = re.search(r'(?<!\d)(\d{4}[a-z][a-z0-9]*)', stem)
+    return found.group(1) if found else ''
+
+def _event(value):
+    return str(value or '').strip().lower()
+
+def document_ids(db, collection, kind, documents, job_id, event_key=''):
+    """({row: doc id}, {row: (doc id, stored event)}) for a chunk's documents.
+
+    Rows with an event (their own event_key, else event_key, which is written into
+    them) and a team and match number get the usual match or pit ids (see
+    utils.utils); the others keep an id made from the file and row. The second dict
+    lists the rows whose id already holds a document of another event.
+    """
+    keyed = {}
+    for row, data in documents.items():
+        if not data.get('event_key') and event_key:
+            data['event_key'] = event_key
+        if (data.get('event_key') and data.get('team_number') is not None
+                and (kind == 'pit' or data.get('match_number') is not None)):
+            keyed[row] = data
+    doc_ids = {row: f"csv_{job_id[:12]}_row{row + 1}" for row in documents}
+    if kind == 'match':
+        doc_ids.update(zip(keyed, assign_match_doc_ids(db, list(keyed.values()))))
+    else:
+        doc_ids.update({row: pit_doc_id(data.get('event_key'), data['team_number']) for row, data in keyed.items()})
+
+    target = db.collection(collection)
+    references = [target.document(doc_id) for doc_id in {doc_ids[row] for row in keyed}]
+    stored = {snapshot.id: snapshot.to_dict().get('event_key') for snapshot in db.get_all(references) if snapshot.exists}
+    conflicts = {row: (doc_ids[row], stored[doc_ids[row]]) for row, data in keyed.items()
+                 if doc_ids[row] in stored and _event(stored[doc_ids[row]]) != _event(data['event_key'])}
+    return doc_ids, conflicts
+
+def import_csv(db, collection, source, kind, progress=None, skip_invalid=False, chunk_rows=CHUNK_ROWS,
+               workers=WRITE_WORKERS, event_key=None):
+    """Import a CSV (path or file-like) of kind 'match' or 'pit' into collection.
+
+    Rows without an event_key get event_key; if it is None, the event in the file
+    name (see event_from_filename). Rows with errors are written and listed in the
+    validation_errors index; with skip_invalid they, event conflicts included, are
+    left out instead. They are reported either way.
+    progress(rows_read), if given, is called after every chunk is handed to the writers.
+    Returns a dict with the event, rows read, written, resumed (skipped as already
+    written) and invalid, the errors DataFrame (with the 1-based CSV row), batches,
+    retries, seconds and the job id. A batch that keeps failing is raised after
+    the import_jobs checkpoint is saved, so the same file can be imported again.
+    """
+    start = time.perf_counter()
+    checks = IMPORT_KINDS[kind]
+    if event_key is None:
+        event_key = event_from_filename(source if isinstance(source, str) else getattr(source, 'name', ''))
+    event_key = _event(event_key)
+    job_id = file_hash(source)
+    job_ref = db.collection(IMPORT_JOBS_COLLECTION).document(job_id)
+    job = job_ref.get()
+    job = job.to_dict() if job.exists else {}
+    # A finished import of the same file is written again (same ids, so no duplicates)
+    resume = (job.get('collection') == collection and job.get('event_key', '') == event_key
+              and job.get('status') != 'done')
+    resume_from = job.get('committed_rows', 0) if resume else 0
+    result = {'job_id': job_id, 'event_key': event_key, 'rows': 0, 'written': 0, 'resumed': 0, 'invalid': 0,
+              'batches': 0, 'retries': 0, 'errors': []}
+
+    # Chunks in flight: chunk end row -> number of its batches still uncommitted
+    remaining, finished, pending = {}, set(), {}
+    second_entries = {}
+    committed = saved = resume_from
+
+    def save_job(status):
+        job_ref.set({'collection': collection, 'kind': kind, 'event_key': event_key, 'status': status,
+                     'committed_rows': committed, 'rows': result['rows'], 'written': result['written'], 'invalid': result['invalid'],
+                     'updated_at': datetime.now().isoformat()})
+
+    def chunk_done(end):
+        # The checkpoint only moves past chunks whose batches, and all earlier ones, are committed
+        nonlocal committed
+        finished.add(end)
+        for chunk_end in sorted(remaining):
+            if chunk_end not in finished:
+                break
+            committed = chunk_end
+            del remaining[chunk_end]
+            finished.discard(chunk_end)
+
+    def collect(future):
+        end, size = pending.pop(future)
+        result['retries'] += future.result()
+        result['batches'] += 1
+        result['written'] += size
+        remaining[end] -= 1
+        if remaining[end] == 0:
+            chunk_done(end)
+
+    target = db.collection(collection)
+    # Imported match rows bypass the team summaries; each batch marks them out of date
+    marks = [summaries_outdated(db)] if kind == 'match' else []
+    per_batch = MAX_BATCH_WRITES - len(marks)
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            try:
+                for chunk in read_chunks(source, kind, chunk_rows):
+                    end = int(chunk.index[-1]) + 1
+                    result['rows'] = end
+                    if end <= resume_from:
+                        result['resumed'] += len(chunk)
+                        continue
+                    result['resumed'] += int((chunk.index < resume_from).sum())
+                    chunk = chunk[chunk.index >= resume_from]
+
+                    errors = row_errors(chunk, checks['rules'])
+                    if not errors.empty:
+                        errors['CSV Row'] = errors['row'] + 1
+                        result['errors'].append(errors.drop(columns=['row']))
+                        result['invalid'] += errors['row'].nunique()
+                        if skip_invalid:
+                            chunk = chunk.drop(index=errors['row'].unique())
+
+                    documents = chunk_documents(convert_chunk(chunk, kind))
+                    doc_ids, conflicts = document_ids(db, collection, kind, documents, job_id, event_key)
+                    if conflicts:
+                        conflict_errors = pd.DataFrame(
+                            [{'CSV Row': row + 1, 'Error Type': 'Event Conflict', 'Field': 'event_key',
+                              'Details': f"{doc_id} holds a record of event '{stored or 'none'}', not "
+                                         f"'{documents[row]['event_key']}'" + (" (overwritten)" if not skip_invalid else "")}
+                             for row, (doc_id, stored) in conflicts.items()])
+                        result['errors'].append(conflict_errors)
+                        result['invalid'] += len(set(conflicts) - set(errors['row']))
+                        if skip_invalid:
+                            documents = {row: data for row, data in documents.items() if row not in conflicts}
+                    # A row repeated in the chunk is written once (the last one wins)
+                    latest = {doc_ids[row]: row for row in documents}
+                    if kind == 'match':
+                        # A second scouter's entry for a robot duplicates the first one; checked once written
+                        second_entries.update({doc_id: documents[row] for doc_id, row in latest.items()
+                                               if not doc_id.startswith('csv_')
+                                               and doc_id != match_doc_id(documents[row]['event_key'],
+                                                                          documents[row]['match_number'],
+                                                                          documents[row]['team_number'])})
+                    writes = [('set', target.document(doc_id), documents[row]) for doc_id, row in latest.items()]
+                    if not errors.empty and not skip_invalid:
+                        # Rows kept with errors are listed in the validation_errors index
+                        kept = errors[errors['row'].isin(list(latest.values()))]
+                        flagged = group_errors(kept.assign(doc_id=kept['row'].map(doc_ids)))
+                        writes += error_flag_writes(db, collection, flagged, flagged)
+                    remaining[end] = -(-len(writes) // per_batch)
+                    for batch_start in range(0, len(writes), per_batch):
+                        batch = writes[batch_start:batch_start + per_batch] + marks
+                        records = max(0, min(batch_start + per_batch, len(latest)) - batch_start)
+                        pending[executor.submit(commit_with_retries, db, batch)] = (end, records)
+                    if not writes:
+                        chunk_done(end)
+                    # Parse ahead while batches commit, but not without bound
+                    while len(pending) >= 2 * workers:
+                        collect(next(as_completed(list(pending))))
+                    # Checkpoint as chunks complete, so an interrupted run can be resumed too
+                    if committed > saved:
+                        save_job('running')
+                        saved = committed
+                    if progress is not None:
+                        progress(result['rows'])
+            finally:
+                for future in as_completed(list(pending)):
+                    collect(future)
+        if second_entries:
+            # Duplicates are flagged with the entries they duplicate (see validation.check_records)
+            flagged, checked = check_records(db, collection, second_entries, checks['rules'])
+            flag_writes = error_flag_writes(db, collection, checked, flagged)
+            for batch_start in range(0, len(flag_writes), MAX_BATCH_WRITES):
+                result['retries'] += commit_with_retries(db, flag_writes[batch_start:batch_start + MAX_BATCH_WRITES])
+    except Exception:
+        save_job('failed')
+        raise
+    save_job('done')
+
+    errors = result.pop('errors')
+    result['errors'] = (pd.concat(errors, ignore_index=True)[['CSV Row', 'Error Type', 'Field', 'Details']]
+                        if errors else pd.DataFrame(columns=['CSV Row', 'Error Type', 'Field', 'Details']))
+    result['seconds'] = time.perf_counter() - start
+    return result
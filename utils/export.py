@@ -0,0 +1,189 @@
+"""Streaming export of match and pit data to CSV, Parquet or Arrow files.
+
+Documents are read from the store EXPORT_PAGE_SIZE at a time (cursor pagination)
+and every page is written out before the next one is read, so memory use depends
+on the page size, not on the size of the export: a whole season can be exported
+for offline analysis. Filters (event, date range) run in Firestore, and only the
+requested columns are sent (a select() projection).
+
+Columns get fixed types from the form_config schema (numbers as int64, checkboxes
+as bool, everything else as text), so every chunk of a Parquet or Arrow file has
+the same schema and the CSV reads back with the same values.
+"""
+import io
+import tempfile
+from datetime import timedelta
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import streamlit as st
+from google.cloud.firestore_v1.base_query import FieldFilter
+from utils.schema import MATCH_SCHEMA, PIT_SCHEMA, to_bool
+from utils.storage import ASCENDING
+from utils.utils import (
+    MATCH_SCOUT_COLLECTION, PIT_SCOUT_COLLECTION, ARCHIVED_MATCH_SCOUT_COLLECTION, ARCHIVED_PIT_SCOUT_COLLECTION,
+    current_event_key
+)
+
+EXPORT_PAGE_SIZE = 2000
+
+# Format -> (file extension, MIME type)
+EXPORT_FORMATS = {
+    'csv': ('csv', 'text/csv'),
+    'parquet': ('parquet', 'application/vnd.apache.parquet'),
+    'arrow': ('arrow', 'application/vnd.apache.arrow.file')
+}
+
+# Collections and schema per kind of data
+EXPORT_KINDS = {
+    'match': {'collection': MATCH_SCOUT_COLLECTION, 'archive': ARCHIVED_MATCH_SCOUT_COLLECTION, 'schema': MATCH_SCHEMA},
+    'pit': {'collection': PIT_SCOUT_COLLECTION, 'archive': ARCHIVED_PIT_SCOUT_COLLECTION, 'schema': PIT_SCHEMA}
+}
+
+# Stored next to the form fields
+EXTRA_COLUMNS = {'match': ['event_key', 'timestamp'], 'pit': ['event_key', 'timestamp', 'robot_photo_url']}
+
+def export_columns(kind):
+    """Every column an export of kind 'match' or 'pit' can have, in form order."""
+    return ['doc_id'] + list(EXPORT_KINDS[kind]['schema']) + EXTRA_COLUMNS[kind]
+
+def _column_type(kind, column):
+    if column == 'archived':
+        return 'bool'
+    column_kind = EXPORT_KINDS[kind]['schema'].get(column, ('text', None))[0]
+    if column_kind == 'int' or column == 'team_number':
+        return 'int'
+    return 'bool' if column_kind == 'bool' else 'text'
+
+def arrow_schema(kind, columns):
+    """The Arrow schema of an export (see _column_type for the column types)."""
+    types = {'int': pa.int64(), 'bool': pa.bool_(), 'text': pa.string()}
+    return pa.schema([(column, types[_column_type(kind, column)]) for column in columns])
+
+def convert_page(kind, records, columns):
+    """A page of records (dicts with 'doc_id') as a DataFrame with the export column types."""
+    df = pd.DataFrame.from_records(records, columns=columns)
+    for column in columns:
+        values = df[column]
+        column_type = _column_type(kind, column)
+        if column_type == 'int':
+            df[column] = pd.to_numeric(values, errors='coerce').astype('Int64')
+        elif column_type == 'bool':
+            df[column] = to_bool(values).astype('boolean').where(values.notna())
+        else:
+            df[column] = values.where(values.isna(), values.astype(str))
+    return df
+
+def iter_pages(db, collection, event_key=None, start_date=None, end_date=None, fields=None,
+               page_size=EXPORT_PAGE_SIZE):
+    """Pages (lists of dicts with 'doc_id') of a collection's documents, read one page at a time.
+
+    event_key matches exactly; start_date and end_date (dates, both included) filter on
+    timestamp. Without dates, pages follow the document ids. fields limits the fields sent
+    (timestamp is always sent with dates: the next page starts after the last one's).
+    """
+    query = db.collection(collection)
+    if event_key:
+        query = query.where(filter=FieldFilter('event_key', '==', event_key))
+    if start_date or end_date:
+        if start_date:
+            query = query.where(filter=FieldFilter('timestamp', '>=', start_date.isoformat()))
+        if end_date:
+            query = query.where(filter=FieldFilter('timestamp', '<', (end_date + timedelta(days=1)).isoformat()))
+        query = query.order_by('timestamp', direction=ASCENDING)
+        if fields is not None and 'timestamp' not in fields:
+            fields = list(fields) + ['timestamp']
+    if fields is not None:
+        query = query.select(fields)
+    last = None
+    while True:
+        page_query = query.limit(page_size) if last is None else query.start_after(last).limit(page_size)
+        snapshots = list(page_query.stream())
+        if not snapshots:
+            return
+        yield [dict(snapshot.to_dict(), doc_id=snapshot.id) for snapshot in snapshots]
+        if len(snapshots) < page_size:
+            return
+        last = snapshots[-1]
+
+def write_export(db, kind, sink, fmt='csv', columns=None, event_key=None, start_date=None, end_date=None,
+                 include_archived=False, page_size=EXPORT_PAGE_SIZE, progress=None):
+    """Stream the kind's documents into sink (a path or binary file) as fmt ('csv', 'parquet' or 'arrow').
+
+    columns defaults to export_columns(kind). With include_archived, the archived
+    collection follows and an 'archived' column tells the two apart.
+    progress(rows), if given, is called after every page. Returns the rows written.
+    """
+    columns = [column for column in (columns or export_columns(kind)) if column != 'archived']
+    fields = None if columns == export_columns(kind) else [column for column in columns if column != 'doc_id']
+    collections = [(EXPORT_KINDS[kind]['collection'], False)]
+    if include_archived:
+        collections.append((EXPORT_KINDS[kind]['archive'], True))
+        columns = columns + ['archived']
+    schema = arrow_schema(kind, columns)
+
+    rows = 0
+    handle = open(sink, 'wb') if isinstance(sink, str) else sink
+    text = io.TextIOWrapper(handle, encoding='utf-8', newline='') if fmt == 'csv' else None
+    writer = (pq.ParquetWriter(handle, schema) if fmt == 'parquet'
+              else pa.ipc.new_file(handle, schema) if fmt == 'arrow' else None)
+    try:
+        if text is not None:
+            pd.DataFrame(columns=columns).to_csv(text, index=False)
+        for collection, archived in collections:
+            for records in iter_pages(db, collection, event_key, start_date, end_date, fields, page_size):
+                if include_archived:
+                    for record in records:
+                        record['archived'] = archived
+                # Fields read only for paging (timestamp) are left out here
+                page = convert_page(kind, records, columns)
+                if text is not None:
+                    page.to_csv(text, index=False, header=False)
+                else:
+                    writer.write_table(pa.Table.from_pandas(page, schema=schema, preserve_index=False))
+                rows += len(page)
+                if progress is not None:
+                    progress(rows)
+    finally:
+        if writer is not None:
+            writer.close()
+        if text is not None:
+            text.flush()
+            text.detach()  # Leave the caller's file open
+        if isinstance(sink, str):
+            handle.close()
+    return rows
+
+def export_file(db, kind, fmt='csv', **filters):
+    """write_export into a temporary file (on disk, not in memory), rewound for reading."""
+    handle = tempfile.TemporaryFile()
+    write_export(db, kind, handle, fmt, **filters)
+    handle.seek(0)
+    return handle
+
+def export_controls(db, kind, key):
+    """Export options and a download button; the file is only written when the button is clicked."""
+    with st.expander(f"Export {kind.capitalize()} Data"):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            fmt = st.selectbox("Format", list(EXPORT_FORMATS), format_func=str.upper, key=f"{key}_format")
+        with col2:
+            event_key = st.text_input("Event Key (blank for all events)", placeholder=current_event_key() or "e.g. 2025hiho",
+                                      key=f"{key}_event").strip().lower()
+        with col3:
+            dates = st.date_input("Date Range (optional)", value=(), key=f"{key}_dates")
+        columns = st.multiselect("Columns (blank for all)", export_columns(kind), key=f"{key}_columns")
+        include_archived = st.checkbox("Include archived records", key=f"{key}_archived")
+        start_date = dates[0] if len(dates) > 0 else None
+        end_date = dates[1] if len(dates) > 1 else start_date
+        extension, mime = EXPORT_FORMATS[fmt]
+        st.download_button(
+            label=f"Download {kind.capitalize()} Data as {fmt.upper()}",
+            # Called on click, in the background: nothing is read while the page renders
+            data=lambda: export_file(db, kind, fmt, columns=columns or None, event_key=event_key or None,
+                                     start_date=start_date, end_date=end_date, include_archived=include_archived),
+            file_name=f"{kind}_scouting_data{'_' + event_key if event_key else ''}.{extension}",
+            mime=mime,
+            on_click="ignore",
+            key=f"{key}_download"
+        )
@@ -0,0 +1,194 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+from google.cloud.firestore_v1.base_query import FieldFilter
+from utils.utils import (
+    MATCH_SCOUT_COLLECTION, SYNC_INTERVAL, get_storage, get_collection_version, load_derived, convert_match_dtypes,
+    calculate_match_scores
+)
+
+# Columns required to score matches and compute alliance bonuses
+MATCH_SCORING_COLUMNS = [
+    'auto_coral_l1', 'auto_coral_l2', 'auto_coral_l3', 'auto_coral_l4',
+    'auto_algae_barge', 'auto_algae_processor', 'auto_algae_removed',
+    'teleop_coral_l1', 'teleop_coral_l2', 'teleop_coral_l3', 'teleop_coral_l4',
+    'teleop_algae_barge', 'teleop_algae_processor', 'teleop_algae_removed',
+    'auto_taxi_left', 'climb_status', 'match_number', 'alliance_color'
+]
+
+SCORE_COLUMNS = ['auto_score', 'teleop_score', 'endgame_score', 'total_score']
+
+# Alliance bonus rules
+BONUS_POINTS = 15
+COOP_CORAL_PER_LEVEL = 5
+COOP_MIN_LEVELS = 3
+HARMONY_CLIMBS = ['Shallow Climb', 'Deep Climb']
+
+def alliance_groups(df):
+    """Group keys of the alliance of every row: event (when stored), match number and alliance color."""
+    alliance = [df['match_number'], df['alliance_color']]
+    if 'event_key' in df.columns:
+        # Match numbers repeat across events
+        alliance.insert(0, df['event_key'].astype(object).fillna(''))
+    return alliance
+
+def add_alliance_bonuses(df):
+    """Add coop_bonus and harmony_bonus per alliance and include them in total_score."""
+    df['match_number'] = df['match_number'].astype(str)
+    df['alliance_color'] = df['alliance_color'].astype(object).fillna('unknown').str.lower()
+    alliance = alliance_groups(df)
+
+    # Co-op Bonus: 15 points if alliance scores 5 coral on at least 3 levels
+    level_totals = pd.DataFrame({
+        level: df[[f'auto_coral_l{level}', f'teleop_coral_l{level}']].sum(axis=1) for level in range(1, 5)
+    })
+    alliance_levels = level_totals.groupby(alliance).transform('sum')
+    levels_with_5_plus = (alliance_levels >= COOP_CORAL_PER_LEVEL).sum(axis=1)
+    df['coop_bonus'] = np.where(levels_with_5_plus >= COOP_MIN_LEVELS, BONUS_POINTS, 0)
+
+    # Harmony Bonus: 15 points if all robots in the alliance climb (Shallow or Deep)
+    num_climbs = df['climb_status'].isin(HARMONY_CLIMBS).groupby(alliance).transform('sum')
+    num_robots = df['team_number'].groupby(alliance).transform('nunique')
+    df['harmony_bonus'] = np.where((num_climbs == num_robots) & (num_robots > 0), BONUS_POINTS, 0)
+
+    df['total_score'] = df['total_score'] + df['coop_bonus'] + df['harmony_bonus']
+    return df
+
+def add_epa(df):
+    """EPA: each team's score minus the average score of its alliance in that match."""
+    df['epa'] = df['total_score'] - df['total_score'].groupby(alliance_groups(df)).transform('mean')
+    return df
+
+def add_success_ratios(df):
+    """Scored/missed/attempt totals and success ratios for coral and algae."""
+    for period in ['auto', 'teleop']:
+        df[f'{period}_coral_success'] = df[[f'{period}_coral_l{level}' for level in range(1, 5)]].sum(axis=1)
+        df[f'{period}_coral_missed'] = df[[f'{period}_missed_coral_l{level}' for level in range(1, 5)]].sum(axis=1)
+        df[f'{period}_algae_success'] = df[[f'{period}_algae_barge', f'{period}_algae_processor']].sum(axis=1)
+        df[f'{period}_algae_missed'] = df[[f'{period}_missed_algae_barge', f'{period}_missed_algae_processor']].sum(axis=1)
+    for piece in ['coral', 'algae']:
+        for period in ['auto', 'teleop']:
+            df[f'{period}_{piece}_attempts'] = df[f'{period}_{piece}_success'] + df[f'{period}_{piece}_missed']
+            df[f'{period}_{piece}_success_ratio'] = _ratio(df[f'{period}_{piece}_success'], df[f'{period}_{piece}_attempts'])
+        df[f'total_{piece}_scored'] = df[f'auto_{piece}_success'] + df[f'teleop_{piece}_success']
+        df[f'total_{piece}_missed'] = df[f'auto_{piece}_missed'] + df[f'teleop_{piece}_missed']
+        df[f'total_{piece}_attempts'] = df[f'total_{piece}_scored'] + df[f'total_{piece}_missed']
+        df[f'{piece}_success_ratio'] = _ratio(df[f'total_{piece}_scored'], df[f'total_{piece}_attempts'])
+    return df
+
+def _ratio(scored, attempts):
+    # 0 when there were no attempts
+    return (scored / attempts.where(attempts != 0)).fillna(0)
+
+# Team statistics: columns averaged per team, and columns both averaged and totalled
+TEAM_STAT_MEAN_COLUMNS = [
+    'total_score', 'auto_score', 'teleop_score', 'endgame_score',
+    'auto_coral_success_ratio', 'teleop_coral_success_ratio', 'auto_algae_success_ratio', 'teleop_algae_success_ratio',
+    'defense_rating', 'speed_rating', 'driver_skill_rating'
+]
+TEAM_STAT_MEAN_SUM_COLUMNS = (
+    ['auto_coral_success', 'auto_coral_missed', 'teleop_coral_success', 'teleop_coral_missed'] +
+    [f'{period}_coral_l{level}' for period in ['auto', 'teleop'] for level in range(1, 5)] +
+    [f'{period}_missed_coral_l{level}' for period in ['auto', 'teleop'] for level in range(1, 5)] +
+    ['auto_algae_processor', 'teleop_algae_processor', 'auto_algae_barge', 'teleop_algae_barge',
+     'auto_missed_algae_barge', 'teleop_missed_algae_barge', 'auto_missed_algae_processor', 'teleop_missed_algae_processor',
+     'auto_algae_removed', 'teleop_algae_removed']
+)
+
+def aggregate_team_stats(team_data):
+    """Per-team averages (avg_<column>) and totals (total_<column>) of enriched match data,
+    plus total auto/teleop/overall objects scored."""
+    agg_spec = {col: 'mean' for col in TEAM_STAT_MEAN_COLUMNS}
+    agg_spec.update({col: ['mean', 'sum'] for col in TEAM_STAT_MEAN_SUM_COLUMNS})
+    team_stats = team_data.groupby('team_number', observed=True).agg(agg_spec)
+    team_stats.columns = [f"{'avg' if stat == 'mean' else 'total'}_{col}" for col, stat in team_stats.columns]
+    return add_object_totals(team_stats.reset_index().fillna(0))
+
+def add_object_totals(team_stats):
+    """Add total auto/teleop/overall objects scored to per-team totals (total_<column>)."""
+    for period in ['auto', 'teleop']:
+        team_stats[f'total_{period}_objects_scored'] = (
+            team_stats[f'total_{period}_coral_success'] +
+            team_stats[f'total_{period}_algae_barge'] +
+            team_stats[f'total_{period}_algae_processor']
+        )
+    team_stats['total_objects_scored'] = team_stats['total_auto_objects_scored'] + team_stats['total_teleop_objects_scored']
+    return team_stats
+
+def enrich_match_data(df):
+    """Raw match documents -> schema types, scores, alliance bonuses, EPA and success ratios.
+
+    Scores, bonuses and EPA are only added when every MATCH_SCORING_COLUMNS column
+    is present; callers check for missing columns themselves.
+    """
+    df = convert_match_dtypes(df)
+    if all(col in df.columns for col in MATCH_SCORING_COLUMNS):
+        if not all(col in df.columns for col in SCORE_COLUMNS):
+            df[SCORE_COLUMNS] = calculate_match_scores(df)
+        df = add_alliance_bonuses(df)
+        df = add_epa(df)
+    ratio_inputs = [f'{period}_{kind}' for period in ['auto', 'teleop']
+                    for kind in ['coral_l1', 'coral_l2', 'coral_l3', 'coral_l4', 'missed_coral_l1', 'missed_coral_l2',
+                                 'missed_coral_l3', 'missed_coral_l4', 'algae_barge', 'algae_processor',
+                                 'missed_algae_barge', 'missed_algae_processor']]
+    if all(col in df.columns for col in ratio_inputs):
+        df = add_success_ratios(df)
+    return df.reset_index(drop=True)
+
+def load_enriched_match_data(force_refresh=False, sync=False, columns=None):
+    """Enriched match data, rebuilt only when the match collection changes.
+
+    Pass columns='scoring' to skip the free-text answers (see utils.utils.load_collection).
+    """
+    try:
+        return load_derived(MATCH_SCOUT_COLLECTION, 'enriched', _build_enriched,
+                            force_refresh=force_refresh, sync=sync, columns=columns)
+    except Exception as e:
+        st.error(f"Error loading match data from Firestore: {str(e)}")
+        return None
+
+# Firestore accepts up to 30 values in an 'in' filter
+IN_FILTER_LIMIT = 30
+
+def _query_in(collection, field, values):
+    # Documents whose field is one of values, one query per IN_FILTER_LIMIT values
+    values = list(values)
+    for start in range(0, len(values), IN_FILTER_LIMIT):
+        yield from collection.where(filter=FieldFilter(field, 'in', values[start:start + IN_FILTER_LIMIT])).stream()
+
+@st.cache_data(ttl=SYNC_INTERVAL, max_entries=64, show_spinner=False)
+def _team_matches(team_numbers, version):
+    # version: the match collection version, so writes made in this process show at once
+    db, _ = get_storage()
+    collection = db.collection(MATCH_SCOUT_COLLECTION)
+    # Team numbers are stored as numbers by the form and as text by some imports
+    values = [str(team) for team in team_numbers] + [int(team) for team in team_numbers if str(team).isdigit()]
+    played = set()
+    for doc in _query_in(collection, 'team_number', values):
+        data = doc.to_dict()
+        if data.get('match_number') is not None:
+            played.add((data.get('event_key') or '', data['match_number']))
+    # Match numbers repeat across events, so rows of other events are left out here
+    rows = []
+    for doc in _query_in(collection, 'match_number', {match_number for _, match_number in played}):
+        data = doc.to_dict()
+        if (data.get('event_key') or '', data.get('match_number')) in played:
+            rows.append(dict(data, doc_id=doc.id))
+    return enrich_match_data(pd.DataFrame(rows)) if rows else pd.DataFrame()
+
+def load_team_matches(team_numbers):
+    """Enriched rows of every match the given teams played, without reading the whole match collection.
+
+    Alliance bonuses, EPA and outcomes depend on the other robots of a match, so
+    all rows of those matches are returned; filter on team_number for the teams' own.
+    """
+    try:
+        return _team_matches(tuple(sorted(str(team) for team in team_numbers)), get_collection_version(MATCH_SCOUT_COLLECTION))
+    except Exception as e:
+        st.error(f"Error loading match data from Firestore: {str(e)}")
+        return None
+
+def _build_enriched(df):
+    if df.empty:
+        return pd.DataFrame()
+    return enrich_match_data(df)
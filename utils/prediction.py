@@ -0,0 +1,157 @@
+import numpy as np
+import pandas as pd
+
+# Weights applied to the alliance's teams, best first
+ALLIANCE_WEIGHTS = [1.0, 0.8, 0.6]
+# Sensitivity of the logistic win probability to the predicted score difference
+WIN_PROB_SENSITIVITY = 0.1
+
+def calculate_alliance_score(team_metrics, metric='total_score'):
+    if not team_metrics:
+        return 0.0, 0.0
+    # Use the specified metric (default to 'total_score')
+    scores = [metrics[metric] for metrics in team_metrics]
+    std_devs = [metrics[f'{metric}_std'] for metrics in team_metrics]
+    # Apply weights to the top teams (1.0, 0.8, 0.6)
+    weights = np.array(ALLIANCE_WEIGHTS)[:len(scores)]
+    weighted_scores = [
+        score * weight for score, weight in zip(sorted(scores, reverse=True), weights)
+    ]
+    # Sum the weighted scores to get the total alliance score
+    total_score = sum(weighted_scores)
+    # Calculate weighted standard deviation for confidence interval
+    weighted_std = np.sqrt(sum((std * weight) ** 2 for std, weight in zip(sorted(std_devs, reverse=True), weights)))
+    return total_score, weighted_std
+
+def estimate_alliance_bonuses(data, alliance_teams, full_data):
+    if not alliance_teams:
+        return 0.0
+
+    # Calculate climb probability for Harmony bonus
+    climb_stats = full_data.groupby('team_number', observed=True)['climb_status'].value_counts(normalize=True).unstack(fill_value=0)
+    climb_stats['climb_prob'] = climb_stats.get('Shallow Climb', 0) + climb_stats.get('Deep Climb', 0)
+
+    # Ensure alliance_teams are strings to match df['team_number']
+    alliance_teams = [str(team) for team in alliance_teams]
+
+    # Check for missing teams
+    missing_teams = [team for team in alliance_teams if team not in climb_stats.index]
+    if missing_teams:
+        present_teams = [team for team in alliance_teams if team in climb_stats.index]
+        harmony_bonus_prob = climb_stats.loc[present_teams, 'climb_prob'].prod() if present_teams else 0
+    else:
+        harmony_bonus_prob = climb_stats.loc[alliance_teams, 'climb_prob'].prod()
+
+    # Calculate co-op bonus probability
+    coral_cols = [
+        'auto_coral_l1', 'auto_coral_l2', 'auto_coral_l3', 'auto_coral_l4',
+        'teleop_coral_l1', 'teleop_coral_l2', 'teleop_coral_l3', 'teleop_coral_l4'
+    ]
+    team_coral = data.groupby('team_number', observed=True)[coral_cols].mean()
+    team_coral['l1_total'] = team_coral['auto_coral_l1'] + team_coral['teleop_coral_l1']
+    team_coral['l2_total'] = team_coral['auto_coral_l2'] + team_coral['teleop_coral_l2']
+    team_coral['l3_total'] = team_coral['auto_coral_l3'] + team_coral['teleop_coral_l3']
+    team_coral['l4_total'] = team_coral['auto_coral_l4'] + team_coral['teleop_coral_l4']
+    if not team_coral.empty and team_coral.index.isin(alliance_teams).any():
+        avg_coral_per_level = team_coral.loc[team_coral.index.isin(alliance_teams), ['l1_total', 'l2_total', 'l3_total', 'l4_total']].sum()
+        levels_with_5_plus = (avg_coral_per_level >= 5).sum()
+        coop_bonus_prob = min(1.0, levels_with_5_plus / 3)
+    else:
+        coop_bonus_prob = 0
+
+    expected_bonus = (coop_bonus_prob * 15) + (harmony_bonus_prob * 15)
+    return max(expected_bonus, 0.0)
+
+def calculate_team_metrics(df):
+    """Per-team EPA and total score (mean and std), period scores, success ratios and climb rate."""
+    team_metrics = df.groupby('team_number', observed=True).agg({
+        'epa': ['mean', 'std'],
+        'total_score': ['mean', 'std'],
+        'auto_score': 'mean',
+        'teleop_score': 'mean',
+        'endgame_score': 'mean',
+        'teleop_coral_success_ratio': 'mean',
+        'teleop_algae_success_ratio': 'mean',
+        'climb_status': lambda x: ((x == 'Shallow Climb') | (x == 'Deep Climb')).mean()  # Keep as a proportion (0 to 1)
+    }).reset_index()
+
+    # Flatten the multi-index columns
+    team_metrics.columns = [
+        'team_number', 'epa', 'epa_std', 'total_score', 'total_score_std',
+        'auto_score', 'teleop_score', 'endgame_score',
+        'teleop_coral_success_ratio', 'teleop_algae_success_ratio', 'climb_rate'
+    ]
+    return team_metrics.fillna({'epa': 0, 'epa_std': 0, 'total_score': 0, 'total_score_std': 0})
+
+def summary_team_metrics(summaries):
+    """calculate_team_metrics() columns from the running team totals of utils.summaries.load_team_summaries()."""
+    team_metrics = pd.DataFrame({
+        'team_number': summaries['team_number'],
+        'epa': summaries['avg_epa'],
+        'epa_std': summaries['std_epa'],
+        'total_score': summaries['avg_total_score'],
+        'total_score_std': summaries['std_total_score'],
+        'auto_score': summaries['avg_auto_score'],
+        'teleop_score': summaries['avg_teleop_score'],
+        'endgame_score': summaries['avg_endgame_score'],
+        'teleop_coral_success_ratio': summaries['avg_teleop_coral_success_ratio'],
+        'teleop_algae_success_ratio': summaries['avg_teleop_algae_success_ratio'],
+        'climb_rate': summaries['climb_rate']
+    })
+    return team_metrics.fillna({'epa': 0, 'epa_std': 0, 'total_score': 0, 'total_score_std': 0})
+
+def summary_alliance_bonuses(summaries, alliance_teams):
+    """estimate_alliance_bonuses() from utils.summaries.load_team_summaries() rows (climb rates, coral averages)."""
+    rows = summaries[summaries['team_number'].isin([str(team) for team in alliance_teams])]
+    if rows.empty:
+        return 0.0
+    harmony_bonus_prob = rows['climb_rate'].prod()
+    avg_coral_per_level = pd.Series([
+        (rows.get(f'avg_auto_coral_l{level}', 0) + rows.get(f'avg_teleop_coral_l{level}', 0)).sum() for level in range(1, 5)
+    ])
+    coop_bonus_prob = min(1.0, (avg_coral_per_level >= 5).sum() / 3)
+    return max((coop_bonus_prob * 15) + (harmony_bonus_prob * 15), 0.0)
+
+def predict_match(df, red_alliance_teams, blue_alliance_teams, team_metrics=None, summaries=None):
+    """Predict a match from enriched match data, or from team summaries.
+
+    Returns a dict with, per alliance ('red', 'blue'), the predicted total score,
+    the expected bonus points included in it, its 95% confidence interval and the win probability in percent, plus the
+    teams without enough data ('insufficient_data_teams'). team_metrics from
+    calculate_team_metrics(df) can be passed in when predicting many matches.
+    With summaries (utils.summaries.load_team_summaries()), df is not used.
+    """
+    if team_metrics is None:
+        team_metrics = summary_team_metrics(summaries) if summaries is not None else calculate_team_metrics(df)
+
+    prediction = {'insufficient_data_teams': []}
+    for alliance, teams in [('red', red_alliance_teams), ('blue', blue_alliance_teams)]:
+        # Prepare metrics for each team in the alliance
+        alliance_metrics = []
+        for team in teams:
+            team_data = team_metrics[team_metrics['team_number'] == team]
+            if team_data.empty or team_data['total_score'].iloc[0] == 0:
+                prediction['insufficient_data_teams'].append(f"{alliance.title()} Team {team}")
+                alliance_metrics.append({'epa': 0, 'epa_std': 0, 'total_score': 0, 'total_score_std': 0})
+            else:
+                alliance_metrics.append(team_data.iloc[0].to_dict())
+
+        # total_score in team_metrics is the average per match for each team, so the
+        # sum of weighted scores is already the expected total alliance score
+        score, std = calculate_alliance_score(alliance_metrics, metric='total_score')
+        bonus = (summary_alliance_bonuses(summaries, teams) if summaries is not None
+                 else estimate_alliance_bonuses(df[df['team_number'].isin(teams)], teams, df))
+        total_score = max(score + bonus, 0.0)
+        # Approximate 95% CI: mean ± 1.96 * std
+        prediction[alliance] = {
+            'total_score': total_score,
+            'bonus': bonus,
+            'ci_lower': max(total_score - 1.96 * std, 0.0),
+            'ci_upper': total_score + 1.96 * std
+        }
+
+    # Win probability from a logistic function of the score difference
+    score_diff = prediction['red']['total_score'] - prediction['blue']['total_score']
+    prediction['red']['win_prob'] = 100 / (1 + np.exp(-WIN_PROB_SENSITIVITY * score_diff))
+    prediction['blue']['win_prob'] = 100 - prediction['red']['win_prob']
+    return prediction
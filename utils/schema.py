@@ -0,0 +1,108 @@
+# utils/schema.py
+# Compact column types for scouting frames, derived from utils/form_config.py
+import pandas as pd
+from utils.form_config import (
+    MATCH_INFO, MATCH_OUTCOME, AUTONOMOUS, TELEOP, ENDGAME, PERFORMANCE_RATINGS, STRATEGY, ANALYSIS,
+    PIT_INFO, ROBOT_SPECIFICATIONS, CAPABILITIES, PIT_STRATEGY, PIT_NOTES
+)
+
+MATCH_FORM_SECTIONS = [MATCH_INFO, MATCH_OUTCOME, AUTONOMOUS, TELEOP, ENDGAME, PERFORMANCE_RATINGS, STRATEGY, ANALYSIS]
+PIT_FORM_SECTIONS = [PIT_INFO, ROBOT_SPECIFICATIONS, CAPABILITIES, PIT_STRATEGY, PIT_NOTES]
+
+# Low-cardinality fields stored as pandas categoricals
+CATEGORICAL_FIELDS = ['team_number', 'alliance_color', 'climb_status', 'primary_role', 'drivetrain_type']
+
+# Values read as True for checkbox fields (CSV uploads store them as text)
+TRUE_STRINGS = ['true', '1', '1.0', 'yes', 'y', 't']
+
+def iter_form_fields(sections):
+    """Yield every field definition (a dict with a 'name') in the given form_config sections."""
+    for section in sections:
+        stack = [section]
+        while stack:
+            item = stack.pop(0)
+            if isinstance(item, dict) and 'name' in item:
+                yield item
+            elif isinstance(item, dict):
+                stack[0:0] = list(item.values())
+            elif isinstance(item, list):
+                stack[0:0] = item
+
+def build_schema(sections):
+    """Map each form field to a column kind: 'category', 'int', 'bool' or 'text'.
+
+    Categoricals keep the field's options (in form order) as their categories.
+    """
+    schema = {}
+    for field in iter_form_fields(sections):
+        name = field['name']
+        if name in CATEGORICAL_FIELDS:
+            schema[name] = ('category', field.get('options'))
+        elif field['type'] in ('number', 'slider'):
+            schema[name] = ('int', None)
+        elif field['type'] == 'checkbox':
+            schema[name] = ('bool', None)
+        else:
+            schema[name] = ('text', None)
+    return schema
+
+MATCH_SCHEMA = build_schema(MATCH_FORM_SECTIONS)
+PIT_SCHEMA = build_schema(PIT_FORM_SECTIONS)
+
+def build_profiles(info_section, sections):
+    """Named column sets for projected loads: 'scoring' leaves out the long free-text
+    answers (and keeps event_key, which alliances are grouped by), 'qa' is the
+    identifying fields plus those answers, 'full' is every field."""
+    fields = list(iter_form_fields(sections))
+    identity = [field['name'] for field in iter_form_fields([info_section])]
+    free_text = [field['name'] for field in fields if field['type'] == 'textarea']
+    return {
+        'scoring': [field['name'] for field in fields if field['type'] != 'textarea'] + ['robot_photo_url', 'event_key'],
+        'qa': identity + free_text,
+        'full': None
+    }
+
+MATCH_PROFILES = build_profiles(MATCH_INFO, MATCH_FORM_SECTIONS)
+PIT_PROFILES = build_profiles(PIT_INFO, PIT_FORM_SECTIONS)
+
+def to_small_int(series):
+    """Numbers (missing -> 0) in the smallest integer type that holds them, unsigned when possible."""
+    values = pd.to_numeric(series, errors='coerce').fillna(0).astype('int64')
+    if values.empty or values.min() >= 0:
+        return pd.to_numeric(values, downcast='unsigned')
+    return pd.to_numeric(values, downcast='integer')
+
+def to_bool(series):
+    """Checkbox values as bool; text such as 'False' or '0' is False, missing is False."""
+    if pd.api.types.is_bool_dtype(series):
+        return series
+    return series.astype(str).str.strip().str.lower().isin(TRUE_STRINGS)
+
+def to_team_category(series):
+    """Team numbers as a categorical of strings ('254', not '254.0'), ordered numerically."""
+    numbers = pd.to_numeric(series, errors='coerce').fillna(0).astype('int64')
+    categories = [str(team) for team in sorted(numbers.unique())]
+    return pd.Series(pd.Categorical(numbers.astype(str), categories=categories), index=series.index)
+
+def to_category(series, options=None):
+    """Categorical with the form options first, then any other values found in the data."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series
+    options = list(options or [])
+    extras = sorted(set(series.dropna().unique()) - set(options), key=str)
+    return pd.Series(pd.Categorical(series, categories=options + extras), index=series.index)
+
+def apply_schema(df, schema):
+    """Convert the columns of df named in schema to their compact types in place and return df."""
+    for col, (kind, options) in schema.items():
+        if col not in df.columns:
+            continue
+        if col == 'team_number':
+            df[col] = to_team_category(df[col])
+        elif kind == 'category':
+            df[col] = to_category(df[col], options)
+        elif kind == 'int':
+            df[col] = to_small_int(df[col])
+        elif kind == 'bool':
+            df[col] = to_bool(df[col])
+    return df
@@ -0,0 +1,64 @@
+import json
+import os
+import time
+import pandas as pd
+
+# Directory for the local Parquet snapshots of cached collections
+SNAPSHOT_DIR = os.environ.get(
+    "SCOUTING_SNAPSHOT_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "snapshots")
+)
+_METADATA_KEY = b"scouting_snapshot"
+
+def snapshot_path(collection_name):
+    return os.path.join(SNAPSHOT_DIR, f"{collection_name}.parquet")
+
+def write_snapshot(collection_name, df):
+    """Write a collection DataFrame to its Parquet snapshot; returns the seconds taken or None.
+
+    Firestore documents can mix types within a field (e.g. numbers and strings),
+    which Parquet cannot store, so such columns are saved as JSON text and
+    decoded again by read_snapshot().
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        start = time.perf_counter()
+        out = df.copy()
+        json_columns = []
+        for col in out.columns[out.dtypes == object]:
+            try:
+                pa.array(out[col], from_pandas=True)
+            except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+                out[col] = out[col].map(lambda v: json.dumps(v, default=str))
+                json_columns.append(col)
+        table = pa.Table.from_pandas(out, preserve_index=False)
+        metadata = dict(table.schema.metadata or {})
+        metadata[_METADATA_KEY] = json.dumps({"json_columns": json_columns, "written_at": time.time()}).encode()
+        table = table.replace_schema_metadata(metadata)
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        path = snapshot_path(collection_name)
+        # Write then rename so a crash never leaves a half-written snapshot
+        pq.write_table(table, path + ".tmp")
+        os.replace(path + ".tmp", path)
+        return time.perf_counter() - start
+    except Exception as e:
+        print(f"Failed to write snapshot of {collection_name}: {str(e)}")
+        return None
+
+def read_snapshot(collection_name):
+    """Return (DataFrame, written_at) from the collection's snapshot, or (None, None)."""
+    path = snapshot_path(collection_name)
+    if not os.path.exists(path):
+        return None, None
+    try:
+        import pyarrow.parquet as pq
+        table = pq.read_table(path)
+        info = json.loads((table.schema.metadata or {}).get(_METADATA_KEY, b"{}"))
+        df = table.to_pandas()
+        for col in info.get("json_columns", []):
+            df[col] = df[col].map(json.loads)
+        return df, info.get("written_at")
+    except Exception as e:
+        print(f"Failed to read snapshot of {collection_name}: {str(e)}")
+        return None, None
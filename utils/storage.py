@@ -0,0 +1,518 @@
+"""Storage backends for the scouting collections.
+
+The app talks to storage through this subset of the Firestore client API:
+
+    db.collection(name)     where(), order_by(), limit(), start_after(), select(), stream(),
+                            get(), count().get(), add(), document()
+    collection.document(id) get() -> snapshot (.id, .exists, .to_dict()),
+                            set(data, merge=False), update(data), delete()
+    db.batch()              set(), update(), delete(), commit()
+    db.get_all(refs)        snapshots of several documents in one read
+    query.on_snapshot(cb)   cb(docs, changes, read_time) with the matching documents, then with
+                            every change; returns a watch with unsubscribe() and is_active
+    run_transaction(db, f)  f(transaction) reads with get(transaction=...), writes with
+                            transaction.set/update/delete; all reads come before writes
+
+The Firestore client provides it natively. SQLiteStorage provides it over a local
+SQLite file (or ':memory:') for offline venue mode and network-free load tests;
+documents are stored as JSON with indexes on team_number, match_number and
+timestamp. Triggers log every write in a changes table, which SQLite listeners
+(on_snapshot) poll, so they also see writes of other processes using the file.
+
+The backend is chosen with the SCOUTING_STORAGE environment variable or a
+[storage] section in secrets.toml (backend = "firestore" | "sqlite", path = ...).
+"""
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from enum import Enum
+import streamlit as st
+
+ASCENDING = "ASCENDING"
+DESCENDING = "DESCENDING"
+
+DEFAULT_SQLITE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "scouting.db")
+
+# Document fields with a SQLite index, per collection
+INDEXED_FIELDS = ['team_number', 'match_number', 'timestamp']
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    collection TEXT NOT NULL,
+    doc_id TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (collection, doc_id)
+);
+CREATE TABLE IF NOT EXISTS changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    collection TEXT NOT NULL,
+    doc_id TEXT NOT NULL,
+    changed_at INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_changes_collection ON changes (collection, seq);
+""" + "".join(
+    f"CREATE INDEX IF NOT EXISTS idx_documents_{field} ON documents (collection, json_extract(data, '$.{field}'));\n"
+    for field in INDEXED_FIELDS
+) + "".join(
+    # INSERT OR REPLACE fires the insert trigger only, which is all a listener needs
+    f"CREATE TRIGGER IF NOT EXISTS documents_{event.lower()} AFTER {event} ON documents BEGIN "
+    f"INSERT INTO changes (collection, doc_id, changed_at) VALUES ({row}.collection, {row}.doc_id, "
+    f"CAST(strftime('%s', 'now') AS INTEGER)); END;\n"
+    for event, row in (('INSERT', 'NEW'), ('UPDATE', 'NEW'), ('DELETE', 'OLD'))
+)
+
+# Seconds between two polls of a SQLite listener, and seconds the changes log is kept
+WATCH_INTERVAL = 0.5
+CHANGE_LOG_SECONDS = 3600
+
+_FIELD_PATTERN = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z_][A-Za-z0-9_]*)*$')
+_OPERATORS = {'==': '=', '!=': '!=', '<': '<', '<=': '<=', '>': '>', '>=': '>='}
+
+def storage_settings():
+    """Return (backend, sqlite_path) from the environment or the [storage] secrets section."""
+    try:
+        config = dict(st.secrets.get("storage", {}))
+    except Exception:
+        config = {}
+    backend = os.environ.get("SCOUTING_STORAGE", config.get("backend", "firestore")).lower()
+    path = os.environ.get("SCOUTING_SQLITE_PATH", config.get("path", DEFAULT_SQLITE_PATH))
+    return backend, path
+
+def _field_sql(field_path):
+    # Inlined (not bound) so the expression matches the indexes above; field names are validated
+    if not _FIELD_PATTERN.match(field_path):
+        raise ValueError(f"Unsupported field path: {field_path}")
+    return f"json_extract(data, '$.{field_path}')"
+
+def _is_server_timestamp(value):
+    # firestore.SERVER_TIMESTAMP, detected without importing the Firestore client
+    return type(value).__name__ == 'Sentinel' and 'server timestamp' in repr(value)
+
+def _is_increment(value):
+    # firestore.Increment, detected the same way
+    return type(value).__name__ == 'Increment' and hasattr(value, 'value')
+
+# JSON scalars, which _resolve and _encode return unchanged (checked first: most values are)
+_PLAIN_TYPES = (str, int, bool, type(None))
+
+def _resolve(current, value):
+    """The stored value of writing value over current: increments add, merged maps merge."""
+    if type(value) in _PLAIN_TYPES:
+        return value
+    if _is_increment(value):
+        base = current if isinstance(current, (int, float)) and not isinstance(current, bool) else 0
+        return base + value.value
+    if isinstance(value, dict):
+        if not isinstance(current, dict) and all(type(item) in _PLAIN_TYPES for item in value.values()):
+            return value
+        current = dict(current) if isinstance(current, dict) else {}
+        for key, item in value.items():
+            current[key] = _resolve(current.get(key), item)
+        return current
+    return value
+
+def _encode(value):
+    """Firestore-style values -> JSON-safe values (datetimes tagged, NaN -> None)."""
+    if type(value) in _PLAIN_TYPES:
+        return value
+    if isinstance(value, dict):
+        if all(type(k) is str and type(v) in _PLAIN_TYPES for k, v in value.items()):
+            return value
+        return {str(k): _encode(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_encode(v) for v in value]
+    if _is_server_timestamp(value):
+        value = datetime.now(timezone.utc)
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    if hasattr(value, 'item') and not isinstance(value, (str, bytes)):
+        value = value.item()  # numpy scalars
+    if isinstance(value, float) and value != value:
+        return None
+    return value
+
+def _decode_object(obj):
+    if len(obj) == 1 and "__datetime__" in obj:
+        return datetime.fromisoformat(obj["__datetime__"])
+    return obj
+
+def _loads(text):
+    return json.loads(text, object_hook=_decode_object)
+
+def _dumps(data):
+    return json.dumps(_encode(data))
+
+def _set_path(data, field_path, value):
+    keys = field_path.split('.')
+    for key in keys[:-1]:
+        data = data.setdefault(key, {})
+    data[keys[-1]] = _resolve(data.get(keys[-1]), value) if _is_increment(value) else value
+
+class SQLiteStorage:
+    """Local SQLite implementation of the storage interface described above."""
+
+    def __init__(self, path=":memory:"):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.RLock()
+        with self._lock:
+            if path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+
+    def collection(self, name):
+        return SQLiteQuery(self, name)
+
+    def batch(self):
+        return SQLiteBatch(self)
+
+    def get_all(self, references, transaction=None):
+        for reference in references:
+            yield reference.get()
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _read(self, collection, doc_id):
+        rows = self._query("SELECT data FROM documents WHERE collection = ? AND doc_id = ?", (collection, doc_id))
+        return _loads(rows[0][0]) if rows else None
+
+    def _write(self, operations):
+        # operations: (kind, collection, doc_id, data, merge); caller holds the lock inside a transaction
+        for kind, collection, doc_id, data, merge in operations:
+            if kind == 'delete':
+                self._conn.execute("DELETE FROM documents WHERE collection = ? AND doc_id = ?", (collection, doc_id))
+                continue
+            # A plain set replaces the document, so only updates and merges read it
+            current = self._read(collection, doc_id) if kind == 'update' or merge else None
+            if kind == 'update':
+                if current is None:
+                    raise KeyError(f"No document to update: {collection}/{doc_id}")
+                for field_path, value in data.items():
+                    _set_path(current, field_path, value)
+                data = current
+            elif merge:
+                # Like Firestore, merge=True merges nested maps instead of replacing them
+                data = _resolve(current, data)
+            else:
+                data = _resolve(None, data)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO documents (collection, doc_id, data) VALUES (?, ?, ?)",
+                (collection, doc_id, _dumps(data))
+            )
+
+    def _apply(self, operations):
+        # Applied in one SQLite transaction
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._write(operations)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def run_transaction(self, func):
+        """Run func(transaction) with the database locked; its writes are applied atomically."""
+        with self._lock:
+            # IMMEDIATE also locks out other processes using the same file
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                transaction = SQLiteTransaction(self)
+                result = func(transaction)
+                self._write(transaction._operations)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return result
+
+def run_transaction(db, func):
+    """Run func(transaction) as a transaction on either backend and return its result.
+
+    Firestore retries func when the documents it read change concurrently, so func
+    must not have side effects besides its transaction writes.
+    """
+    if isinstance(db, SQLiteStorage):
+        return db.run_transaction(func)
+    from google.cloud import firestore
+    return firestore.transactional(func)(db.transaction())
+
+class SQLiteSnapshot:
+    def __init__(self, reference, data):
+        self.reference = reference
+        self.id = reference.id
+        self._data = data
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def to_dict(self):
+        return None if self._data is None else dict(self._data)
+
+    def get(self, field_path):
+        value = self._data
+        for key in field_path.split('.'):
+            value = value.get(key) if isinstance(value, dict) else None
+        return value
+
+class SQLiteDocumentRef:
+    def __init__(self, storage, collection, doc_id):
+        self._storage = storage
+        self.collection_name = collection
+        self.id = doc_id
+
+    def get(self, transaction=None):
+        return SQLiteSnapshot(self, self._storage._read(self.collection_name, self.id))
+
+    def set(self, data, merge=False):
+        self._storage._apply([('set', self.collection_name, self.id, data, merge)])
+
+    def update(self, data):
+        self._storage._apply([('update', self.collection_name, self.id, data, False)])
+
+    def delete(self):
+        self._storage._apply([('delete', self.collection_name, self.id, None, False)])
+
+class _AggregationResult:
+    def __init__(self, value):
+        self.value = value
+
+class _CountQuery:
+    def __init__(self, query):
+        self._query = query
+
+    def get(self):
+        sql, params = self._query._sql("COUNT(*)", ordered=False)
+        return [[_AggregationResult(self._query._storage._query(sql, params)[0][0])]]
+
+class SQLiteQuery:
+    """A collection or a filtered, ordered, limited and projected query over it."""
+
+    def __init__(self, storage, collection, filters=(), orders=(), limit=None, fields=None, cursor=None):
+        self._storage = storage
+        self.id = collection
+        self._filters = tuple(filters)
+        self._orders = tuple(orders)
+        self._limit = limit
+        self._fields = fields
+        self._cursor = cursor
+
+    def _copy(self, **changes):
+        state = {'filters': self._filters, 'orders': self._orders, 'limit': self._limit, 'fields': self._fields,
+                 'cursor': self._cursor}
+        state.update(changes)
+        return SQLiteQuery(self._storage, self.id, **state)
+
+    def document(self, document_id=None):
+        return SQLiteDocumentRef(self._storage, self.id, document_id or uuid.uuid4().hex[:20])
+
+    def add(self, data, document_id=None):
+        ref = self.document(document_id)
+        ref.set(data)
+        return datetime.now(timezone.utc), ref
+
+    def where(self, field_path=None, op_string=None, value=None, filter=None):
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        field = _field_sql(field_path)
+        if op_string in ('in', 'not-in'):
+            placeholders = ", ".join("?" for _ in value)
+            condition = (f"{field} IN ({placeholders})" if op_string == 'in'
+                         else f"{field} IS NOT NULL AND {field} NOT IN ({placeholders})")
+            params = tuple(_encode(v) for v in value)
+        elif op_string == 'array_contains':
+            condition = f"EXISTS (SELECT 1 FROM json_each(data, '$.{field_path}') WHERE value = ?)"
+            params = (_encode(value),)
+        elif op_string == '==' and value is None:
+            condition = f"json_type(data, '$.{field_path}') = 'null'"
+            params = ()
+        elif op_string in _OPERATORS:
+            condition = f"{field} {_OPERATORS[op_string]} ?"
+            params = (_encode(value),)
+        else:
+            raise ValueError(f"Unsupported operator: {op_string}")
+        return self._copy(filters=self._filters + ((condition, params),))
+
+    def order_by(self, field_path, direction=ASCENDING):
+        return self._copy(orders=self._orders + ((field_path, direction),))
+
+    def limit(self, count):
+        return self._copy(limit=count)
+
+    def start_after(self, document_fields_or_snapshot):
+        # A snapshot, or a dict of the order_by fields; results start after it in the query order
+        return self._copy(cursor=document_fields_or_snapshot)
+
+    def select(self, field_paths):
+        return self._copy(fields=list(field_paths))
+
+    def _cursor_sql(self):
+        # Rows after the cursor: (field1, ..., doc_id) compared in order, each in its own direction
+        cursor = self._cursor
+        if isinstance(cursor, dict):
+            keys = [(_field_sql(field), direction, cursor.get(field)) for field, direction in self._orders]
+        else:
+            data = cursor.to_dict() or {}
+            keys = [(_field_sql(field), direction, data.get(field)) for field, direction in self._orders]
+            last = self._orders[-1][1] if self._orders else ASCENDING
+            keys.append(("doc_id", last, cursor.id))
+        alternatives, params = [], []
+        for i, (column, direction, value) in enumerate(keys):
+            terms = [f"{earlier} = ?" for earlier, _, _ in keys[:i]]
+            terms.append(f"{column} {'<' if direction == DESCENDING else '>'} ?")
+            alternatives.append("(" + " AND ".join(terms) + ")")
+            params += [_encode(earlier_value) for _, _, earlier_value in keys[:i]] + [_encode(value)]
+        return "(" + " OR ".join(alternatives) + ")", params
+
+    def count(self):
+        return _CountQuery(self)
+
+    def on_snapshot(self, callback):
+        return SQLiteWatch(self, callback)
+
+    def _documents(self, doc_ids):
+        # The documents of this query among doc_ids
+        doc_ids = list(doc_ids)
+        for start in range(0, len(doc_ids), 500):
+            chunk = doc_ids[start:start + 500]
+            condition = (f"doc_id IN ({', '.join('?' for _ in chunk)})", tuple(chunk))
+            yield from self._copy(filters=self._filters + (condition,)).stream()
+
+    def _sql(self, columns, ordered=True):
+        conditions = ["collection = ?"] + [condition for condition, _ in self._filters]
+        params = [self.id] + [param for _, values in self._filters for param in values]
+        # Like Firestore, ordering by a field leaves out documents without it
+        conditions += [f"json_type(data, '$.{field}') IS NOT NULL" for field, _ in self._orders]
+        if self._cursor is not None:
+            condition, values = self._cursor_sql()
+            conditions.append(condition)
+            params += values
+        sql = f"SELECT {columns} FROM documents WHERE " + " AND ".join(conditions)
+        if ordered:
+            order = [f"{_field_sql(field)} {'DESC' if direction == DESCENDING else 'ASC'}" for field, direction in self._orders]
+            # Ties are broken by document id in the direction of the last order, like Firestore;
+            # '+doc_id' keeps the planner on the field indexes instead of the primary key order
+            last = self._orders[-1][1] if self._orders else ASCENDING
+            order.append(f"+doc_id {'DESC' if last == DESCENDING else 'ASC'}")
+            sql += " ORDER BY " + ", ".join(order)
+        if self._limit is not None:
+            sql += f" LIMIT {int(self._limit)}"
+        return sql, params
+
+    def stream(self, transaction=None):
+        # select([]) lists references only, so the documents are not parsed
+        keys_only = self._fields is not None and not self._fields
+        sql, params = self._sql("doc_id, NULL" if keys_only else "doc_id, data")
+        for doc_id, text in self._storage._query(sql, params):
+            data = {} if keys_only else _loads(text)
+            if self._fields is not None:
+                data = {field: data[field] for field in self._fields if field in data}
+            yield SQLiteSnapshot(SQLiteDocumentRef(self._storage, self.id, doc_id), data)
+
+    def get(self, transaction=None):
+        return list(self.stream())
+
+class SQLiteBatch:
+    """Write batch; commit() applies every write in one SQLite transaction."""
+
+    def __init__(self, storage):
+        self._storage = storage
+        self._operations = []
+
+    def set(self, reference, data, merge=False):
+        self._operations.append(('set', reference.collection_name, reference.id, data, merge))
+
+    def update(self, reference, data):
+        self._operations.append(('update', reference.collection_name, reference.id, data, False))
+
+    def delete(self, reference):
+        self._operations.append(('delete', reference.collection_name, reference.id, None, False))
+
+    def commit(self):
+        self._storage._apply(self._operations)
+        results, self._operations = self._operations, []
+        return results
+
+class SQLiteTransaction(SQLiteBatch):
+    """Writes of SQLiteStorage.run_transaction(); applied when the function returns."""
+
+class ChangeType(Enum):
+    ADDED = 1
+    REMOVED = 2
+    MODIFIED = 3
+
+class DocumentChange:
+    def __init__(self, type, document):
+        self.type = type
+        self.document = document
+
+class SQLiteWatch:
+    """on_snapshot listener of a SQLite query, polling the changes log every WATCH_INTERVAL seconds.
+
+    Like Firestore, the callback runs on a background thread: first with every
+    matching document as ADDED, then with the documents written since the last
+    poll. REMOVED changes carry the document as last seen.
+    """
+
+    def __init__(self, query, callback, interval=WATCH_INTERVAL):
+        self._query = query
+        self._callback = callback
+        self._interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    @property
+    def is_active(self):
+        return self._thread.is_alive() and not self._stop.is_set()
+
+    def unsubscribe(self):
+        self._stop.set()
+
+    def _deliver(self, documents, changes):
+        self._callback(list(documents.values()), changes, datetime.now(timezone.utc))
+
+    def _run(self):
+        storage = self._query._storage
+        try:
+            # The log position is taken before the first read, so no write falls in between
+            position = storage._query("SELECT COALESCE(MAX(seq), 0) FROM changes")[0][0]
+            documents = {snapshot.id: snapshot for snapshot in self._query.stream()}
+            self._deliver(documents, [DocumentChange(ChangeType.ADDED, snapshot) for snapshot in documents.values()])
+            pruned_at = 0
+            while not self._stop.wait(self._interval):
+                rows = storage._query("SELECT seq, doc_id FROM changes WHERE collection = ? AND seq > ? ORDER BY seq",
+                                      (self._query.id, position))
+                if time.time() - pruned_at > 60:
+                    storage._query("DELETE FROM changes WHERE changed_at < ?", (int(time.time()) - CHANGE_LOG_SECONDS,))
+                    pruned_at = time.time()
+                if not rows:
+                    continue
+                position = rows[-1][0]
+                doc_ids = list(dict.fromkeys(doc_id for _, doc_id in rows))
+                current = {snapshot.id: snapshot for snapshot in self._query._documents(doc_ids)}
+                changes = []
+                for doc_id in doc_ids:
+                    if doc_id in current:
+                        kind = ChangeType.MODIFIED if doc_id in documents else ChangeType.ADDED
+                        documents[doc_id] = current[doc_id]
+                        changes.append(DocumentChange(kind, current[doc_id]))
+                    elif doc_id in documents:
+                        changes.append(DocumentChange(ChangeType.REMOVED, documents.pop(doc_id)))
+                if changes:
+                    self._deliver(documents, changes)
+        except Exception as e:
+            # is_active turns False, so the caller starts a new listener
+            print(f"SQLite listener on {self._query.id} stopped: {e}")
+        finally:
+            self._stop.set()
@@ -0,0 +1,361 @@
+"""Per-team running totals of match data, kept in the team_summaries collection.
+
+One document per team (id: the team number) holds the number of match rows, the
+sum and sum of squares of every SUMMARY_COLUMNS column and a climb_status
+histogram, so per-team means and standard deviations cost one small read per team:
+
+    {'team_number': '4270', 'count': 12, 'sum': {...}, 'sumsq': {...},
+     'climb_status': {'Deep Climb': 7, ...}, 'updated_at': '2025-...'}
+
+Alliance bonuses and EPA depend on the other robots of the alliance, so every
+write goes through write_match_documents(), which recomputes the contributions of
+the alliances it touches and updates the summaries in the same transaction. Bulk
+moves (utils.bulk) instead track the alliances in memory with alliance_index() and
+write the changes as increments (summary_changes(), summary_increments()).
+
+Writers that change match documents without updating the summaries (CSV imports,
+merging duplicate records, bulk deletes) add summaries_outdated() to their batches.
+summaries_current() then reports the summaries as out of date until
+rebuild_team_summaries() has recomputed them from a read that saw those writes.
+"""
+import uuid
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import streamlit as st
+from google.cloud.firestore_v1.base_query import FieldFilter
+from google.cloud.firestore_v1.transforms import Increment
+from utils.storage import run_transaction
+from utils.utils import (
+    MATCH_SCOUT_COLLECTION, get_storage, load_derived, invalidate_collection_cache, patch_collection_cache,
+    deletion_marker
+)
+from utils.metrics import enrich_match_data, add_object_totals, TEAM_STAT_MEAN_COLUMNS, TEAM_STAT_MEAN_SUM_COLUMNS
+
+TEAM_SUMMARY_COLLECTION = "team_summaries"
+# One document (id: TEAM_SUMMARY_COLLECTION) telling whether the summaries are current
+SUMMARY_STATE_COLLECTION = "summary_state"
+
+# Columns with a running sum and sum of squares per team
+SUMMARY_COLUMNS = ['epa'] + TEAM_STAT_MEAN_COLUMNS + TEAM_STAT_MEAN_SUM_COLUMNS
+
+# Firestore allows 500 writes per batch
+BATCH_SIZE = 500
+
+def summary_contributions(rows, groups=None):
+    """Per-team totals of enriched match rows: {team: {'count', 'sum', 'sumsq', 'climb_status'}}.
+
+    With groups (one label per row), the totals are kept apart per label instead:
+    {label: {team: totals}}, computed in a single pass over all rows.
+    """
+    labels = groups if groups is not None else [None] * len(rows)
+    pairs = [(row, label) for row, label in zip(rows, labels) if row.get('team_number') is not None]
+    if not pairs:
+        return {}
+    df = pd.DataFrame([row for row, _ in pairs])
+    df['_group'] = pd.Series(range(len(pairs)), dtype='int64')
+    df = enrich_match_data(df)
+    group = pd.Series([pairs[i][1] for i in df['_group']], index=df.index, dtype=object)
+    columns = [col for col in SUMMARY_COLUMNS if col in df.columns]
+    values = df[columns].astype(float).fillna(0)
+    keys = [group.map(repr), df['team_number'].astype(str)]
+    sums = values.groupby(keys).sum()
+    sumsq = (values ** 2).groupby(keys).sum()
+    counts = values.groupby(keys).size()
+    climbs = {}
+    if 'climb_status' in df.columns:
+        histogram = df['climb_status'].astype(object).fillna('None').astype(str).groupby(keys).value_counts()
+        for (label, team, status), n in histogram.items():
+            climbs.setdefault((label, team), {})[status] = int(n)
+    names = dict(zip(group.map(repr), group))
+
+    # Plain dicts per (label, team); .loc lookups per group are slow on a MultiIndex
+    sums, sumsq = sums.to_dict('index'), sumsq.to_dict('index')
+    contributions = {}
+    for (label, team), count in counts.items():
+        contributions.setdefault(names[label], {})[team] = {
+            'count': int(count),
+            'sum': sums[(label, team)],
+            'sumsq': sumsq[(label, team)],
+            'climb_status': climbs.get((label, team), {})
+        }
+    return contributions if groups is not None else contributions.get(None, {})
+
+def _merge(summary, contribution, sign, keep_zero=False):
+    # summary += sign * contribution, in place; empty histogram entries are dropped unless keep_zero
+    summary['count'] = summary.get('count', 0) + sign * contribution['count']
+    for key in ('sum', 'sumsq', 'climb_status'):
+        totals = summary.setdefault(key, {})
+        for name, value in contribution[key].items():
+            totals[name] = totals.get(name, 0) + sign * value
+            if key == 'climb_status' and totals[name] <= 0 and not keep_zero:
+                del totals[name]
+    return summary
+
+def _difference(new, old):
+    # new - old for two contributions (missing entries count as 0)
+    delta = {'count': new.get('count', 0) - old.get('count', 0)}
+    for key in ('sum', 'sumsq', 'climb_status'):
+        names = set(new.get(key, {})) | set(old.get(key, {}))
+        delta[key] = {name: new.get(key, {}).get(name, 0) - old.get(key, {}).get(name, 0) for name in names}
+    return delta
+
+def _alliance_key(data):
+    if data.get('match_number') is None or data.get('alliance_color') is None:
+        return None
+    # Match numbers repeat across events; rows without an event share ''
+    return data.get('event_key') or '', data['match_number'], data['alliance_color']
+
+def _alliance_documents(collection, key, transaction):
+    """{doc_id: data} of the stored rows of one alliance (event_key, match_number, alliance_color)."""
+    event_key, match_number, alliance_color = key
+    query = (collection.where(filter=FieldFilter('match_number', '==', match_number))
+             .where(filter=FieldFilter('alliance_color', '==', alliance_color)))
+    if event_key:
+        query = query.where(filter=FieldFilter('event_key', '==', event_key))
+    documents = {doc.id: doc.to_dict() for doc in query.stream(transaction=transaction)}
+    if not event_key:
+        # Firestore cannot match a missing field, so rows without an event are picked out here
+        documents = {doc_id: data for doc_id, data in documents.items() if not data.get('event_key')}
+    return documents
+
+def write_match_documents(db, set_docs=None, delete_ids=(), extra_writes=None, updates=None):
+    """Create, replace, update or delete match documents and update team_summaries in one transaction.
+
+    set_docs maps doc ids to their new data; updates maps doc ids of existing
+    documents to fields to change (only fields whose value differs are written);
+    delete_ids are removed. extra_writes, if given, is called as
+    extra_writes(transaction, before) to add writes to other collections (archive
+    copies, edit history) to the same transaction. before maps every touched doc
+    id to its data before the change (None if it did not exist) and is returned.
+    The cached match collection is patched with the result rather than reloaded.
+    """
+    set_docs = set_docs or {}
+    updates = updates or {}
+    delete_ids = [doc_id for doc_id in delete_ids if doc_id not in set_docs and doc_id not in updates]
+    collection = db.collection(MATCH_SCOUT_COLLECTION)
+    summaries = db.collection(TEAM_SUMMARY_COLLECTION)
+    written = {}
+
+    def apply(transaction):
+        # Reads: the touched documents, their alliances and the affected summaries
+        before = {}
+        for doc_id in list(set_docs) + list(updates) + delete_ids:
+            snapshot = collection.document(doc_id).get(transaction=transaction)
+            before[doc_id] = snapshot.to_dict() if snapshot.exists else None
+        new_docs = dict(set_docs)
+        changed = {}
+        for doc_id, fields in updates.items():
+            if before[doc_id] is None:
+                raise KeyError(f"No match record {doc_id} to update")
+            changed[doc_id] = {field: value for field, value in fields.items() if before[doc_id].get(field) != value}
+            new_docs[doc_id] = dict(before[doc_id], **changed[doc_id])
+
+        old_rows, new_rows = [], []
+        keys = {_alliance_key(data) for data in list(before.values()) + list(new_docs.values()) if data}
+        for key in keys:
+            stored = _alliance_documents(collection, key, transaction) if key else {}
+            old_rows += stored.values()
+            new_rows += [data for doc_id, data in stored.items() if doc_id not in before]
+            new_rows += [data for data in new_docs.values() if _alliance_key(data) == key]
+        # Rows without an alliance only count for themselves
+        old_rows += [data for data in before.values() if data and _alliance_key(data) is None]
+
+        old = summary_contributions(old_rows)
+        new = summary_contributions(new_rows)
+        current = {}
+        for team in set(old) | set(new):
+            snapshot = summaries.document(team).get(transaction=transaction)
+            current[team] = snapshot.to_dict() if snapshot.exists else {'team_number': team}
+
+        # Writes
+        updated_at = datetime.now().isoformat()
+        for team, summary in current.items():
+            if team in old:
+                _merge(summary, old[team], -1)
+            if team in new:
+                _merge(summary, new[team], 1)
+            if summary.get('count', 0) <= 0:
+                transaction.delete(summaries.document(team))
+            else:
+                summary['updated_at'] = updated_at
+                transaction.set(summaries.document(team), summary)
+        for doc_id in delete_ids:
+            transaction.delete(collection.document(doc_id))
+        if delete_ids:
+            _, reference, data = deletion_marker(db, MATCH_SCOUT_COLLECTION)
+            transaction.set(reference, data)
+        for doc_id, data in set_docs.items():
+            transaction.set(collection.document(doc_id), data)
+        for doc_id, fields in changed.items():
+            if fields:
+                transaction.update(collection.document(doc_id), fields)
+        if extra_writes is not None:
+            extra_writes(transaction, before)
+        # Kept for the cache patch below; a retried transaction starts over
+        written.clear()
+        written.update(new_docs)
+        return before
+
+    before = run_transaction(db, apply)
+    patch_collection_cache(MATCH_SCOUT_COLLECTION, upserts=written, deleted_ids=delete_ids)
+    invalidate_collection_cache(TEAM_SUMMARY_COLLECTION)
+    return before
+
+def alliance_key(doc_id, data):
+    """Key of the alliance a match document belongs to; rows without one only count for themselves."""
+    return _alliance_key(data) or ('doc', doc_id)
+
+def alliance_index(documents):
+    """{alliance key: {doc_id: data}} of match documents ({doc_id: data}), for summary_changes()."""
+    index = {}
+    for doc_id, data in documents.items():
+        index.setdefault(alliance_key(doc_id, data), {})[doc_id] = data
+    return index
+
+def summary_changes(index, removed=None, added=None):
+    """Apply removed and added match documents ({doc_id: data}) to an alliance_index.
+
+    Returns the change of the team totals per alliance touched, {alliance key:
+    {team: delta}}; pass the deltas of the alliances written together to
+    summary_increments().
+    """
+    removed, added = removed or {}, added or {}
+    keys = list({alliance_key(doc_id, data) for doc_id, data in list(removed.items()) + list(added.items())})
+
+    def contributions():
+        rows = [(row, key) for key in keys for row in index.get(key, {}).values()]
+        return summary_contributions([row for row, _ in rows], groups=[key for _, key in rows])
+
+    old = contributions()
+    for doc_id, data in removed.items():
+        index.get(alliance_key(doc_id, data), {}).pop(doc_id, None)
+    for doc_id, data in added.items():
+        index.setdefault(alliance_key(doc_id, data), {})[doc_id] = data
+    new = contributions()
+
+    changes = {}
+    for key in keys:
+        old_teams, new_teams = old.get(key, {}), new.get(key, {})
+        changes[key] = {team: _difference(new_teams.get(team, {}), old_teams.get(team, {}))
+                        for team in set(old_teams) | set(new_teams)}
+    return changes
+
+def summary_increments(deltas):
+    """team_summaries writes for a list of summary_changes() deltas, {team: data}.
+
+    The totals are Increment transforms, to be written with set(data, merge=True).
+    Increments commute, so these writes can share batches with the documents they describe.
+    """
+    total = {}
+    for delta in deltas:
+        for team, change in delta.items():
+            total[team] = _merge(total.get(team, {}), change, 1, keep_zero=True)
+
+    updated_at = datetime.now().isoformat()
+    writes = {}
+    for team, change in total.items():
+        write = {'team_number': team, 'updated_at': updated_at}
+        if change.get('count'):
+            write['count'] = Increment(change['count'])
+        for key in ('sum', 'sumsq', 'climb_status'):
+            increments = {name: Increment(value) for name, value in change.get(key, {}).items() if value}
+            if increments:
+                write[key] = increments
+        if len(write) > 2:
+            writes[team] = write
+    return writes
+
+def summaries_outdated(db):
+    """A ('set', reference, data) write marking the team summaries out of date.
+
+    Add it to every batch that changes match documents without updating the summaries.
+    """
+    return ('set', db.collection(SUMMARY_STATE_COLLECTION).document(TEAM_SUMMARY_COLLECTION),
+            {'current': False, 'marker': uuid.uuid4().hex, 'marked_at': datetime.now().isoformat()})
+
+def _summary_state(db):
+    snapshot = db.collection(SUMMARY_STATE_COLLECTION).document(TEAM_SUMMARY_COLLECTION).get()
+    return snapshot.to_dict() if snapshot.exists else {}
+
+def summaries_current(db=None):
+    """Whether every match write since the last rebuild went through the summaries (one document read)."""
+    if db is None:
+        db, _ = get_storage()
+    return _summary_state(db).get('current', True)
+
+def rebuild_team_summaries(db=None):
+    """Recompute every team summary from the match collection; returns the number of teams.
+
+    Used after bulk operations and to backfill summaries for data written before
+    they existed (or by scripts that bypass write_match_documents). The summaries
+    are marked current only if no summaries_outdated() write landed during the rebuild.
+    """
+    if db is None:
+        db, _ = get_storage()
+    # Read before the matches: a later mark means writes the read may have missed
+    marker = _summary_state(db).get('marker')
+    # Read from db itself, which may be another store than the app's (migrate_to_firestore.py)
+    contributions = summary_contributions([doc.to_dict() for doc in db.collection(MATCH_SCOUT_COLLECTION).stream()])
+    summaries = db.collection(TEAM_SUMMARY_COLLECTION)
+    stale = [doc.id for doc in summaries.select([]).stream() if doc.id not in contributions]
+
+    updated_at = datetime.now().isoformat()
+    writes = [(team, dict(summary, team_number=team, updated_at=updated_at)) for team, summary in contributions.items()]
+    writes += [(team, None) for team in stale]
+    for start in range(0, len(writes), BATCH_SIZE):
+        batch = db.batch()
+        for team, summary in writes[start:start + BATCH_SIZE]:
+            if summary is None:
+                batch.delete(summaries.document(team))
+            else:
+                batch.set(summaries.document(team), summary)
+        batch.commit()
+
+    def mark_current(transaction):
+        state = db.collection(SUMMARY_STATE_COLLECTION).document(TEAM_SUMMARY_COLLECTION)
+        snapshot = state.get(transaction=transaction)
+        if (snapshot.to_dict() if snapshot.exists else {}).get('marker') == marker:
+            transaction.set(state, {'current': True, 'marker': marker, 'rebuilt_at': updated_at})
+
+    run_transaction(db, mark_current)
+    invalidate_collection_cache(TEAM_SUMMARY_COLLECTION)
+    return len(contributions)
+
+def team_summary_frame(docs):
+    """Summary documents -> one row per team with matches, avg_/std_/total_ per column and climb rates."""
+    if not docs.empty and 'count' in docs.columns:
+        # Summaries written as increments stay behind at count 0
+        docs = docs[docs['count'].fillna(0) > 0]
+    if docs.empty:
+        return pd.DataFrame()
+    count = docs['count'].astype(float)
+    frame = {'team_number': docs['team_number'].astype(str), 'matches': docs['count'].astype(int)}
+    sums = pd.DataFrame(docs['sum'].tolist(), index=docs.index).fillna(0)
+    sumsq = pd.DataFrame(docs['sumsq'].tolist(), index=docs.index).fillna(0)
+    for col in sums.columns:
+        frame[f'avg_{col}'] = sums[col] / count
+        # Sample standard deviation like pandas' std(); undefined for a single match
+        variance = ((sumsq[col] - sums[col] ** 2 / count) / (count - 1)).where(count > 1)
+        frame[f'std_{col}'] = np.sqrt(variance.clip(lower=0))
+        frame[f'total_{col}'] = sums[col]
+    climbs = pd.DataFrame(docs['climb_status'].tolist(), index=docs.index).fillna(0)
+    for status in climbs.columns:
+        frame[f'climb_{status}'] = climbs[status].astype(int)
+    frame['climb_rate'] = climbs.reindex(columns=['Shallow Climb', 'Deep Climb'], fill_value=0).sum(axis=1) / count
+    return pd.DataFrame(frame).sort_values('team_number').reset_index(drop=True)
+
+def summary_team_stats(summaries):
+    """load_team_summaries() rows in the form of metrics.aggregate_team_stats(): avg_ and total_ columns."""
+    columns = ([f'avg_{col}' for col in TEAM_STAT_MEAN_COLUMNS] +
+               [f'{stat}_{col}' for col in TEAM_STAT_MEAN_SUM_COLUMNS for stat in ('avg', 'total')])
+    team_stats = summaries.reindex(columns=['team_number'] + columns).fillna({col: 0 for col in columns})
+    return add_object_totals(team_stats.reset_index(drop=True))
+
+def load_team_summaries(force_refresh=False):
+    """Per-team averages and standard deviations from team_summaries (see team_summary_frame)."""
+    try:
+        return load_derived(TEAM_SUMMARY_COLLECTION, 'frame', team_summary_frame, force_refresh=force_refresh)
+    except Exception as e:
+        st.error(f"Error loading team summaries: {str(e)}")
+        return None
@@ -1,41 +1,277 @@
+import re
+import threading
+import time
 import requests
 import pandas as pd
 import streamlit as st
 import os
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from utils.tba_cache import TBACache
+from utils.team_index import TeamIndex, fetch_team_pages
+
+TBA_BASE_URL = "https://www.thebluealliance.com/api/v3"
+TBA_TIMEOUT = 10  # seconds
 
 def get_tba_api_key():
-    # Try Replit environment variables first (this is where Replit Secrets go)
+    """The TBA API key from .streamlit/secrets.toml ([TBA] TBA_API_KEY), else the TBA_API_KEY environment variable."""
+    api_key = None
     try:
-        import os
-        env_key = st.secrets["TBA"]["TBA_API_KEY"]
-        if env_key and len(env_key.strip()) > 0:
-            api_key = env_key
-            print("Found API key in environment variables")
+        api_key = st.secrets["TBA"]["TBA_API_KEY"]
     except Exception as e:
-        print(f"Error accessing environment variables: {str(e)}")
-    
-    # For debugging purposes, show where the key is coming from
-    print(f"Using API key: {api_key[:5]}...{api_key[-5:]}")
-        
+        print(f"Error accessing Streamlit secrets: {str(e)}")
+    if not api_key or not api_key.strip():
+        api_key = os.environ.get("TBA_API_KEY")
     return api_key
 
-def make_tba_request(endpoint):
-    """Make a request to The Blue Alliance API"""
-    api_key = get_tba_api_key()
+def endpoint_name(path):
+    """'/team/frc254/events/2025' -> '/team/{}/events/{}': the statistics are kept per endpoint, not per URL."""
+    return '/'.join('{}' if any(c.isdigit() for c in part) else part for part in path.split('/'))
+
+def _max_age(cache_control):
+    match = re.search(r'max-age=(\d+)', cache_control or '')
+    return int(match.group(1)) if match else 0
+
+class TBAClient:
+    """Client of The Blue Alliance API, shared by every page and session (see get_tba_client).
+
+    - One requests.Session, so connections are pooled and kept alive.
+    - Responses are kept in a utils.tba_cache.TBACache with their ETag and Last-Modified,
+      and served without a request for the max-age of their Cache-Control. Stale ones are
+      returned at once and revalidated in the background with If-None-Match/If-Modified-Since;
+      a 304 reuses the kept body.
+    - When TBA cannot be reached, kept responses are served however old they are.
+    - stats() has request counts, cache hits and latency per endpoint.
+    """
+
+    OUTCOMES = ('fresh', 'stale', 'not_modified', 'downloaded', 'offline', 'errors')
+
+    def __init__(self, api_key, base_url=TBA_BASE_URL, timeout=TBA_TIMEOUT, pool_size=10, cache=None, background=True):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update({"X-TBA-Auth-Key": api_key or "", "User-Agent": "ScoutingApp/1.0"})
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.cache = cache if cache is not None else TBACache(":memory:")
+        self.background = background
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="tba-revalidate")
+        self._lock = threading.Lock()
+        self._responses = {}  # Decoded entries of self.cache, so repeat reads skip SQLite and JSON
+        self._revalidating = set()
+        self._stats = {}  # endpoint -> counts per outcome and total seconds on the network
+
+    def cached(self, path):
+        """The kept response of path ({'data', 'etag', 'last_modified', 'fetched_at', 'expires'}) or None, without a request."""
+        with self._lock:
+            kept = self._responses.get(path)
+        if kept is None:
+            kept = self.cache.get(path)
+            if kept is not None:
+                with self._lock:
+                    kept = self._responses.setdefault(path, kept)
+        return kept
+
+    def get(self, path, revalidate=False):
+        """The JSON body of GET path (e.g. '/team/frc254').
+
+        A fresh kept response is returned as is. A stale one is returned as is and
+        revalidated in the background; with revalidate (or background=False) it is
+        revalidated first. If TBA cannot be reached the kept response is returned.
+        Raises requests.RequestException (HTTPError for error statuses).
+        """
+        kept = self.cached(path)
+        if kept is not None and not revalidate:
+            if time.time() < kept['expires']:
+                self._count(path, 'fresh', 0.0)
+                return kept['data']
+            if self.background:
+                self._count(path, 'stale', 0.0)
+                self.revalidate_later(path)
+                return kept['data']
 
+        start = time.perf_counter()
+        try:
+            return self._fetch(path, kept)['data']
+        except requests.RequestException as e:
+            # Error statuses below 500 are TBA's answer; anything else is an outage
+            status = e.response.status_code if e.response is not None else None
+            if kept is None or (status is not None and status < 500):
+                self._count(path, 'errors', time.perf_counter() - start)
+                raise
+            print(f"TBA unreachable, serving the response of {path} kept at {time.ctime(kept['fetched_at'])}: {e}")
+            self._count(path, 'offline', time.perf_counter() - start)
+            return kept['data']
+
+    def revalidate_later(self, path):
+        """Revalidate path in the background (once at a time per path)."""
+        with self._lock:
+            if path in self._revalidating:
+                return
+            self._revalidating.add(path)
+
+        def revalidate():
+            start = time.perf_counter()
+            try:
+                self._fetch(path, self.cached(path))
+            except Exception as e:
+                self._count(path, 'errors', time.perf_counter() - start)
+                print(f"Background revalidation of TBA {path} failed: {e}")
+            finally:
+                with self._lock:
+                    self._revalidating.discard(path)
+
+        self._executor.submit(revalidate)
+
+    def _fetch(self, path, kept):
+        # Conditional GET; keeps and returns the new entry
+        headers = {}
+        if kept is not None:
+            if kept['etag']:
+                headers["If-None-Match"] = kept['etag']
+            if kept['last_modified']:
+                headers["If-Modified-Since"] = kept['last_modified']
+        start = time.perf_counter()
+        response = self.session.get(f"{self.base_url}{path}", headers=headers, timeout=self.timeout)
+        not_modified = response.status_code == 304 and kept is not None
+        if not not_modified:
+            response.raise_for_status()
+        now = time.time()
+        entry = {
+            'data': kept['data'] if not_modified else response.json(),
+            'etag': response.headers.get("ETag") or (kept['etag'] if not_modified else None),
+            'last_modified': response.headers.get("Last-Modified") or (kept['last_modified'] if not_modified else None),
+            'fetched_at': now,
+            'expires': now + _max_age(response.headers.get("Cache-Control"))
+        }
+        if not_modified:
+            self.cache.touch(path, entry)
+        else:
+            self.cache.put(path, entry)
+        with self._lock:
+            self._responses[path] = entry
+        self._count(path, 'not_modified' if not_modified else 'downloaded', time.perf_counter() - start)
+        return entry
+
+    def _count(self, path, outcome, seconds):
+        with self._lock:
+            counts = self._stats.setdefault(endpoint_name(path), dict.fromkeys(self.OUTCOMES + ('seconds',), 0))
+            counts[outcome] += 1
+            counts['seconds'] += seconds
+
+    def stats(self):
+        """One row per endpoint: calls (background revalidations included), how they were answered,
+        cache hit rate and mean network latency."""
+        with self._lock:
+            rows = [dict(counts, endpoint=endpoint) for endpoint, counts in self._stats.items()]
+        stats = pd.DataFrame(rows, columns=['endpoint', *self.OUTCOMES, 'seconds'])
+        stats.insert(1, 'calls', stats[list(self.OUTCOMES)].sum(axis=1))
+        network = stats['not_modified'] + stats['downloaded'] + stats['offline'] + stats['errors']
+        stats['hit_rate'] = (stats['fresh'] + stats['stale'] + stats['not_modified'] + stats['offline']) / stats['calls']
+        stats['mean_ms'] = (stats['seconds'] / network.where(network > 0) * 1000).round(1)
+        return stats.drop(columns='seconds').sort_values('calls', ascending=False, ignore_index=True)
+
+    def close(self):
+        """Wait for background revalidations and close the connections."""
+        self._executor.shutdown(wait=True)
+        self.session.close()
+
+@st.cache_resource
+def _tba_cache():
+    cache = TBACache()
+    cache.seed()
+    return cache
+
+@st.cache_resource
+def _tba_client(api_key):
+    return TBAClient(api_key, cache=_tba_cache())
+
+def get_tba_client():
+    """The TBA client of this process, or None (with an error shown) when there is no API key."""
+    api_key = get_tba_api_key()
     if not api_key:
-        st.error("TBA API key not found. Please add it to your Replit Secrets with key 'TBA_API_KEY'.")
+        st.error("TBA API key not found. Please add it to .streamlit/secrets.toml under [TBA] as 'TBA_API_KEY'.")
         return None
+    return _tba_client(api_key)
 
-    base_url = "https://www.thebluealliance.com/api/v3"
-    headers = {
-        "X-TBA-Auth-Key": api_key
-    }
+TBA_PREFETCH_RATE = 20  # requests per second, so a prefetch stays well inside TBA's rate limits
+
+class RateLimiter:
+    """Spaces wait() returns at least 1/rate seconds apart, across threads."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+def prefetch_teams(client, team_numbers, workers=8, rate=TBA_PREFETCH_RATE):
+    """Fetch /team/frc{n} of every team into the TBA cache, workers at a time and at most rate requests per second.
+
+    Teams whose record is kept and still fresh are skipped. Returns {team_number: error} for the teams that failed.
+    """
+    limiter = RateLimiter(rate)
+
+    def fetch(team_number):
+        path = f"/team/frc{team_number}"
+        kept = client.cached(path)
+        if kept is not None and time.time() < kept['expires']:
+            return None
+        limiter.wait()
+        try:
+            client.get(path, revalidate=True)
+        except Exception as e:
+            return str(e)
+        return None
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        errors = dict(zip(team_numbers, executor.map(fetch, team_numbers)))
+    return {team_number: error for team_number, error in errors.items() if error}
+
+def event_team_numbers(client, event_key):
+    """Numbers of the teams at an event."""
+    return sorted(int(team_key[3:]) for team_key in client.get(f"/event/{event_key}/teams/keys"))
+
+# Prefetches run one after another, away from the script threads
+_PREFETCH_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tba-prefetch")
+
+@st.cache_resource(ttl=600)
+def _team_prefetch(_client, team_numbers):
+    # One prefetch per set of teams every 10 minutes, shared by all sessions
+    return _PREFETCH_EXECUTOR.submit(prefetch_teams, _client, team_numbers)
+
+def start_team_prefetch(team_numbers, event_key=None):
+    """Prefetch the TBA records of team_numbers (and of the teams at event_key) in the background.
+
+    Returns the Future of prefetch_teams, or None without a TBA client.
+    """
+    client = get_tba_client()
+    if client is None:
+        return None
+    teams = {int(team_number) for team_number in team_numbers}
+    if event_key:
+        try:
+            teams.update(event_team_numbers(client, event_key))
+        except Exception as e:
+            print(f"Could not list the teams of {event_key} for prefetching: {e}")
+    return _team_prefetch(client, tuple(sorted(teams)))
+
+def make_tba_request(endpoint):
+    """Make a request to The Blue Alliance API"""
+    client = get_tba_client()
+    if client is None:
+        return None
 
     try:
-        response = requests.get(f"{base_url}{endpoint}", headers=headers)
-        response.raise_for_status()
-        return response.json()
+        return client.get(endpoint)
     except Exception as e:
         st.error(f"Error fetching data from TBA: {str(e)}")
         return None
@@ -60,25 +296,27 @@ def get_event_matches(event_key):
     """Get matches for a specific event"""
     return make_tba_request(f"/event/{event_key}/matches")
 
-def search_teams(query):
-    """Search for teams matching a query"""
-    # Unfortunately, TBA doesn't have a direct search endpoint
-    # We'll use a limited approach by fetching teams by page
-    teams = []
-    page = 0
-    while True:
-        page_teams = make_tba_request(f"/teams/{page}")
-        if not page_teams or len(page_teams) == 0:
-            break
-        teams.extend(page_teams)
-        page += 1
-
-    # Filter teams based on query
-    filtered_teams = []
-    for team in teams:
-        if (query.lower() in str(team.get('team_number', '')).lower() or 
-            query.lower() in team.get('nickname', '').lower() or
-            query.lower() in team.get('name', '').lower()):
-            filtered_teams.append(team)
-
-    return filtered_teams
\ No newline at end of file
+@st.cache_resource(ttl=3600, show_spinner="Loading the TBA team directory...")
+def _team_index(_client):
+    # Rebuilt hourly; the pages come from the TBA cache and are revalidated with conditional requests
+    return TeamIndex(fetch_team_pages(_client))
+
+@st.cache_resource(ttl=600)
+def _event_team_index(_client, event_key):
+    # The endpoint of get_event_teams, so both share the cached response
+    return TeamIndex(_client.get(f"/event/{event_key}/teams"))
+
+def search_teams(query, event_key=None, limit=None):
+    """Teams whose number, nickname or name contains query (see utils.team_index.TeamIndex).
+
+    With event_key, only the teams at that event are searched.
+    """
+    client = get_tba_client()
+    if client is None:
+        return []
+    try:
+        index = _event_team_index(client, event_key) if event_key else _team_index(client)
+    except Exception as e:
+        st.error(f"Error fetching teams from TBA: {str(e)}")
+        return []
+    return index.search(query, limit)
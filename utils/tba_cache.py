@@ -0,0 +1,98 @@
+"""Persistent cache of TBA API responses, keyed by endpoint path.
+
+Every response the TBA client receives is kept in a local SQLite file with its
+ETag, Last-Modified, fetch time and expiry (from Cache-Control max-age); bodies are
+stored as zlib-compressed JSON. The client serves from it first and revalidates
+in the background, and answers from it when the venue network is down, so pages
+work offline with whatever was last fetched.
+
+The file is TBA_CACHE_PATH (environment variable) or .cache/tba_cache.db. On
+first use it is seeded from match_schedule_cache.json ({event_key: matches}).
+"""
+import json
+import os
+import sqlite3
+import threading
+import zlib
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TBA_CACHE_PATH = os.environ.get("TBA_CACHE_PATH", os.path.join(ROOT_DIR, ".cache", "tba_cache.db"))
+SEED_FILE = os.path.join(ROOT_DIR, "match_schedule_cache.json")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    path TEXT PRIMARY KEY,
+    body BLOB NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    fetched_at REAL NOT NULL,
+    expires REAL NOT NULL
+);
+"""
+
+class TBACache:
+    """SQLite store of TBA responses: {'data', 'etag', 'last_modified', 'fetched_at', 'expires'} per path."""
+
+    def __init__(self, path=TBA_CACHE_PATH):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def get(self, path):
+        """The kept response of path, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, etag, last_modified, fetched_at, expires FROM responses WHERE path = ?", (path,)
+            ).fetchone()
+        if row is None:
+            return None
+        body, etag, last_modified, fetched_at, expires = row
+        return {'data': json.loads(zlib.decompress(body)), 'etag': etag, 'last_modified': last_modified,
+                'fetched_at': fetched_at, 'expires': expires}
+
+    def put(self, path, entry, replace=True):
+        """Keep entry (see get) for path; with replace=False an existing entry wins."""
+        body = zlib.compress(json.dumps(entry['data'], separators=(',', ':')).encode())
+        verb = "INSERT OR REPLACE" if replace else "INSERT OR IGNORE"
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"{verb} INTO responses (path, body, etag, last_modified, fetched_at, expires) VALUES (?, ?, ?, ?, ?, ?)",
+                (path, body, entry.get('etag'), entry.get('last_modified'), entry['fetched_at'], entry['expires'])
+            )
+
+    def touch(self, path, entry):
+        """Record a 304: the kept body was current at entry['fetched_at'] and stays fresh until entry['expires']."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE responses SET etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified), "
+                "fetched_at = ?, expires = ? WHERE path = ?",
+                (entry.get('etag'), entry.get('last_modified'), entry['fetched_at'], entry['expires'], path)
+            )
+
+    def paths(self):
+        """{path: fetched_at} of everything kept."""
+        with self._lock:
+            return dict(self._conn.execute("SELECT path, fetched_at FROM responses").fetchall())
+
+    def seed(self, seed_file=SEED_FILE):
+        """Add the schedules of seed_file as stale /event/{key}/matches entries (kept ones win).
+
+        Seeded entries have no ETag, so the first revalidation downloads them again.
+        Returns the number of schedules read.
+        """
+        try:
+            with open(seed_file) as f:
+                schedules = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"TBA cache not seeded from {seed_file}: {e}")
+            return 0
+        fetched_at = os.path.getmtime(seed_file)
+        for event_key, matches in schedules.items():
+            self.put(f"/event/{event_key}/matches", {'data': matches, 'fetched_at': fetched_at, 'expires': 0},
+                     replace=False)
+        return len(schedules)
@@ -0,0 +1,74 @@
+"""Local, searchable directory of FRC teams from The Blue Alliance.
+
+The directory is every /teams/{page}/simple page, fetched concurrently through the
+shared TBA client, so the pages are kept in the TBA cache and refreshed with
+conditional requests (304s when nothing changed). TeamIndex answers searches over
+team number, nickname and name from a trigram index instead of scanning every team.
+"""
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+TEAM_FIELDS = ['team_number', 'nickname', 'name', 'city', 'state_prov', 'country', 'key']
+
+def fetch_team_pages(client, workers=8):
+    """All teams of /teams/{page}/simple (500 per page), fetched workers pages at a time.
+
+    TBA does not say how many pages there are: pages are requested in rounds of
+    workers until one comes back empty.
+    """
+    teams = []
+    first = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while True:
+            pages = list(executor.map(lambda page: client.get(f"/teams/{page}/simple"), range(first, first + workers)))
+            for page in pages:
+                if not page:
+                    return teams
+                teams.extend(page)
+            first += workers
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+class TeamIndex:
+    """Case-insensitive substring search over team number, nickname and name.
+
+    Matches are the same as a scan of every team, but queries of three or more
+    characters only check the teams that have all of the query's trigrams
+    (unless even the rarest of them is in a quarter of the teams).
+    """
+
+    def __init__(self, teams):
+        self.teams = sorted((team for team in teams if team.get('team_number') is not None),
+                            key=lambda team: team['team_number'])
+        self._numbers = [str(team['team_number']) for team in self.teams]
+        # The searchable text of each team; the separator keeps matches inside one field
+        self._texts = ["\x00".join(str(team.get(field) or '') for field in ('team_number', 'nickname', 'name')).lower()
+                       for team in self.teams]
+        postings = defaultdict(list)
+        for position, text in enumerate(self._texts):
+            for trigram in _trigrams(text):
+                postings[trigram].append(position)
+        self._postings = dict(postings)
+
+    def __len__(self):
+        return len(self.teams)
+
+    def search(self, query, limit=None):
+        """Teams matching query: the team with that number first, then number prefixes, then by team number."""
+        query = str(query).strip().lower()
+        if not query:
+            return []
+        positions = range(len(self.teams))
+        if len(query) >= 3:
+            postings = sorted((self._postings.get(trigram, []) for trigram in _trigrams(query)), key=len)
+            # A query whose rarest trigram is in most teams is checked faster team by team
+            if len(postings[0]) < len(self.teams) // 4:
+                positions = sorted(set(postings[0]).intersection(*postings[1:]))
+        found = [position for position in positions if query in self._texts[position]]
+        if query.isdigit():
+            exact = [position for position in found if self._numbers[position] == query]
+            prefix = [position for position in found if self._numbers[position].startswith(query) and self._numbers[position] != query]
+            others = [position for position in found if not self._numbers[position].startswith(query)]
+            found = exact + prefix + others
+        return [self.teams[position] for position in found[:limit]]
@@ -1,6 +1,8 @@
 import os
+import re
 import sys
 import pandas as pd
+import numpy as np
 from datetime import datetime, timedelta
 import streamlit as st
 from google.cloud import firestore
@@ -11,6 +13,11 @@ import firebase_admin
 from firebase_admin import credentials, firestore, storage
 import hashlib
 import uuid
+import threading
+import time
+from utils.snapshots import read_snapshot, write_snapshot
+from utils.storage import SQLiteStorage, storage_settings, DESCENDING
+from utils.schema import apply_schema, MATCH_SCHEMA, PIT_SCHEMA, MATCH_PROFILES, PIT_PROFILES
 
 # Define page-to-file mapping and authority-based access
 PAGE_CONFIG = {
@@ -108,9 +115,79 @@ def setup_sidebar_navigation():
 # Global variables for Firestore collections
 MATCH_SCOUT_COLLECTION = "match_scout_data"
 PIT_SCOUT_COLLECTION = "pit_scout_data"
+ARCHIVED_MATCH_SCOUT_COLLECTION = "archived_match_scout_data"
+ARCHIVED_PIT_SCOUT_COLLECTION = "archived_pit_scout_data"
 SESSION_COLLECTION = "sessions"
 
-def get_firebase_instances():
+@st.cache_resource
+def _init_firebase():
+    """Initialize the Firebase app once per process and return (db, bucket).
+
+    The clients are shared by every session so that background listeners keep
+    working when a new session starts.
+    """
+    # Remove any existing Firebase apps to start fresh
+    if firebase_admin._apps:
+        firebase_admin.delete_app(firebase_admin.get_app())
+
+    # Determine the bucket name dynamically
+    if "firebase" in st.secrets:
+        # Running on Streamlit Cloud
+        firebase_config = st.secrets["firebase"]
+        cred = credentials.Certificate({
+            "type": firebase_config["type"],
+            "project_id": firebase_config["project_id"],
+            "private_key_id": firebase_config["private_key_id"],
+            "private_key": firebase_config["private_key"].replace("\\n", "\n"),
+            "client_email": firebase_config["client_email"],
+            "client_id": firebase_config["client_id"],
+            "auth_uri": firebase_config["auth_uri"],
+            "token_uri": firebase_config["token_uri"],
+            "auth_provider_x509_cert_url": firebase_config["auth_provider_x509_cert_url"],
+            "client_x509_cert_url": firebase_config["client_x509_cert_url"],
+            "universe_domain": "googleapis.com"
+        })
+        # Use the project_id to construct the default bucket name
+        project_id = firebase_config["project_id"]
+        default_bucket = f"{project_id}.firebasestorage.app"  # Correct bucket name
+        app_options = {
+            "storageBucket": firebase_config.get("storageBucket", default_bucket)
+        }
+    else:
+        # Running locally
+        cred = credentials.Certificate("firestore-key.json")
+        project_id = "scouting4270"  # Your confirmed project ID
+        default_bucket = f"{project_id}.firebasestorage.app"  # Correct bucket name
+        app_options = {
+            "storageBucket": default_bucket
+        }
+
+    # Initialize the Firebase app
+    app = firebase_admin.initialize_app(cred, app_options)
+
+    # Initialize Firestore and Storage
+    db = firestore.client(app=app)
+    bucket = storage.bucket(app_options["storageBucket"], app=app)
+
+    # Verify bucket access
+    try:
+        bucket.list_blobs(max_results=1)
+    except Exception as e:
+        raise Exception(f"Failed to access the bucket during initialization: {str(e)}")
+    return db, bucket
+
+@st.cache_resource
+def _init_sqlite_storage(path):
+    """Open the local SQLite store once per process (offline venue mode)."""
+    return SQLiteStorage(path)
+
+def get_storage():
+    """Return (db, bucket) for the configured storage backend.
+
+    db implements the storage interface of utils.storage: the Firestore client,
+    or SQLiteStorage when the backend is 'sqlite'. bucket is the Firebase Storage
+    bucket, or None offline (photo uploads need Firebase).
+    """
     # Initialize session state keys if they don't exist
     if "firebase_initialized" not in st.session_state:
         st.session_state.firebase_initialized = False
@@ -119,76 +196,30 @@ def get_firebase_instances():
     if "firebase_bucket" not in st.session_state:
         st.session_state.firebase_bucket = None
 
+    backend, sqlite_path = storage_settings()
+
     # Only initialize if not already initialized
     if not st.session_state.firebase_initialized:
         try:
-            # Remove any existing Firebase apps to start fresh
-            if firebase_admin._apps:
-                firebase_admin.delete_app(firebase_admin.get_app())
-                st.session_state.firebase_initialized = False
-                st.session_state.firebase_db = None
-                st.session_state.firebase_bucket = None
-
-            # Determine the bucket name dynamically
-            if "firebase" in st.secrets:
-                # Running on Streamlit Cloud
-                firebase_config = st.secrets["firebase"]
-                cred = credentials.Certificate({
-                    "type": firebase_config["type"],
-                    "project_id": firebase_config["project_id"],
-                    "private_key_id": firebase_config["private_key_id"],
-                    "private_key": firebase_config["private_key"].replace("\\n", "\n"),
-                    "client_email": firebase_config["client_email"],
-                    "client_id": firebase_config["client_id"],
-                    "auth_uri": firebase_config["auth_uri"],
-                    "token_uri": firebase_config["token_uri"],
-                    "auth_provider_x509_cert_url": firebase_config["auth_provider_x509_cert_url"],
-                    "client_x509_cert_url": firebase_config["client_x509_cert_url"],
-                    "universe_domain": "googleapis.com"
-                })
-                # Use the project_id to construct the default bucket name
-                project_id = firebase_config["project_id"]
-                default_bucket = f"{project_id}.firebasestorage.app"  # Correct bucket name
-                app_options = {
-                    "storageBucket": firebase_config.get("storageBucket", default_bucket)
-                }
+            if backend == "sqlite":
+                db, bucket = _init_sqlite_storage(sqlite_path), None
             else:
-                # Running locally
-                cred = credentials.Certificate("firestore-key.json")
-                project_id = "scouting4270"  # Your confirmed project ID
-                default_bucket = f"{project_id}.firebasestorage.app"  # Correct bucket name
-                app_options = {
-                    "storageBucket": default_bucket
-                }
-            
-            # Initialize the Firebase app
-            app = firebase_admin.initialize_app(cred, app_options)
-            
-            # Initialize Firestore and Storage
-            db = firestore.client(app=app)
-            bucket = storage.bucket(app_options["storageBucket"], app=app)
-            
-            # Verify bucket access
-            try:
-                bucket.list_blobs(max_results=1)
-            except Exception as e:
-                st.error(f"Failed to access the bucket during initialization: {str(e)}")
-                raise Exception(f"Failed to access the bucket during initialization: {str(e)}")
-            
+                db, bucket = _init_firebase()
+
             # Store in session state
             st.session_state.firebase_db = db
             st.session_state.firebase_bucket = bucket
             st.session_state.firebase_initialized = True
         except Exception as e:
-            st.error(f"Failed to initialize Firebase: {str(e)}")
-            raise Exception(f"Failed to initialize Firebase: {str(e)}")
+            st.error(f"Failed to initialize {backend} storage: {str(e)}")
+            raise Exception(f"Failed to initialize {backend} storage: {str(e)}")
 
-    # Verify that the Firestore client is valid
+    # Verify that the storage client is valid
     if st.session_state.firebase_db is None or not hasattr(st.session_state.firebase_db, 'collection'):
-        st.error("Firestore client is not properly initialized.")
-        raise Exception("Firestore client is not properly initialized.")
+        st.error("Storage client is not properly initialized.")
+        raise Exception("Storage client is not properly initialized.")
     
-    if st.session_state.firebase_bucket is None:
+    if st.session_state.firebase_bucket is None and backend != "sqlite":
         st.error("Firebase Storage bucket is not initialized.")
         raise Exception("Firebase Storage bucket is not initialized.")
     
@@ -197,7 +228,7 @@ def get_firebase_instances():
 def create_session(user_id, authority):
     """Create a new session in Firestore and return the session token."""
     try:
-        db, _ = get_firebase_instances()
+        db, _ = get_storage()
         session_token = str(uuid.uuid4())
         session_data = {
             "user_id": user_id,
@@ -213,7 +244,7 @@ def create_session(user_id, authority):
 def validate_session(session_token):
     """Validate the session token and return user data if valid, else None."""
     try:
-        db, _ = get_firebase_instances()
+        db, _ = get_storage()
         doc = db.collection(SESSION_COLLECTION).document(session_token).get()
         if doc.exists:
             data = doc.to_dict()
@@ -234,14 +265,17 @@ def validate_session(session_token):
 def delete_session(session_token):
     """Delete a session from Firestore."""
     try:
-        db, _ = get_firebase_instances()
+        db, _ = get_storage()
         db.collection(SESSION_COLLECTION).document(session_token).delete()
     except Exception as e:
         st.error(f"Failed to delete session: {str(e)}")
 
 def upload_photo_to_storage(file, team_number, match_number=None):
     try:
-        db, bucket = get_firebase_instances()  # Ensure Firebase is initialized
+        db, bucket = get_storage()  # Ensure storage is initialized
+        if bucket is None:
+            st.warning("Photo uploads need Firebase Storage and are not available with local storage.")
+            return None
         timestamp = datetime.now().strftime("%Y%m%dT%H%M%S")
         team_number = str(team_number)
         if match_number is not None:
@@ -259,9 +293,87 @@ def upload_photo_to_storage(file, team_number, match_number=None):
         st.error(f"Error uploading photo to Firebase Storage: {str(e)}")
         return None
 
+def current_event_key():
+    """TBA key of the event being scouted (e.g. '2025hiho'), from SCOUTING_EVENT_KEY or [event] key in secrets.
+
+    Empty if not configured; documents then use the 'noevent' prefix.
+    """
+    try:
+        config = dict(st.secrets.get("event", {}))
+    except Exception:
+        config = {}
+    return os.environ.get("SCOUTING_EVENT_KEY", config.get("key", "")).strip().lower()
+
+def _id_part(value):
+    # Lowercase letters, digits and dashes only, so ids are valid and stable across spellings;
+    # missing values (None, or NaN from a DataFrame row) are empty
+    if value is None or value != value:
+        return ''
+    return re.sub(r'[^a-z0-9]+', '-', str(value).strip().lower()).strip('-')
+
+def match_doc_id(event_key, match_number, team_number, scouter_name=None):
+    """Document id of a match entry: '<event>_qm<match>_frc<team>', plus '_<scouter>' if given.
+
+    The same robot in the same match always maps to the same document, so a
+    resubmission replaces the entry instead of adding a duplicate.
+    """
+    doc_id = f"{_id_part(event_key) or 'noevent'}_qm{int(float(match_number))}_frc{int(float(team_number))}"
+    if scouter_name:
+        doc_id += f"_{_id_part(scouter_name)}"
+    return doc_id
+
+def pit_doc_id(event_key, team_number):
+    """Document id of a team's pit entry at an event: '<event>_pit_frc<team>'."""
+    return f"{_id_part(event_key) or 'noevent'}_pit_frc{int(float(team_number))}"
+
+def _same_scouter(data, scouter_name):
+    return _id_part(data.get('scouter_name') or '') == _id_part(scouter_name or '')
+
+def assign_match_doc_ids(db, rows, replacing=()):
+    """Document ids for match rows (dicts with event_key, match_number, team_number, scouter_name).
+
+    A row gets the plain '<event>_qm<match>_frc<team>' id unless that entry holds
+    another scouter's data (stored, or earlier in rows); the second scouter of a
+    robot gets the id with their name appended. The plain ids are read with one
+    get_all; entries in replacing (being rewritten by the caller) count as free.
+    """
+    primaries = [match_doc_id(row.get('event_key'), row['match_number'], row['team_number']) for row in rows]
+    collection = db.collection(MATCH_SCOUT_COLLECTION)
+    references = [collection.document(doc_id) for doc_id in set(primaries) if doc_id not in replacing]
+    owners = {snapshot.id: snapshot.to_dict() for snapshot in db.get_all(references) if snapshot.exists}
+    doc_ids = []
+    for row, primary in zip(rows, primaries):
+        owner = owners.setdefault(primary, row)
+        if _same_scouter(owner, row.get('scouter_name')):
+            doc_ids.append(primary)
+        else:
+            doc_ids.append(match_doc_id(row.get('event_key'), row['match_number'], row['team_number'], row.get('scouter_name')))
+    return doc_ids
+
+def get_match_entry(event_key, match_number, team_number, scouter_name=None):
+    """The stored match entry (data with 'doc_id') of a team in a match, or None; one or two point reads.
+
+    Without scouter_name the entry at the plain id is returned; with it, that
+    scouter's entry (at the plain id or their own).
+    """
+    try:
+        db, _ = get_storage()
+        collection = db.collection(MATCH_SCOUT_COLLECTION)
+        doc = collection.document(match_doc_id(event_key, match_number, team_number)).get()
+        if doc.exists and (scouter_name is None or _same_scouter(doc.to_dict(), scouter_name)):
+            return dict(doc.to_dict(), doc_id=doc.id)
+        if scouter_name is not None:
+            doc = collection.document(match_doc_id(event_key, match_number, team_number, scouter_name)).get()
+            if doc.exists:
+                return dict(doc.to_dict(), doc_id=doc.id)
+        return None
+    except Exception as e:
+        st.error(f"Error looking up match entry: {str(e)}")
+        return None
+
 def save_data(collection_name, data):
     try:
-        db, _ = get_firebase_instances()  # Ensure Firebase is initialized
+        db, _ = get_storage()  # Ensure storage is initialized
         
         if not isinstance(data, dict):
             st.error(f"Expected data to be a dictionary, got {type(data)}")
@@ -295,8 +407,8 @@ def save_data(collection_name, data):
             if collection_name != PIT_SCOUT_COLLECTION:
                 st.warning(f"Expected collection '{PIT_SCOUT_COLLECTION}' for pit data, but got '{collection_name}'. Using '{PIT_SCOUT_COLLECTION}'.")
             collection_name = PIT_SCOUT_COLLECTION
-            timestamp = datetime.now().strftime("%Y%m%dT%H%M%S")
-            doc_id = f"team{team_number}_pit_{timestamp}"
+            cleaned_data.setdefault('event_key', current_event_key())
+            doc_id = pit_doc_id(cleaned_data['event_key'], team_number)
         else:
             if collection_name != MATCH_SCOUT_COLLECTION:
                 st.warning(f"Expected collection '{MATCH_SCOUT_COLLECTION}' for match data, but got '{collection_name}'. Using '{MATCH_SCOUT_COLLECTION}'.")
@@ -308,76 +420,732 @@ def save_data(collection_name, data):
             if not match_number:
                 st.error("Match number is empty.")
                 return False, None
-            timestamp = datetime.now().strftime("%Y%m%dT%H%M%S")
-            doc_id = f"team{team_number}_match{match_number}_{timestamp}"
+            cleaned_data.setdefault('event_key', current_event_key())
+            doc_id = assign_match_doc_ids(db, [cleaned_data])[0]
+
+        # Imported here: utils.summaries and utils.validation build on this module
+        from utils.validation import MATCH_RULES, PIT_RULES, check_records, error_flag_writes, apply_writes
+        # Checked on write: records with errors (and the records they duplicate) are listed in the validation_errors index
+        rules = MATCH_RULES if collection_name == MATCH_SCOUT_COLLECTION else PIT_RULES
+        flagged, checked = check_records(db, collection_name, {doc_id: cleaned_data}, rules)
+        flag_writes = error_flag_writes(db, collection_name, checked, flagged)
 
         # Create the document reference and save the data
-        doc_ref = db.collection(collection_name).document(doc_id)
-        doc_ref.set(cleaned_data)
+        if collection_name == MATCH_SCOUT_COLLECTION:
+            from utils.summaries import write_match_documents
+            write_match_documents(db, {doc_id: cleaned_data},  # Also patches the cached collection
+                                  extra_writes=lambda transaction, before: apply_writes(transaction, flag_writes))
+        else:
+            # Merged, so a resubmission without a new photo keeps the stored robot_photo_url
+            doc_ref = db.collection(collection_name).document(doc_id)
+            batch = db.batch()
+            batch.set(doc_ref, cleaned_data, merge=True)
+            apply_writes(batch, flag_writes)
+            batch.commit()
+            invalidate_collection_cache(collection_name)
         return True, doc_id
     except Exception as e:
         st.error(f"Error saving data to Firestore: {str(e)}")
         return False, str(e)
 
-def load_data():
-    try:
-        db, _ = get_firebase_instances()  # Ensure Firebase is initialized
-        docs = db.collection(MATCH_SCOUT_COLLECTION).stream()
-        data = []
-        for doc in docs:
-            doc_dict = doc.to_dict()
-            doc_dict['doc_id'] = doc.id
-            data.append(doc_dict)
-        if not data:
+# Process-wide cache of Firestore collections, shared by every Streamlit session.
+# Each entry holds the raw documents as a DataFrame plus a version counter that is
+# bumped whenever the cached copy changes. Every entry has its own locks, so one
+# collection never waits for another: "lock" is held only to read or swap the entry's
+# fields, never during Firestore reads; "load_lock" lets one thread at a time read
+# Firestore for the entry and "build_lock" one thread at a time build its derived frames.
+# Minimum number of seconds between two incremental syncs of the same collection
+SYNC_INTERVAL = 10
+# Collections kept up to date by a background on_snapshot listener
+LIVE_COLLECTIONS = (MATCH_SCOUT_COLLECTION, PIT_SCOUT_COLLECTION)
+# Seconds to wait for a new listener's first snapshot before falling back to a plain read
+LISTENER_READY_TIMEOUT = 10
+# Collections persisted to a local Parquet snapshot for warm starts (Firestore backend only;
+# the SQLite backend is already local)
+SNAPSHOT_COLLECTIONS = (MATCH_SCOUT_COLLECTION, PIT_SCOUT_COLLECTION)
+# Minimum number of seconds between two snapshot writes of the same collection
+SNAPSHOT_INTERVAL = 30
+# One document per collection, rewritten by every batch or transaction that deletes from it
+DELETION_MARKERS_COLLECTION = "collection_deletions"
+# Named column sets accepted by load_collection(columns=...)
+FIELD_PROFILES = {
+    MATCH_SCOUT_COLLECTION: MATCH_PROFILES,
+    PIT_SCOUT_COLLECTION: PIT_PROFILES
+}
+
+def deletion_marker(db, collection_name):
+    """A ('set', reference, data) write recording a delete from collection_name.
+
+    Add it to every batch or transaction that deletes documents of a cached
+    collection: _sync_collection drops deleted ids only when the marker moved, since
+    a delete together with an insert of an older document leaves the count unchanged.
+    """
+    return ('set', db.collection(DELETION_MARKERS_COLLECTION).document(collection_name),
+            {'collection': collection_name, 'marker': uuid.uuid4().hex, 'deleted_at': datetime.now().isoformat()})
+
+def _deletion_marker_value(db, collection_name):
+    snapshot = db.collection(DELETION_MARKERS_COLLECTION).document(collection_name).get()
+    return (snapshot.to_dict() or {}).get('marker') if snapshot.exists else None
+
+@st.cache_resource
+def _get_collection_store():
+    # "lock" only guards the table of entries; each entry has its own locks
+    return {"lock": threading.Lock(), "snapshot_lock": threading.Lock(), "entries": {}}
+
+def _get_store_entry(store, collection_name, fields=None):
+    # Projected copies (fields is a tuple) live next to the full copy under (name, fields)
+    key = collection_name if fields is None else (collection_name, fields)
+    with store["lock"]:
+        entry = store["entries"].get(key)
+        if entry is None:
+            # "changes" counts the writes applied to the entry in this process (patches,
+            # invalidations, listener events); a read that started before one is not kept
+            entry = {"df": None, "version": 0, "changes": 0, "loaded_at": None, "watermark": None, "synced_at": None,
+                     "watch": None, "ready": None, "live_docs": None, "derived": {}, "fields": fields,
+                     "source": None, "reconciling": False, "timings": {}, "snapshot_version": None, "snapshot_at": 0,
+                     "deletions": None,
+                     # Re-entrant so a listener that delivers its first snapshot synchronously cannot deadlock
+                     "lock": threading.RLock(), "load_lock": threading.Lock(), "build_lock": threading.Lock()}
+            store["entries"][key] = entry
+    return entry
+
+def _collection_entries(store, collection_name):
+    # The full entry of a collection and all of its projected entries
+    with store["lock"]:
+        return [entry for key, entry in store["entries"].items()
+                if key == collection_name or (isinstance(key, tuple) and key[0] == collection_name)]
+
+def resolve_columns(collection_name, columns):
+    """Turn a profile name from FIELD_PROFILES or a list of columns into the sorted
+    tuple of fields to read, or None for every field."""
+    if columns is None:
+        return None
+    if isinstance(columns, str):
+        profiles = FIELD_PROFILES.get(collection_name, {})
+        if columns not in profiles:
+            raise ValueError(f"Unknown column profile '{columns}' for {collection_name}")
+        columns = profiles[columns]
+        if columns is None:
+            return None
+    # timestamp drives incremental syncs; doc_id comes from the document id, not a field
+    return tuple(sorted((set(columns) | {'timestamp'}) - {'doc_id'}))
+
+def _docs_to_dataframe(docs):
+    data = []
+    for doc in docs:
+        doc_dict = doc.to_dict()
+        doc_dict['doc_id'] = doc.id
+        data.append(doc_dict)
+    return pd.DataFrame(data)
+
+# Rows per page of the paginated data tables
+PAGE_SIZE = 50
+
+def query_page(collection_name, filters=(), page_size=PAGE_SIZE, start_after=None, order_field='timestamp'):
+    """One page of a collection, newest first, read straight from Firestore.
+
+    filters are (field, value) pairs matched with ==, applied by Firestore (the
+    composite indexes are in firestore.indexes.json). start_after is the last
+    snapshot of the previous page. Returns (DataFrame with 'doc_id', last
+    snapshot of this page, whether there are more pages).
+    """
+    db, _ = get_storage()  # Ensure storage is initialized
+    query = db.collection(collection_name)
+    for field, value in filters:
+        query = query.where(filter=FieldFilter(field, '==', value))
+    query = query.order_by(order_field, direction=DESCENDING)
+    if start_after is not None:
+        query = query.start_after(start_after)
+    # One extra document tells whether another page follows
+    docs = query.limit(page_size + 1).get()
+    page = docs[:page_size]
+    return _docs_to_dataframe(page), (page[-1] if page else None), len(docs) > page_size
+
+def _fetch_collection(collection_name, db=None, fields=None):
+    """Stream every document of a collection into a DataFrame (doc id in 'doc_id').
+
+    With fields, only those fields are sent by Firestore (a select() projection).
+    """
+    if db is None:
+        db, _ = get_storage()  # Ensure storage is initialized
+    query = db.collection(collection_name)
+    if fields is not None:
+        query = query.select(list(fields))
+    return _docs_to_dataframe(query.stream())
+
+def _load_full(entry, collection_name):
+    """Read an entry in full and swap it in; returns (df, version).
+
+    Caller holds entry["load_lock"] but not entry["lock"], which is taken only to
+    swap the result in. If the entry changed during the read (a write was patched in
+    or the cache invalidated), the read may predate that write: it is returned with
+    version None but not kept, so the next read loads again.
+    """
+    with entry["lock"]:
+        changes = entry["changes"]
+    start = time.perf_counter()
+    db, _ = get_storage()
+    # Read before the documents, so a delete during the read shows at the next sync
+    deletions = _deletion_marker_value(db, collection_name)
+    df = _fetch_collection(collection_name, db, fields=entry["fields"])
+    with entry["lock"]:
+        if entry["changes"] != changes:
+            return df, None
+        _set_entry_df(entry, df)
+        entry["deletions"] = deletions
+        entry["source"] = "firestore"
+        entry["reconciling"] = False
+        entry["timings"]["full_load_seconds"] = time.perf_counter() - start
+        return df, entry["version"]
+
+def _timestamp_watermark(df):
+    """Return the highest ISO-format timestamp string in the DataFrame, or None."""
+    if df is None or df.empty or 'timestamp' not in df.columns:
+        return None
+    # Other formats (old '%Y%m%dT%H%M%S' edits, uploaded CSVs) do not sort against ISO strings
+    is_iso = df['timestamp'].map(lambda v: isinstance(v, str)) & df['timestamp'].astype(str).str.match(r'\d{4}-\d{2}-\d{2}')
+    timestamps = df['timestamp'][is_iso]
+    return timestamps.max() if not timestamps.empty else None
+
+def _set_entry_df(entry, df):
+    entry["df"] = df
+    entry["watermark"] = _timestamp_watermark(df)
+    entry["version"] += 1
+    entry["loaded_at"] = time.time()
+    entry["synced_at"] = entry["loaded_at"]
+
+def _sync_collection(entry, collection_name):
+    """Bring a cached collection up to date with as few document reads as possible.
+
+    Only documents whose timestamp is newer than the watermark are read and merged.
+    Deletes and archives are detected by the collection's deletion marker (see
+    deletion_marker): when it moved since the last load or sync, a keys-only query
+    lists the ids still present, deleted ones are dropped and ids the cache lacks
+    (e.g. CSV rows with old timestamps) are read. Otherwise a count aggregation
+    catches such inserts by writers that do not delete. Caller holds
+    entry["load_lock"]; the queries run without entry["lock"], and the result is
+    dropped if a write was patched in meanwhile.
+    """
+    db, _ = get_storage()
+    collection = db.collection(collection_name)
+    with entry["lock"]:
+        df, watermark, changes, seen = entry["df"], entry["watermark"], entry["changes"], entry["deletions"]
+    changed = False
+
+    if df is None or watermark is None:
+        _load_full(entry, collection_name)
+        return
+    # Read first: a delete committed during the queries below moves it again
+    deletions = _deletion_marker_value(db, collection_name)
+    # The upper bound keeps '%Y%m%dT%H%M%S' strings, which sort above every ISO string,
+    # out of the delta; a year rollover is picked up by the count check below
+    delta_query = (collection
+                   .where(filter=FieldFilter('timestamp', '>', watermark))
+                   .where(filter=FieldFilter('timestamp', '<', watermark[:5] + '~')))
+    if entry["fields"] is not None:
+        delta_query = delta_query.select(list(entry["fields"]))
+    delta = _docs_to_dataframe(delta_query.stream())
+    if not delta.empty:
+        kept = df[~df['doc_id'].isin(delta['doc_id'])] if 'doc_id' in df.columns else df
+        df = pd.concat([kept, delta], ignore_index=True)
+        changed = True
+
+    if deletions != seen:
+        live_ids = {doc.id for doc in collection.select([]).stream()}
+        cached_ids = set(df['doc_id']) if 'doc_id' in df.columns else set()
+        missing = live_ids - cached_ids
+        upserts = {snapshot.id: snapshot.to_dict()
+                   for snapshot in db.get_all([collection.document(doc_id) for doc_id in missing]) if snapshot.exists}
+        if upserts or cached_ids - live_ids:
+            df = _patched_frame(df, upserts, cached_ids - live_ids, entry["fields"])
+            changed = True
+    elif collection.count().get()[0][0].value != len(df):
+        _load_full(entry, collection_name)
+        return
+
+    with entry["lock"]:
+        # A write patched in meanwhile is already in the cached copy; the next sync catches up
+        if entry["changes"] != changes:
+            return
+        if changed:
+            _set_entry_df(entry, df)
+        entry["deletions"] = deletions
+        entry["synced_at"] = time.time()
+
+def apply_snapshot_changes(docs, changes):
+    """Apply on_snapshot document changes to a {doc_id: data} table and return it.
+
+    Free of Firestore and Streamlit calls, so it can be fed hand-built changes or
+    the changes delivered by the Firestore emulator.
+    """
+    for change in changes:
+        if change.type.name == 'REMOVED':
+            docs.pop(change.document.id, None)
+        else:
+            docs[change.document.id] = change.document.to_dict()
+    return docs
+
+def _patched_frame(df, upserts, removed_ids, fields=None):
+    """A new frame of df without removed_ids, with upserts ({doc_id: data}) replacing or adding rows.
+
+    Cached frames are replaced, never modified in place. fields limits the added
+    rows to a projection's columns.
+    """
+    removed = set(removed_ids) | set(upserts)
+    if removed and 'doc_id' in df.columns:
+        df = df[~df['doc_id'].isin(list(removed))]
+    if upserts:
+        added = pd.DataFrame([dict(data, doc_id=doc_id) for doc_id, data in upserts.items()])
+        if fields is not None:
+            added = added[[col for col in ('doc_id',) + fields if col in added.columns]]
+        df = pd.concat([df, added], ignore_index=True)
+    return df.reset_index(drop=True)
+
+def _on_collection_snapshot(store, collection_name):
+    def callback(snapshot, changes, read_time):
+        entry = _get_store_entry(store, collection_name)
+        # Only the entry's own lock, held while the changed rows are patched in
+        with entry["lock"]:
+            if entry["df"] is not None and entry["ready"].is_set():
+                # The cached frame is patched with the changed documents instead of being
+                # rebuilt from live_docs on the next read
+                upserts = {change.document.id: change.document.to_dict() for change in changes
+                           if change.type.name != 'REMOVED'}
+                entry["df"] = _patched_frame(entry["df"], upserts, [change.document.id for change in changes])
+            apply_snapshot_changes(entry["live_docs"], changes)
+            entry["version"] += 1
+            entry["changes"] += 1
+            entry["loaded_at"] = time.time()
+            if not entry["ready"].is_set():
+                entry["timings"]["reconcile_seconds"] = time.time() - entry["listener_started_at"]
+                entry["source"] = "listener"
+                entry["reconciling"] = False
+                print(f"{collection_name}: listener caught up in {entry['timings']['reconcile_seconds']:.2f}s")
+            entry["ready"].set()
+    return callback
+
+def start_collection_listener(collection_name, db=None):
+    """Start the background listener of a collection once per process.
+
+    A listener that has stopped streaming is replaced. Returns a threading.Event
+    that is set once the first snapshot has been applied.
+    """
+    store = _get_collection_store()
+    if db is None:
+        db, _ = get_storage()
+    entry = _get_store_entry(store, collection_name)
+    with entry["lock"]:
+        if entry["watch"] is not None and getattr(entry["watch"], "is_active", True):
+            return entry["ready"]
+        if entry["watch"] is not None:
+            entry["watch"].unsubscribe()
+        entry["live_docs"] = {}
+        entry["ready"] = threading.Event()
+        entry["listener_started_at"] = time.time()
+        entry["watch"] = db.collection(collection_name).on_snapshot(_on_collection_snapshot(store, collection_name))
+        return entry["ready"]
+
+def _uses_snapshots(collection_name):
+    return collection_name in SNAPSHOT_COLLECTIONS and storage_settings()[0] != "sqlite"
+
+def _warm_start(entry, collection_name):
+    """Serve a collection from its local snapshot on first use in the process.
+
+    Caller holds entry["load_lock"]. Returns True if the snapshot was loaded; the
+    caller then reconciles with Firestore in the background.
+    """
+    with entry["lock"]:
+        if entry["loaded_at"] is not None or entry["df"] is not None:
+            return False
+        changes = entry["changes"]
+    start = time.perf_counter()
+    df, written_at = read_snapshot(collection_name)
+    if df is None:
+        return False
+    with entry["lock"]:
+        if entry["changes"] != changes or entry["df"] is not None:
+            return False
+        _set_entry_df(entry, df)
+        entry["source"] = "snapshot"
+        entry["reconciling"] = True
+        entry["snapshot_version"] = entry["version"]
+        entry["timings"]["snapshot_load_seconds"] = time.perf_counter() - start
+        entry["timings"]["snapshot_age_seconds"] = time.time() - written_at if written_at else None
+    print(f"{collection_name}: served {len(df)} documents from snapshot in {entry['timings']['snapshot_load_seconds']:.3f}s")
+    return True
+
+def _reconcile_in_background(collection_name):
+    """Replace a snapshot-served collection with a full Firestore read on a worker thread."""
+    db, _ = get_storage()  # Session state is not available on the worker thread
+    entry = _get_store_entry(_get_collection_store(), collection_name)
+    with entry["lock"]:
+        start_version = entry["version"]
+
+    def reconcile():
+        start = time.perf_counter()
+        try:
+            df = _fetch_collection(collection_name, db)
+        except Exception as e:
+            print(f"{collection_name}: background reconcile failed: {str(e)}")
+            with entry["lock"]:
+                entry["reconciling"] = False
+            return
+        with entry["lock"]:
+            entry["reconciling"] = False
+            # A write in the meantime invalidated the cache; the next read fetches anyway
+            if entry["version"] != start_version:
+                return
+            _set_entry_df(entry, df)
+            entry["source"] = "firestore"
+            entry["timings"]["reconcile_seconds"] = time.perf_counter() - start
+        print(f"{collection_name}: reconciled with Firestore in {time.perf_counter() - start:.2f}s")
+        _maybe_write_snapshot(collection_name)
+
+    threading.Thread(target=reconcile, daemon=True).start()
+
+def _prepare_entry(collection_name, force_refresh):
+    """Warm-start the entry if possible; return True if its listener is serving it."""
+    entry = _get_store_entry(_get_collection_store(), collection_name)
+    with entry["lock"]:
+        cold = entry["loaded_at"] is None and entry["df"] is None
+    warm = False
+    if cold and not force_refresh and _uses_snapshots(collection_name):
+        with entry["load_lock"]:
+            warm = _warm_start(entry, collection_name)
+    with entry["lock"]:
+        # Block on the listener only when there is nothing to show yet
+        wait = entry["df"] is None
+    if collection_name in LIVE_COLLECTIONS:
+        try:
+            ready = start_collection_listener(collection_name)
+            return ready.wait(LISTENER_READY_TIMEOUT) if wait else ready.is_set()
+        except Exception:
+            # No listener available (e.g. streaming blocked); fall back to reads
+            pass
+    if warm:
+        _reconcile_in_background(collection_name)
+    return False
+
+def _maybe_write_snapshot(collection_name):
+    """Persist the cached collection if it changed since the last snapshot."""
+    if not _uses_snapshots(collection_name):
+        return
+    store = _get_collection_store()
+    entry = _get_store_entry(store, collection_name)
+    with entry["lock"]:
+        if entry["df"] is None or entry["reconciling"] or entry["snapshot_version"] == entry["version"]:
+            return
+        if entry["snapshot_version"] is not None and time.time() - entry["snapshot_at"] < SNAPSHOT_INTERVAL:
+            return
+        df = entry["df"]
+        entry["snapshot_version"] = entry["version"]
+        entry["snapshot_at"] = time.time()
+    # Cached frames are replaced, never modified in place, so df can be written unlocked
+    if store["snapshot_lock"].acquire(blocking=False):
+        try:
+            seconds = write_snapshot(collection_name, df)
+        finally:
+            store["snapshot_lock"].release()
+        if seconds is not None:
+            with entry["lock"]:
+                entry["timings"]["snapshot_write_seconds"] = seconds
+
+def load_collection(collection_name, force_refresh=False, sync=False, columns=None):
+    """Return a copy of the raw documents of a collection from the shared cache.
+
+    On first use in the process, collections in SNAPSHOT_COLLECTIONS are served
+    from their local snapshot right away and reconciled in the background.
+    Collections in LIVE_COLLECTIONS are then served from their snapshot listener
+    and never re-read. Otherwise the collection is read in full on first use,
+    after invalidate_collection_cache() or when force_refresh is True, and with
+    sync=True it is first brought up to date incrementally.
+
+    columns (a list of fields or a FIELD_PROFILES name such as 'scoring') limits
+    the result to those fields; see _projected_frame() for how it is served.
+    """
+    fields = resolve_columns(collection_name, columns)
+    live = _prepare_entry(collection_name, force_refresh) if fields is None else False
+    _, df, _ = _entry_frame(_get_collection_store(), collection_name, fields, live, force_refresh, sync)
+    _maybe_write_snapshot(collection_name)
+    # Cached frames are replaced, never modified in place, so the copy needs no lock
+    return df.copy()
+
+def _entry_frame(store, collection_name, fields, live, force_refresh, sync):
+    # Returns (entry, df, version) for the full or projected read
+    if fields is None:
+        entry = _get_store_entry(store, collection_name)
+        return (entry,) + _refresh_entry(entry, collection_name, live, force_refresh, sync)
+    return _projected_frame(store, collection_name, fields, force_refresh, sync)
+
+def _projected_frame(store, collection_name, fields, force_refresh, sync):
+    """Serve a column projection from the shared cache.
+
+    If the full collection is already in memory (or kept live by its listener) it
+    is sliced, so a projected load never costs a read. Otherwise only the projected
+    fields are read with select() into an entry of their own, synced like the full one.
+    """
+    entry = _get_store_entry(store, collection_name)
+    with entry["lock"]:
+        live = entry["ready"] is not None and entry["ready"].is_set()
+        loaded = entry["df"] is not None
+    if not force_refresh and (live or loaded):
+        df, version = _refresh_entry(entry, collection_name, live, False, sync)
+        return entry, df[[col for col in ('doc_id',) + fields if col in df.columns]], version
+    entry = _get_store_entry(store, collection_name, fields)
+    return (entry,) + _refresh_entry(entry, collection_name, False, force_refresh, sync)
+
+def _refresh_entry(entry, collection_name, live, force_refresh, sync):
+    """(df, version) of an entry, read from Firestore only when needed (see _load_full).
+
+    A cold or forced read is made by one thread per entry; sessions queued behind
+    it are served its result, and sessions reading other entries do not wait.
+    """
+    if live:
+        with entry["lock"]:
+            if entry["df"] is None:
+                entry["df"] = pd.DataFrame([dict(data, doc_id=doc_id) for doc_id, data in entry["live_docs"].items()])
+            return entry["df"], entry["version"]
+    with entry["lock"]:
+        loaded_at = entry["loaded_at"] if entry["df"] is not None else None
+    if loaded_at is not None and not force_refresh:
+        if sync:
+            _sync_if_due(entry, collection_name)
+        with entry["lock"]:
+            if entry["df"] is not None:
+                return entry["df"], entry["version"]
+    with entry["load_lock"]:
+        with entry["lock"]:
+            # Read by another session while this one waited
+            if entry["df"] is not None and (not force_refresh or entry["loaded_at"] != loaded_at):
+                return entry["df"], entry["version"]
+        return _load_full(entry, collection_name)
+
+def load_derived(collection_name, key, builder, force_refresh=False, sync=False, columns=None):
+    """Return builder(raw documents) memoized on the collection version.
+
+    The result is shared by every session and rebuilt only after the collection
+    changes, so opening another page or touching a widget reuses it. columns
+    works as in load_collection() and is part of the memo key. The builder runs
+    outside the entry lock, one build per entry at a time.
+    """
+    fields = resolve_columns(collection_name, columns)
+    live = _prepare_entry(collection_name, force_refresh) if fields is None else False
+    entry, df, version = _entry_frame(_get_collection_store(), collection_name, fields, live, force_refresh, sync)
+    key = key if fields is None else (key, fields)
+    with entry["lock"]:
+        cached = entry["derived"].get(key)
+    if version is None or cached is None or cached[0] != version:
+        with entry["build_lock"]:
+            with entry["lock"]:
+                cached = entry["derived"].get(key)  # Built by another session while this one waited
+            if version is None or cached is None or cached[0] != version:
+                cached = (version, builder(df.copy()))
+                with entry["lock"]:
+                    # Kept only while the entry still holds the frame it was built from
+                    if version is not None and entry["version"] == version:
+                        entry["derived"][key] = cached
+    _maybe_write_snapshot(collection_name)
+    return cached[1].copy()
+
+def _sync_if_due(entry, collection_name):
+    # At most one sync every SYNC_INTERVAL seconds, whichever session asks; none while a
+    # snapshot-served collection is still being reconciled. A session that finds another
+    # one syncing the entry is served the cached copy instead of waiting
+    def due():
+        with entry["lock"]:
+            return (entry["df"] is not None and not entry["reconciling"]
+                    and time.time() - entry["synced_at"] >= SYNC_INTERVAL)
+    if due() and entry["load_lock"].acquire(blocking=False):
+        try:
+            if due():
+                _sync_collection(entry, collection_name)
+        finally:
+            entry["load_lock"].release()
+
+def sync_collection(collection_name):
+    """Incrementally sync a cached collection (and its projections) that is not served by a listener."""
+    store = _get_collection_store()
+    _get_store_entry(store, collection_name)
+    for entry in _collection_entries(store, collection_name):
+        with entry["lock"]:
+            live = entry["ready"] is not None and entry["ready"].is_set()
+        if not live:
+            _sync_if_due(entry, collection_name)
+
+def rerun_on_collection_change(collection_names, version_key, run_every=2):
+    """Re-run the page as soon as one of the collections changes.
+
+    st.session_state[version_key] must hold the list of versions the page was
+    rendered with. The check runs in a fragment and is an in-memory lookup for
+    live collections; other collections are synced incrementally.
+    """
+    @st.fragment(run_every=run_every)
+    def _watch_versions():
+        for name in collection_names:
+            sync_collection(name)
+        if [get_collection_version(name) for name in collection_names] != st.session_state.get(version_key):
+            st.rerun()
+    _watch_versions()
+
+def invalidate_collection_cache(*collection_names):
+    """Drop the cached copy of the given collections (all collections if none given)."""
+    store = _get_collection_store()
+    if collection_names:
+        entries = [entry for name in collection_names
+                   for entry in _collection_entries(store, name) or [_get_store_entry(store, name)]]
+    else:
+        with store["lock"]:
+            entries = list(store["entries"].values())
+    for entry in entries:
+        with entry["lock"]:
+            entry["df"] = None
+            entry["watermark"] = None
+            entry["version"] += 1
+            entry["changes"] += 1
+
+def frame_documents(df, doc_ids=None):
+    """{doc_id: data} for rows of a DataFrame built from documents (all rows if doc_ids is None).
+
+    Fields a document did not have (NaN) are left out and integer columns that
+    pandas widened to float because of them are turned back into ints.
+    """
+    if df is None or df.empty or 'doc_id' not in df.columns:
+        return {}
+    if doc_ids is not None:
+        df = df[df['doc_id'].isin(list(doc_ids))]
+    df = df.astype(object)
+    for col in df.columns:
+        values = df[col].dropna()
+        if len(values) and all(isinstance(v, float) and v.is_integer() for v in values):
+            df[col] = df[col].map(lambda v: int(v) if isinstance(v, float) and v == v else v)
+    documents = {}
+    for record in df.to_dict('records'):
+        doc_id = record.pop('doc_id')
+        documents[doc_id] = {key: value.item() if isinstance(value, np.generic) else value
+                             for key, value in record.items()
+                             if not (isinstance(value, float) and value != value)}
+    return documents
+
+def cached_documents(collection_name, doc_ids=None):
+    """{doc_id: data} of a collection from the shared cache, without reading Firestore.
+
+    Listener-served collections return the documents exactly as stored; others
+    are rebuilt from the cached DataFrame (see frame_documents). Returns only the
+    cached subset of doc_ids, so callers can fetch what is missing.
+    """
+    entry = _get_store_entry(_get_collection_store(), collection_name)
+    with entry["lock"]:
+        live_docs = entry["live_docs"] if entry["ready"] is not None and entry["ready"].is_set() else None
+        if live_docs is not None:
+            ids = live_docs.keys() if doc_ids is None else [doc_id for doc_id in doc_ids if doc_id in live_docs]
+            return {doc_id: dict(live_docs[doc_id]) for doc_id in ids}
+        df = entry["df"]
+    return frame_documents(df, doc_ids)
+
+def patch_collection_cache(collection_name, upserts=None, deleted_ids=()):
+    """Apply writes the caller has just made to the cached copies of a collection.
+
+    upserts maps doc ids to their full new data. Used by bulk operations instead
+    of invalidate_collection_cache(), so the next read needs no Firestore reads.
+    Listener-served copies are patched too; the listener later delivers the same
+    changes, which are idempotent.
+    """
+    upserts = upserts or {}
+    store = _get_collection_store()
+    for entry in _collection_entries(store, collection_name):
+        with entry["lock"]:
+            # Also when nothing is cached: a read in progress may predate these writes
+            entry["changes"] += 1
+            if entry["live_docs"] is not None and entry["ready"] is not None and entry["ready"].is_set():
+                for doc_id in deleted_ids:
+                    entry["live_docs"].pop(doc_id, None)
+                entry["live_docs"].update({doc_id: dict(data) for doc_id, data in upserts.items()})
+                if entry["df"] is not None:
+                    entry["df"] = _patched_frame(entry["df"], upserts, deleted_ids)
+            elif entry["df"] is not None:
+                entry["df"] = _patched_frame(entry["df"], upserts, deleted_ids, entry["fields"])
+                entry["watermark"] = _timestamp_watermark(entry["df"])
+            else:
+                continue
+            entry["version"] += 1
+
+def get_collection_version(collection_name):
+    """Return the version counter of a cached collection (changes on every reload or listener update).
+
+    Projected copies count too, so a page reading only some columns still sees changes.
+    """
+    store = _get_collection_store()
+    _get_store_entry(store, collection_name)
+    version = 0
+    for entry in _collection_entries(store, collection_name):
+        with entry["lock"]:
+            version += entry["version"]
+    return version
+
+def get_collection_status(collection_name):
+    """Return where the cached collection came from ('snapshot', 'firestore' or 'listener')
+    and its load timings in seconds (snapshot load, background reconcile, full load)."""
+    entry = _get_store_entry(_get_collection_store(), collection_name)
+    with entry["lock"]:
+        return {"source": entry["source"], "reconciling": entry["reconciling"], "version": entry["version"],
+                "loaded_at": entry["loaded_at"], "timings": dict(entry["timings"])}
+
+def describe_collection_load(collection_name):
+    """One-line summary of where a cached collection came from and how long it took."""
+    status = get_collection_status(collection_name)
+    timings = status["timings"]
+    parts = []
+    if "snapshot_load_seconds" in timings:
+        parts.append(f"local snapshot loaded in {timings['snapshot_load_seconds']:.2f}s")
+    if status["reconciling"]:
+        parts.append("reconciling with Firestore in the background")
+    elif "reconcile_seconds" in timings:
+        parts.append(f"reconciled with Firestore in {timings['reconcile_seconds']:.2f}s")
+    if "full_load_seconds" in timings:
+        parts.append(f"last full Firestore read took {timings['full_load_seconds']:.2f}s")
+    return "; ".join(parts)
+
+def get_collection_loaded_at(collection_name):
+    """Return the time the cached copy of a collection was read, or None."""
+    entry = _get_store_entry(_get_collection_store(), collection_name)
+    with entry["lock"]:
+        return entry["loaded_at"]
+
+def convert_match_dtypes(df):
+    """Give raw match documents the compact column types from utils.schema."""
+    df = apply_schema(df, MATCH_SCHEMA)
+    if 'robot_photo_url' in df.columns:
+        df['robot_photo_url'] = df['robot_photo_url'].astype(str).fillna('')
+    return df
+
+def convert_pit_dtypes(df):
+    """Give raw pit documents the compact column types from utils.schema."""
+    df = apply_schema(df, PIT_SCHEMA)
+    if 'robot_photo_url' in df.columns:
+        # Convert to string and handle None/NaN values
+        df['robot_photo_url'] = df['robot_photo_url'].astype(str).replace('nan', '').replace('None', '')
+    return df
+
+def _typed_frame(converter):
+    # Builder for load_derived(): convert once per collection version
+    def build(df):
+        if df.empty:
             return pd.DataFrame()
-        df = pd.DataFrame(data)
-        numeric_cols = [
-            'auto_coral_l1', 'auto_coral_l2', 'auto_coral_l3', 'auto_coral_l4',
-            'auto_missed_coral_l1', 'auto_missed_coral_l2', 'auto_missed_coral_l3', 'auto_missed_coral_l4',
-            'auto_algae_barge', 'auto_algae_processor', 'auto_algae_removed',
-            'auto_missed_algae_barge', 'auto_missed_algae_processor',
-            'teleop_coral_l1', 'teleop_coral_l2', 'teleop_coral_l3', 'teleop_coral_l4',
-            'teleop_missed_coral_l1', 'teleop_missed_coral_l2', 'teleop_missed_coral_l3', 'teleop_missed_coral_l4',
-            'teleop_algae_barge', 'teleop_algae_processor', 'teleop_algae_removed',
-            'teleop_missed_algae_barge', 'teleop_missed_algae_processor'
-        ]
-        for col in numeric_cols:
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype(int)
-        if 'robot_photo_url' in df.columns:
-            df['robot_photo_url'] = df['robot_photo_url'].astype(str).fillna('')
-        return df
+        return converter(df)
+    return build
+
+def load_data(force_refresh=False, sync=False, columns=None):
+    try:
+        return load_derived(MATCH_SCOUT_COLLECTION, 'typed', _typed_frame(convert_match_dtypes),
+                            force_refresh=force_refresh, sync=sync, columns=columns)
     except Exception as e:
         st.error(f"Error loading match data from Firestore: {str(e)}")
         return None
 
-def load_pit_data():
+def load_pit_data(force_refresh=False, sync=False, columns=None):
     try:
-        db, _ = get_firebase_instances()  # Ensure Firebase is initialized
-        docs = db.collection(PIT_SCOUT_COLLECTION).stream()
-        data = []
-        for doc in docs:
-            doc_dict = doc.to_dict()
-            doc_dict['doc_id'] = doc.id
-            data.append(doc_dict)
-        if not data:
-            return pd.DataFrame()
-        df = pd.DataFrame(data)
-        numeric_cols = ['team_number']
-        boolean_cols = [
-            'can_score_coral_l1', 'can_score_coral_l2', 'can_score_coral_l3', 'can_score_coral_l4',
-            'can_score_algae_barge', 'can_score_algae_processor', 'can_remove_algae_l1', 'can_remove_algae_l2'
-        ]
-        for col in numeric_cols:
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype(int)
-        for col in boolean_cols:
-            if col in df.columns:
-                df[col] = df[col].astype(bool)
-        if 'robot_photo_url' in df.columns:
-            # Convert to string and handle None/NaN values
-            df['robot_photo_url'] = df['robot_photo_url'].astype(str).replace('nan', '').replace('None', '')
-        return df
+        return load_derived(PIT_SCOUT_COLLECTION, 'typed', _typed_frame(convert_pit_dtypes),
+                            force_refresh=force_refresh, sync=sync, columns=columns)
     except Exception as e:
         st.error(f"Error loading pit data from Firestore: {str(e)}")
         return None
@@ -413,6 +1181,46 @@ def calculate_match_score(row):
         'total_score': total_score
     })
 
+# Point values per scored game piece, used by calculate_match_scores
+AUTO_SCORE_WEIGHTS = {
+    'auto_coral_l1': 2, 'auto_coral_l2': 4, 'auto_coral_l3': 6, 'auto_coral_l4': 8,
+    'auto_algae_barge': 2, 'auto_algae_processor': 3, 'auto_algae_removed': 1
+}
+TELEOP_SCORE_WEIGHTS = {
+    'teleop_coral_l1': 1, 'teleop_coral_l2': 2, 'teleop_coral_l3': 3, 'teleop_coral_l4': 4,
+    'teleop_algae_barge': 1, 'teleop_algae_processor': 2, 'teleop_algae_removed': 1
+}
+AUTO_TAXI_POINTS = 2
+CLIMB_POINTS = {'Parked': 2, 'Shallow Climb': 6, 'Deep Climb': 12}
+
+def _truthy(series):
+    """Vectorized bool(value) for every entry, evaluated once per distinct value."""
+    codes, uniques = pd.factorize(series)
+    truthy = np.array([bool(v) for v in uniques] + [False])[codes]  # code -1 (missing) hits the last slot
+    missing = codes == -1
+    if missing.any():
+        # NaN is truthy like in a plain `if`, None is not
+        truthy[missing] = [v is not None for v in series[missing]]
+    return truthy
+
+def calculate_match_scores(df):
+    """Columnar version of calculate_match_score for a whole DataFrame.
+
+    Returns a DataFrame with auto_score, teleop_score, endgame_score and
+    total_score aligned on df's index.
+    """
+    auto_score = df[list(AUTO_SCORE_WEIGHTS)].dot(pd.Series(AUTO_SCORE_WEIGHTS))
+    auto_score = auto_score + _truthy(df['auto_taxi_left']) * AUTO_TAXI_POINTS
+    teleop_score = df[list(TELEOP_SCORE_WEIGHTS)].dot(pd.Series(TELEOP_SCORE_WEIGHTS))
+    codes, uniques = pd.factorize(df['climb_status'])
+    endgame_score = pd.Series(np.array([CLIMB_POINTS.get(v, 0) for v in uniques] + [0])[codes], index=df.index)
+    return pd.DataFrame({
+        'auto_score': auto_score,
+        'teleop_score': teleop_score,
+        'endgame_score': endgame_score,
+        'total_score': auto_score + teleop_score + endgame_score
+    }, index=df.index)
+
 def calculate_epa(df, team_number):
     if df.empty or 'total_score' not in df.columns:
         return 0.0
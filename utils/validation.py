@@ -0,0 +1,273 @@
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from google.cloud.firestore_v1.base_query import FieldFilter
+from utils.schema import MATCH_FORM_SECTIONS, PIT_FORM_SECTIONS, iter_form_fields
+from utils.utils import load_collection
+
+# Define required fields for error checking
+MATCH_REQUIRED_FIELDS = [
+    'team_number', 'match_number', 'alliance_color', 'starting_position', 'scouter_name',
+    'match_outcome', 'auto_taxi_left', 'climb_status', 'defense_rating', 'speed_rating', 'driver_skill_rating', 'primary_role'
+]
+
+PIT_REQUIRED_FIELDS = [
+    'team_number', 'scouter_name', 'drivetrain_type', 'endgame_capability', 'preferred_role',
+    'programming_language', 'coral_pickup_method', 'algae_pickup_method'
+]
+
+# Fields that identify one entry; records sharing them are reported as duplicates
+# (event_key is left out of the comparison for records saved before it existed)
+MATCH_DUPLICATE_FIELDS = ['event_key', 'team_number', 'match_number']
+PIT_DUPLICATE_FIELDS = ['event_key', 'team_number']
+
+ERROR_COLUMNS = ['doc_id', 'Error Type', 'Field', 'Details']
+
+# Index of the records that failed validation when they were written: one document
+# per flagged record, {'collection', 'doc_id', 'errors': [{'type', 'field', 'details'}], 'checked_at'}
+VALIDATION_ERRORS_COLLECTION = "validation_errors"
+
+def build_rules(sections, required_fields, duplicate_fields):
+    """Validation rules for a form, generated from its utils/form_config.py sections.
+
+    'number' fields must be non-negative numbers, 'slider' fields numbers between
+    their min and max. range maps a field to (low, high); None means no bound.
+    """
+    rules = {'required': list(required_fields), 'numeric': [], 'range': {}, 'duplicate': list(duplicate_fields)}
+    for field in iter_form_fields(sections):
+        if field['type'] == 'number':
+            rules['numeric'].append(field['name'])
+            rules['range'][field['name']] = (0, None)
+        elif field['type'] == 'slider':
+            rules['numeric'].append(field['name'])
+            rules['range'][field['name']] = (field.get('min'), field.get('max'))
+    return rules
+
+MATCH_RULES = build_rules(MATCH_FORM_SECTIONS, MATCH_REQUIRED_FIELDS, MATCH_DUPLICATE_FIELDS)
+PIT_RULES = build_rules(PIT_FORM_SECTIONS, PIT_REQUIRED_FIELDS, PIT_DUPLICATE_FIELDS)
+
+def _blank(values):
+    # Missing, or text that is empty once stripped; categoricals only check their categories
+    missing = values.isna()
+    if pd.api.types.is_numeric_dtype(values) or pd.api.types.is_bool_dtype(values):
+        return missing
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        categories = values.cat.categories
+        return missing | values.isin(categories[categories.astype(str).str.strip() == ""])
+    return missing | (values.astype(str).str.strip() == "")
+
+def _range_details(low, high):
+    if high is None:
+        text = ' is negative' if low == 0 else f' is less than {low}'
+    elif low is None:
+        text = f' is more than {high}'
+    else:
+        text = f' is not between {low} and {high}'
+    return lambda values: ('Value ' + values.astype(str) + text).tolist()
+
+def _find_errors(data, rules, labels, label_column):
+    # Every check is a column operation; messages are only built for the offending rows
+    found = []
+
+    def add(mask, error_type, field, details, values=None):
+        # details: a message, or a function making the messages from the offending values
+        mask = np.asarray(mask, dtype=bool)
+        if mask.any():
+            offending = (data[field] if values is None else values)[mask]
+            found.append(pd.DataFrame({label_column: labels[mask], 'Error Type': error_type, 'Field': field,
+                                       'Details': details(offending) if callable(details) else details}))
+
+    for field in rules['required']:
+        if field in data.columns:
+            add(_blank(data[field]), 'Missing Value', field, 'Field is empty or NaN')
+
+    for field in rules['numeric']:
+        if field not in data.columns:
+            continue
+        values = data[field]
+        numbers = values if pd.api.types.is_numeric_dtype(values) else pd.to_numeric(values, errors='coerce')
+        if numbers is not values:
+            add(numbers.isna() & values.notna(), 'Invalid Data Type', field,
+                lambda offending: ('Value "' + offending.astype(str) + '" is not a number').tolist())
+        low, high = rules['range'].get(field, (None, None))
+        out_of_range = np.zeros(len(data), dtype=bool)
+        if low is not None:
+            out_of_range |= (numbers < low).fillna(False).to_numpy(dtype=bool)
+        if high is not None:
+            out_of_range |= (numbers > high).fillna(False).to_numpy(dtype=bool)
+        add(out_of_range, 'Out of Range', field, _range_details(low, high), values=numbers)
+
+    # Duplicates are compared on the identifying fields (event_key only where the data has it)
+    fields = [field for field in rules['duplicate'] if field != 'event_key' or field in data.columns]
+    if fields and all(field in data.columns for field in fields):
+        duplicated = data.duplicated(subset=fields, keep=False).to_numpy()
+        if duplicated.any():
+            rows = data.loc[duplicated, fields]
+            details = 'Duplicate entry for ' + rows[fields[0]].astype(str).radd(f'{fields[0]}: ')
+            for field in fields[1:]:
+                details = details + f', {field}: ' + rows[field].astype(str)
+            found.append(pd.DataFrame({label_column: labels[duplicated], 'Error Type': 'Duplicate Record',
+                                       'Field': ', '.join(fields), 'Details': details.tolist()}))
+
+    if not found:
+        return pd.DataFrame(columns=[label_column, 'Error Type', 'Field', 'Details'])
+    return pd.concat(found, ignore_index=True)
+
+# Inspect scouting data for missing values, bad numbers, out-of-range values and duplicates.
+# rules is MATCH_RULES or PIT_RULES; errors are reported against the doc_id column.
+def inspect_errors(data, rules):
+    if data.empty:
+        return pd.DataFrame(columns=ERROR_COLUMNS)
+    labels = data['doc_id'].to_numpy() if 'doc_id' in data.columns else data.index.to_numpy()
+    return _find_errors(data, rules, labels, 'doc_id')
+
+# The same checks without duplicates; 'row' is the index label of the offending row.
+# Used to check CSV imports before writing.
+def row_errors(data, rules):
+    return _find_errors(data, dict(rules, duplicate=[]), data.index.to_numpy(), 'row')
+
+# Validate on write: the per-record checks (and duplicate checks, see check_records) are
+# run when records are saved, edited or imported, and records with errors are listed in
+# VALIDATION_ERRORS_COLLECTION, so the inspection views read only the flagged records
+# instead of whole collections.
+def document_errors(documents, rules):
+    """{doc_id: [{'type', 'field', 'details'}]} for the documents ({doc_id: data}) that fail the per-record checks."""
+    if not documents:
+        return {}
+    data = _with_required(pd.DataFrame.from_dict(documents, orient='index'), rules)
+    return group_errors(_find_errors(data, dict(rules, duplicate=[]), data.index.to_numpy(), 'doc_id'))
+
+def _with_required(data, rules):
+    # A stored record without a required field is missing it, even when no record has the field
+    return data.reindex(columns=data.columns.union(rules['required'], sort=False))
+
+def group_errors(errors):
+    """An inspect_errors table as {doc_id: [{'type', 'field', 'details'}]}."""
+    flagged = {}
+    for doc_id, error_type, field, details in errors[ERROR_COLUMNS].itertuples(index=False):
+        flagged.setdefault(doc_id, []).append({'type': error_type, 'field': field, 'details': details})
+    return flagged
+
+def error_flag_writes(db, collection, doc_ids, flagged):
+    """Writes ((kind, reference, data), kind 'set' or 'delete') recording the errors
+    of doc_ids in the index: flagged ones are listed, the others removed from it."""
+    index = db.collection(VALIDATION_ERRORS_COLLECTION)
+    checked_at = datetime.now().isoformat()
+    writes = []
+    for doc_id in doc_ids:
+        reference = index.document(f"{collection}__{doc_id}")
+        if doc_id in flagged:
+            writes.append(('set', reference, {'collection': collection, 'doc_id': doc_id, 'errors': flagged[doc_id],
+                                              'checked_at': checked_at}))
+        else:
+            writes.append(('delete', reference, None))
+    return writes
+
+def apply_writes(target, writes):
+    """Add writes (see error_flag_writes) to a batch or transaction."""
+    for kind, reference, data in writes:
+        if kind == 'delete':
+            target.delete(reference)
+        else:
+            target.set(reference, data)
+
+def _commit(db, writes):
+    for start in range(0, len(writes), 500):
+        batch = db.batch()
+        apply_writes(batch, writes[start:start + 500])
+        batch.commit()
+
+def duplicate_flags(db, collection, documents, rules, exclude=()):
+    """Duplicate Record errors of documents ({doc_id: data}) and of the stored records
+    sharing their identifying fields (rules['duplicate']).
+
+    Returns ({doc_id: [errors]}, {doc_id: data} of those stored records). One equality
+    query per document, so the cost depends on the records checked, not on the size
+    of the collection. Stored records in exclude (being replaced) are left out.
+    """
+    fields = rules['duplicate']
+    key_fields = [field for field in fields if field != 'event_key']
+
+    def key(data):
+        # Records without an event only match each other, like the table checks
+        return tuple(str(data.get(field) or '') for field in fields)
+
+    groups, partners = {}, {}
+    for doc_id, data in documents.items():
+        if any(data.get(field) is None for field in key_fields) or key(data) in groups:
+            continue
+        query = db.collection(collection)
+        for field in fields:
+            if field in key_fields or data.get(field):
+                query = query.where(filter=FieldFilter(field, '==', data[field]))
+        group = {snapshot.id: snapshot.to_dict() for snapshot in query.stream()
+                 if snapshot.id not in exclude and snapshot.id not in documents}
+        group = {stored_id: stored for stored_id, stored in group.items() if key(stored) == key(data)}
+        group.update({other_id: other for other_id, other in documents.items() if key(other) == key(data)})
+        groups[key(data)] = group
+        partners.update({stored_id: stored for stored_id, stored in group.items() if stored_id not in documents})
+
+    flags = {}
+    for group in groups.values():
+        if len(group) < 2:
+            continue
+        for doc_id, data in group.items():
+            details = 'Duplicate entry for ' + ', '.join(f'{field}: {data.get(field)}' for field in fields)
+            flags[doc_id] = [{'type': 'Duplicate Record', 'field': ', '.join(fields), 'details': details}]
+    return flags, partners
+
+def check_records(db, collection, documents, rules, exclude=()):
+    """All errors of documents being written ({doc_id: data}): the per-record checks and duplicates.
+
+    Returns ({doc_id: [errors]}, ids checked). The ids checked include the stored records
+    the documents duplicate, so error_flag_writes(db, collection, checked, flagged) flags them too.
+    """
+    duplicates, partners = duplicate_flags(db, collection, documents, rules, exclude)
+    checked = dict(partners, **documents)
+    flagged = document_errors(checked, rules)
+    for doc_id, errors in duplicates.items():
+        flagged.setdefault(doc_id, []).extend(errors)
+    return flagged, set(checked)
+
+def flagged_errors(db, collection, rules):
+    """Errors of the flagged records of a collection, as an inspect_errors table.
+
+    Only the flagged records (and the records they duplicate) are read, and they are
+    checked again: records fixed since are left out. Deleting or archiving a record
+    removes its entry; entries of fixed records are only removed by
+    revalidate_collection(), so reading never writes.
+    """
+    entries = (db.collection(VALIDATION_ERRORS_COLLECTION)
+               .where(filter=FieldFilter('collection', '==', collection)).stream())
+    flags = {}
+    for entry in entries:
+        entry = entry.to_dict()
+        flags[entry['doc_id']] = entry.get('errors', [])
+    documents = {}
+    if flags:
+        references = [db.collection(collection).document(doc_id) for doc_id in flags]
+        documents = {snapshot.id: snapshot.to_dict() for snapshot in db.get_all(references) if snapshot.exists}
+    flagged = document_errors(documents, rules)
+    # Duplicates are checked again only for the records flagged as duplicates
+    duplicated = {doc_id: data for doc_id, data in documents.items()
+                  if any(error.get('type') == 'Duplicate Record' for error in flags[doc_id])}
+    for doc_id, errors in duplicate_flags(db, collection, duplicated, rules)[0].items():
+        flagged.setdefault(doc_id, []).extend(errors)
+    rows = [(doc_id, error['type'], error['field'], error['details'])
+            for doc_id, errors in flagged.items() for error in errors]
+    return pd.DataFrame(rows, columns=ERROR_COLUMNS)
+
+def revalidate_collection(db, collection, rules):
+    """Check every record of a collection and rewrite its entries in the index.
+
+    For records written before validation on write, after the rules change, and to
+    remove the entries of records fixed or deleted since. Returns the number of
+    flagged records.
+    """
+    # Read in full: imported records can be older than the incremental sync watermark
+    data = load_collection(collection, force_refresh=True)
+    flagged = group_errors(inspect_errors(_with_required(data, rules), rules)) if not data.empty else {}
+    listed = [entry.to_dict()['doc_id'] for entry in db.collection(VALIDATION_ERRORS_COLLECTION)
+              .where(filter=FieldFilter('collection', '==', collection)).stream()]
+    _commit(db, error_flag_writes(db, collection, set(flagged) | set(listed), flagged))
+    return len(flagged)